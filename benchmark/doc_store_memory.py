@@ -0,0 +1,77 @@
+"""Bytes per item of doc metadata: per-doc id/meta lists vs the columnar DocStore.
+
+Also shows what the full ItemFeature objects cost per item, i.e. what an
+index would retain if it kept the corpus after build.
+
+Usage (from repo root):
+    PYTHONPATH=item_search/app/src python -m benchmark.doc_store_memory --items 200000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from refine.parsers.tabular_parser import iter_rows
+from refine.extractors.features import iter_row_features
+from refine.searchers.cosine_index import item_meta
+from refine.searchers.doc_store import DocStoreBuilder
+from .synthetic import write_synthetic_catalog
+
+
+def _retained(build: Callable[[], Any]) -> int:
+    """Bytes still allocated once ``build`` returned (temporaries are freed)."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Doc metadata bytes per item")
+    parser.add_argument("--items", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "catalog.jsonl"
+        write_synthetic_catalog(path, args.items)
+
+        # items are streamed from the file, so only what each layout keeps is counted
+        def features():
+            return list(iter_row_features(iter_rows(path)))
+
+        def lists():
+            ids, meta = [], []
+            for it in iter_row_features(iter_rows(path)):
+                ids.append(it.item_id)
+                meta.append(item_meta(it))
+            return ids, meta
+
+        def store():
+            builder = DocStoreBuilder()
+            for it in iter_row_features(iter_rows(path)):
+                builder.append(it.item_id, item_meta(it))
+            return builder.build()
+
+        n = args.items
+        full = _retained(features)
+        before = _retained(lists)
+        after = _retained(store)
+        arrays = store().nbytes
+
+    print(f"items:                    {n}")
+    print(f"ItemFeature objects:      {full / n:8.1f} B/item")
+    print(f"id + meta dict lists:     {before / n:8.1f} B/item")
+    print(f"DocStore columns:         {after / n:8.1f} B/item ({arrays / n:.1f} B/item in arrays)")
+    print(f"reduction:                {before / max(after, 1):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
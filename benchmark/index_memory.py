@@ -0,0 +1,45 @@
+"""Memory footprint of a fitted CosineIndex on a synthetic catalog.
+
+Usage (from repo root):
+    PYTHONPATH=item_search/app/src python -m benchmark.index_memory --items 100000
+    PYTHONPATH=item_search/app/src python -m benchmark.index_memory --items 100000 --segment-size 10000
+"""
+from __future__ import annotations
+
+import argparse
+import tracemalloc
+
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.segments import SegmentedIndex
+from .synthetic import synthetic_reference
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CosineIndex memory footprint")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--segment-size", type=int, default=0, help="Build a SegmentedIndex with this many docs per segment")
+    args = parser.parse_args()
+
+    reference = synthetic_reference(args.items)
+
+    tracemalloc.start()
+    index = SegmentedIndex(segment_size=args.segment_size) if args.segment_size > 0 else CosineIndex()
+    index.fit(reference)
+    if isinstance(index, SegmentedIndex):
+        index.wait_for_merges()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    segments = index.segments if isinstance(index, SegmentedIndex) else (index,)
+    postings = sum(int(seg._postings.offsets[-1]) for seg in segments)
+    arrays = index.memory_usage()
+    print(f"items:              {len(index)}")
+    print(f"segments:           {len(segments)}")
+    print(f"postings:           {postings}")
+    print(f"array bytes:        {arrays} ({arrays / max(postings, 1):.1f} B/posting)")
+    print(f"retained by index:  {retained} ({retained / max(len(index), 1):.1f} B/item)")
+    print(f"peak during fit:    {peak}")
+
+
+if __name__ == "__main__":
+    main()
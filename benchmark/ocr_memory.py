@@ -0,0 +1,78 @@
+"""Peak RSS of PDF rasterization (+ optional OCR) for different chunk sizes.
+
+Usage (from repo root; needs poppler, and tesseract for --ocr):
+    PYTHONPATH=item_search/app/src python -m benchmark.ocr_memory --pages 100 --chunks 1 4 100
+
+Each configuration runs in a fresh subprocess so ru_maxrss is its own peak.
+A chunk equal to the page count reproduces the old render-everything-first behaviour.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+
+def make_pdf(path: Path, pages: int) -> None:
+    def _page(i: int) -> Image.Image:
+        img = Image.new("L", (1240, 1754), color=255)  # A4 at 150 dpi
+        draw = ImageDraw.Draw(img)
+        for line in range(40):
+            draw.text((80, 80 + line * 40), f"Page {i + 1} line {line}: Bumaga A4 80 g/m2, SKU {i:04d}{line:02d}", fill=0)
+        return img
+
+    first = _page(0)
+    first.save(path, "PDF", resolution=150, save_all=True, append_images=(_page(i) for i in range(1, pages)))
+
+
+def _child(pdf: Path, chunk: int, dpi: int, ocr: bool) -> None:
+    from refine.parsers import ocr_parser
+
+    pages = 0
+    for images in ocr_parser._iter_pdf_page_chunks(pdf, chunk_pages=chunk, dpi=dpi):
+        if ocr:
+            ocr_parser._ocr_images_to_text(images)
+        pages += len(images)
+        for img in images:
+            img.close()
+        del images
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"pages": pages, "peak_mb": peak_kb / 1024.0}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OCR rasterization peak memory")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1, 4, 100])
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--ocr", action="store_true", help="Also run tesseract on each chunk")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--chunk", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(Path(args.child), args.chunk, args.dpi, args.ocr)
+        return
+
+    with tempfile.TemporaryDirectory() as d:
+        pdf = Path(d) / "synthetic.pdf"
+        make_pdf(pdf, args.pages)
+        print(f"{args.pages}-page PDF at {args.dpi} dpi")
+        print(f"{'chunk':>6} {'peak RSS, MB':>14}")
+        for chunk in args.chunks:
+            cmd = [sys.executable, "-m", "benchmark.ocr_memory", "--child", str(pdf), "--chunk", str(chunk), "--dpi", str(args.dpi)]
+            if args.ocr:
+                cmd.append("--ocr")
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            res = json.loads(out.strip().splitlines()[-1])
+            print(f"{chunk:>6} {res['peak_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
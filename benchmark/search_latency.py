@@ -0,0 +1,69 @@
+"""Per-query latency of the prepared (fit-once) search path vs catalog size.
+
+Usage (from repo root):
+    PYTHONPATH=item_search/app/src python -m benchmark.search_latency --sizes 1000 10000 50000
+
+Fails (exit code 1) when the slowest catalog is more than ``--max-ratio``
+times slower per query than the smallest one, i.e. when query latency starts
+scaling with the catalog again.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from typing import List
+
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.models import search, search_prepared
+from .synthetic import query_features, synthetic_reference
+
+
+def _avg_ms(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1000.0 / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search latency vs catalog size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    parser.add_argument("--engine", choices=CosineIndex.ENGINES, default="python")
+    parser.add_argument("--with-refit", action="store_true", help="Also time the legacy fit-per-query path")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    latencies: List[float] = []
+    print(f"{'items':>10} {'fit, s':>10} {'prepared, ms':>14} {'refit, ms':>12}")
+    for size in args.sizes:
+        reference = synthetic_reference(size)
+        picked = rng.sample(reference.items, k=min(args.queries, len(reference.items)))
+        queries = query_features([it.name for it in picked])
+
+        index = CosineIndex(engine=args.engine)
+        t0 = time.perf_counter()
+        index.fit(reference)
+        fit_s = time.perf_counter() - t0
+
+        it = iter(range(10**9))
+        prepared_ms = _avg_ms(lambda: search_prepared(queries[next(it) % len(queries)], index), len(queries))
+        latencies.append(prepared_ms)
+
+        refit = "-"
+        if args.with_refit:
+            refit_ms = _avg_ms(lambda: search(queries[0], reference, CosineIndex()), 3)
+            refit = f"{refit_ms:.2f}"
+        print(f"{size:>10} {fit_s:>10.2f} {prepared_ms:>14.3f} {refit:>12}")
+
+    ratio = max(latencies) / max(min(latencies), 1e-9)
+    print(f"max/min per-query latency ratio: {ratio:.2f} (limit {args.max_ratio})")
+    if ratio > args.max_ratio:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
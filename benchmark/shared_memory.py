@@ -0,0 +1,97 @@
+"""Memory of N worker processes serving one catalog: own build vs shared snapshot.
+
+Usage (from repo root, Linux):
+    PYTHONPATH=item_search/app/src python -m benchmark.shared_memory --items 100000 --procs 4
+
+Each child either builds the index in its own memory or maps the same
+snapshot file, runs a few searches to touch the postings, then reports its
+proportional set size (PSS, from /proc/self/smaps_rollup): pages shared by
+k processes count 1/k towards each, so the sum is the real total.
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .synthetic import query_features, write_synthetic_catalog
+
+
+def _pss_kb() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _child(mode: str, catalog: Path, snap: Path, ready: Path, go: Path) -> None:
+    from refine.searchers.ingest import iter_catalog_shards
+    from refine.searchers.segments import SegmentedIndex
+    from refine.searchers.snapshot import load_snapshot
+
+    if mode == "snapshot":
+        index = load_snapshot(snap)
+    else:
+        index = SegmentedIndex()
+        index.fit_shards(iter_catalog_shards([catalog], workers=1))
+    for q in query_features([f"Товар {i}" for i in range(0, 2000, 50)]):
+        index.search(q)
+    # measure only once every process holds its index, so sharing is visible
+    ready.with_name(ready.name + f".{mode}").touch()
+    while not go.exists():
+        time.sleep(0.05)
+    print(_pss_kb())
+
+
+def _run(mode: str, procs: int, catalog: Path, snap: Path, tmp: Path) -> list:
+    go = tmp / f"go.{mode}"
+    children = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmark.shared_memory", "--child", mode, str(catalog), str(snap), str(tmp / f"ready{i}"), str(go)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for i in range(procs)
+    ]
+    while sum((tmp / f"ready{i}.{mode}").exists() for i in range(procs)) < procs:
+        time.sleep(0.05)
+    go.touch()
+    return [int(c.communicate()[0].split()[-1]) for c in children]
+
+
+def main() -> None:
+    if "--child" in sys.argv:
+        i = sys.argv.index("--child")
+        mode, catalog, snap, ready, go = sys.argv[i + 1 : i + 6]
+        _child(mode, Path(catalog), Path(snap), Path(ready), Path(go))
+        return
+
+    parser = argparse.ArgumentParser(description="Per-process vs shared index memory")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--procs", type=int, default=4)
+    args = parser.parse_args()
+
+    from refine.searchers.ingest import iter_catalog_shards
+    from refine.searchers.segments import SegmentedIndex
+    from refine.searchers.snapshot import save_snapshot
+
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        catalog, snap = tmp / "catalog.jsonl", tmp / "catalog.idx"
+        write_synthetic_catalog(catalog, args.items)
+        index = SegmentedIndex()
+        index.fit_shards(iter_catalog_shards([catalog], workers=1))
+        save_snapshot(index, snap)
+        print(f"{args.items} items, snapshot {snap.stat().st_size / 2**20:.1f} MB, {args.procs} processes")
+        print(f"{'mode':>10} {'PSS/proc MB':>12} {'total MB':>9}")
+        for mode in ("build", "snapshot"):
+            pss = _run(mode, args.procs, catalog, snap, tmp)
+            print(f"{mode:>10} {sum(pss) / len(pss) / 1024:>12.1f} {sum(pss) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
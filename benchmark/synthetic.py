@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+from typing import List
+
+from refine.parsers.models import ParseOutput
+from refine.parsers.tabular_parser import parse_tabular
+from refine.extractors.features import extract_features
+from refine.extractors.models import ItemFeatures
+from .test_sets.generate_fold import CatalogItem, make_catalog, write_catalog_jsonl
+
+
+def write_synthetic_catalog(path: Path, num_items: int, seed: int = 42) -> List[CatalogItem]:
+    """Write a synthetic catalog.jsonl (same generator as the benchmark folds)."""
+    items = make_catalog(num_items, random.Random(seed))
+    write_catalog_jsonl(items, path)
+    return items
+
+
+def synthetic_reference(num_items: int, seed: int = 42) -> ItemFeatures:
+    """Build reference features through the same path as CatalogManager.warmup."""
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "catalog.jsonl"
+        write_synthetic_catalog(path, num_items, seed)
+        return extract_features(parse_tabular(path))
+
+
+def query_features(texts: List[str]) -> List[ItemFeatures]:
+    return [extract_features(ParseOutput(source_path=Path("<inline>"), pages_text=[t])) for t in texts]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic catalog.jsonl")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--items", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write_synthetic_catalog(args.path, args.items, args.seed)
+    print(f"{args.items} items written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
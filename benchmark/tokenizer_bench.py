@@ -0,0 +1,96 @@
+"""Tokenization cost: legacy function chain vs the precompiled Tokenizer.
+
+Usage (from repo root):
+    PYTHONPATH=item_search/app/src python -m benchmark.tokenizer_bench --items 1000000
+
+Row texts are the raw strings warmup hands to the tokenizer (name, sku,
+price and attrs joined, before any normalization). Reports tokenize-only throughput, the memo on repeated
+queries, and the end-to-end warmup feature extraction time with each
+tokenizer; token output is checked to be identical.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from .synthetic import write_synthetic_catalog
+
+
+class _Legacy:
+    """The pre-Tokenizer chain, as feature extraction used to call it."""
+
+    def tokenize(self, text: str) -> Tuple[str, List[str]]:
+        from refine.utils import filter_stopwords, normalize_numbers, normalize_text, simple_tokenize
+
+        text_repr = normalize_numbers(normalize_text(text))
+        return text_repr, filter_stopwords(simple_tokenize(text_repr))
+
+
+class _Recorder:
+    """Keeps the raw text of every tokenize call; tokenizes nothing."""
+
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+
+    def tokenize(self, text: str) -> Tuple[str, List[str]]:
+        self.texts.append(text)
+        return text, []
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def _extract(path: Path, tokenizer) -> Tuple[list, float]:
+    from refine.extractors import features
+    from refine.parsers.tabular_parser import iter_rows
+
+    saved = features._item_tokenizer
+    features._item_tokenizer = tokenizer
+    try:
+        return _timed(lambda: [f.tokens for f in features.iter_row_features(iter_rows(path))])
+    finally:
+        features._item_tokenizer = saved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tokenizer throughput")
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200_000)
+    args = parser.parse_args()
+
+    from refine.utils import Tokenizer
+
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "catalog.jsonl"
+        write_synthetic_catalog(path, args.items)
+        recorder = _Recorder()
+        _extract(path, recorder)
+        texts = recorder.texts
+        legacy, fast = _Legacy(), Tokenizer()
+
+        old, old_s = _timed(lambda: [legacy.tokenize(t) for t in texts])
+        new, new_s = _timed(lambda: [fast.tokenize(t) for t in texts])
+        print(f"{args.items} rows, tokenize only")
+        print(f"  legacy    {old_s:7.2f}s  {args.items / old_s:>10,.0f} rows/s")
+        print(f"  Tokenizer {new_s:7.2f}s  {args.items / new_s:>10,.0f} rows/s  x{old_s / new_s:.2f}  identical={old == new}")
+        del old, new, texts
+
+        queries = [f"бумага a4 {i % 500} листов" for i in range(args.queries)]
+        memo = Tokenizer(cache_size=10_000)
+        _, plain_s = _timed(lambda: [fast.tokenize(q) for q in queries])
+        _, memo_s = _timed(lambda: [memo.tokenize(q) for q in queries])
+        print(f"{args.queries} queries (500 distinct): plain {plain_s:.2f}s, memo {memo_s:.2f}s ({memo.hits} hits)")
+
+        old_tokens, old_s = _extract(path, legacy)
+        new_tokens, new_s = _extract(path, fast)
+        print(f"warmup feature extraction: legacy {old_s:.2f}s, Tokenizer {new_s:.2f}s, identical={old_tokens == new_tokens}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Peak RSS and wall time of catalog warmup: materialized vs streaming ingestion.
+
+Usage (from repo root):
+    PYTHONPATH=item_search/app/src python -m benchmark.warmup_memory --items 200000
+
+"materialized" is the old path (parse_tabular -> extract_features -> fit);
+"streaming" is the warmup path: ingest.iter_catalog_shards -> SegmentedIndex.fit_shards.
+Each mode runs in a fresh subprocess so ru_maxrss is its own peak.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .synthetic import write_synthetic_catalog
+
+MODES = ("materialized", "streaming")
+
+
+def _child(path: Path, mode: str, limit: int) -> None:
+    from refine.parsers.tabular_parser import parse_tabular
+    from refine.extractors.features import extract_features
+    from refine.extractors.models import ItemFeatures
+    from refine.searchers.cosine_index import CosineIndex
+    from refine.searchers.ingest import iter_catalog_shards
+    from refine.searchers.segments import SegmentedIndex
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if mode == "materialized":
+        items = extract_features(parse_tabular(path)).items
+        if limit > 0:
+            items = items[:limit]
+        index = CosineIndex()
+        index.fit(ItemFeatures(items=items))
+    else:
+        index = SegmentedIndex()
+        index.fit_shards(iter_catalog_shards([path], limit or None))
+    seconds = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"items": len(index), "seconds": seconds, "peak_mb": peak_kb / 1024.0, "baseline_mb": baseline_kb / 1024.0}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Warmup peak memory")
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=0, help="limit_items passed to warmup (0 = all)")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", type=str, default="streaming", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(Path(args.child), args.mode, args.limit)
+        return
+
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "catalog.jsonl"
+        write_synthetic_catalog(path, args.items)
+        print(f"{args.items} items ({path.stat().st_size / 2**20:.1f} MB jsonl), limit={args.limit or 'none'}")
+        print(f"{'mode':>13} {'items':>8} {'seconds':>8} {'peak RSS, MB':>13} {'over import, MB':>16}")
+        for mode in MODES:
+            cmd = [sys.executable, "-m", "benchmark.warmup_memory", "--child", str(path), "--mode", mode, "--limit", str(args.limit)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            res = json.loads(out.strip().splitlines()[-1])
+            print(f"{mode:>13} {res['items']:>8} {res['seconds']:>8.2f} {res['peak_mb']:>13.1f} {res['peak_mb'] - res['baseline_mb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Warmup index build time: serial vs parallel feature extraction.
+
+Usage (from repo root):
+    PYTHONPATH=item_search/app/src python -m benchmark.warmup_parallel --items 200000 --workers 1 2 4
+
+Each worker count builds the index from the same synthetic catalog via
+iter_catalog_shards + SegmentedIndex.fit_shards; results are checked to
+be identical to the serial (workers=1) build.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .synthetic import write_synthetic_catalog
+
+
+def _build(path: Path, workers: int, shard_rows: int):
+    from refine.searchers.ingest import iter_catalog_shards
+    from refine.searchers.segments import SegmentedIndex
+
+    index = SegmentedIndex()
+    t0 = time.perf_counter()
+    index.fit_shards(iter_catalog_shards([path], workers=workers, shard_rows=shard_rows, parallel_min_bytes=0))
+    return index, time.perf_counter() - t0
+
+
+def _same(a, b) -> bool:
+    if a._vocab != b._vocab or len(a.segments) != len(b.segments):
+        return False
+    return all(
+        np.array_equal(x._postings.doc_ids, y._postings.doc_ids)
+        and np.array_equal(x._postings.weights, y._postings.weights)
+        and np.array_equal(x._doc_norms, y._doc_norms)
+        and list(x._docs.ids) == list(y._docs.ids)
+        for x, y in zip(a.segments, b.segments)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parallel warmup extraction")
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--shard-rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "catalog.jsonl"
+        write_synthetic_catalog(path, args.items)
+        print(f"{args.items} items ({path.stat().st_size / 2**20:.1f} MB jsonl), {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8} {'identical':>10}")
+        serial, serial_s = _build(path, 1, args.shard_rows)
+        print(f"{1:>8} {serial_s:>8.2f} {1.0:>8.2f} {'-':>10}")
+        for workers in args.workers:
+            if workers == 1:
+                continue
+            index, seconds = _build(path, workers, args.shard_rows)
+            print(f"{workers:>8} {seconds:>8.2f} {serial_s / seconds:>8.2f} {str(_same(serial, index)):>10}")
+
+
+if __name__ == "__main__":
+    main()
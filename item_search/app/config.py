@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 
@@ -7,12 +8,32 @@ from pathlib import Path
 APP_ROOT = Path(__file__).resolve().parent
 SRC_ROOT = APP_ROOT / "src"
 CATALOGUES_ROOT = SRC_ROOT / "catalogues"
+# Fitted index snapshots (must be writable; catalogues may be mounted read-only)
+SNAPSHOTS_ROOT = Path(os.getenv("SNAPSHOT_DIR", str(SRC_ROOT / "snapshots")))
+# Parsed uploads keyed by content hash
+UPLOAD_CACHE_ROOT = Path(os.getenv("UPLOAD_CACHE_DIR", str(SRC_ROOT / "upload_cache")))
 
 
 # Limits
-MAX_LOADED_CATALOGS = 3
+# Resident catalogs: least recently used ones are unloaded past the byte budget
+# or count (0 = no limit) and reloaded from their snapshot on next access
+CATALOG_MEMORY_BUDGET_BYTES = int(os.getenv("CATALOG_MEMORY_BUDGET_MB", "4096")) * 1024 * 1024
+MAX_RESIDENT_CATALOGS = int(os.getenv("MAX_RESIDENT_CATALOGS", "0"))
 SEARCH_CACHE_SIZE = 2000
 SEARCH_CACHE_TTL_SEC = 900
+SNAPSHOTS_ENABLED = True
+# How often a worker process checks for a catalog snapshot rewritten by another worker
+SHARED_REFRESH_SEC = float(os.getenv("SHARED_REFRESH_SEC", "1.0"))
+UPLOAD_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 0 disables
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", "50")) * 1024 * 1024  # larger uploads get 413; 0 disables
+# Request pools: searches and uploads (parse/OCR + features) run on separate
+# threads; past workers + queue requests in flight a pool answers 503
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+SEARCH_QUEUE_MAX = int(os.getenv("SEARCH_QUEUE_MAX", "64"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+UPLOAD_QUEUE_MAX = int(os.getenv("UPLOAD_QUEUE_MAX", "4"))
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "2"))  # warmup jobs built concurrently
+WARMUP_JOBS_KEEP = 100  # finished warmup jobs kept for status queries
 
 
 # Defaults (proxy to refine defaults if needed at runtime)
@@ -1,55 +1,200 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
-import tempfile
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Optional, Tuple
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 
+from item_search.app.config import (
+    SEARCH_QUEUE_MAX,
+    SEARCH_WORKERS,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_QUEUE_MAX,
+    UPLOAD_WORKERS,
+)
 from item_search.app.models import (
     WarmupRequest,
     WarmupResponse,
+    WarmupFileDTO,
+    WarmupProgressDTO,
     SearchRequest,
     SearchResponse,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    ItemsUpsertRequest,
+    ItemsDeleteRequest,
+    ItemsUpdateResponse,
     MatchDTO,
 )
+from item_search.app.services.body_limit import BodySizeLimit
 from item_search.app.services.catalog_manager import CatalogManager
+from item_search.app.services.catalog_registry import CatalogBuilding, CatalogNotLoaded
+from item_search.app.services.executors import BoundedExecutor, Overloaded
 from item_search.app.services.ocr import parse_any
 from item_search.app.services.search_service import run_vector_search
+from item_search.app.services.upload_cache import UploadCache
+from item_search.app.services.warmup_jobs import WarmupConflict, WarmupJob, WarmupJobs
 from item_search.app.src.refine.extractors.features import extract_features
+from item_search.app.src.refine.extractors.models import ItemFeatures
+from item_search.app.src.refine.parsers.models import ParseOutput
 
 
-app = FastAPI(title="Item Search Service", version="0.1.0")
 manager = CatalogManager()
+upload_cache = UploadCache()
+warmups = WarmupJobs(manager)
+# uploads (parsing, OCR) and searches get their own pools, so heavy uploads
+# cannot hold up text searches and the event loop only awaits results
+search_pool = BoundedExecutor("search", SEARCH_WORKERS, SEARCH_QUEUE_MAX)
+upload_pool = BoundedExecutor("upload", UPLOAD_WORKERS, UPLOAD_QUEUE_MAX)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    warmups.shutdown()  # running builds stop at their next shard
+    search_pool.shutdown()
+    upload_pool.shutdown()
+
+
+app = FastAPI(title="Item Search Service", version="0.1.0", lifespan=lifespan)
+app.add_middleware(BodySizeLimit, max_bytes=UPLOAD_MAX_BYTES, paths=("/search/file", "/parse/file"))
+
+
+@app.exception_handler(CatalogNotLoaded)
+async def catalog_not_loaded(_: Request, exc: CatalogNotLoaded) -> JSONResponse:
+    # unknown or evicted past reloading; checked on the pools, off the event loop
+    return JSONResponse(status_code=400, content={"detail": "Catalog is not warmed up. Call /warmup first."})
+
+
+@app.exception_handler(CatalogBuilding)
+async def catalog_building(_: Request, exc: CatalogBuilding) -> JSONResponse:
+    # an evicted catalog is rebuilt by a background warmup job; /readyz tracks it
+    return JSONResponse(status_code=503, content={"detail": "Catalog is being rebuilt.", "state": "building"}, headers={"Retry-After": "5"})
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(_: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 
 @app.get("/healthz")
-def healthz() -> Dict[str, str]:
+async def healthz() -> Dict[str, str]:
     return {"status": "ok"}
 
 
 @app.get("/readyz")
 def readyz(catalog_id: Optional[str] = None) -> Dict[str, Any]:
     if catalog_id is None:
-        return {"status": "ok", "loaded_catalogs": manager.loaded_catalogs()}
-    return {"status": "ok", "ready": manager.is_loaded(catalog_id)}
+        return {"status": "ok", "loaded_catalogs": manager.loaded_catalogs(), "catalogs": warmups.catalog_states()}
+    job = warmups.latest(catalog_id)
+    return {
+        "status": "ok",
+        "ready": manager.is_loaded(catalog_id),
+        "state": warmups.catalog_state(catalog_id),
+        "job": _job_response(job).model_dump() if job is not None else None,
+    }
+
+
+@app.get("/metrics")
+def metrics() -> Dict[str, Any]:
+    return {
+        "search_cache": manager.cache.stats(),
+        "upload_cache": upload_cache.stats(),
+        "catalogs": manager.index_stats(),
+        "registry": manager.registry_stats(),
+        "residency": manager.residency_stats(),
+        "warmup": warmups.stats(),
+        "executors": {"search": search_pool.stats(), "upload": upload_pool.stats()},
+    }
+
+
+def _job_response(job: WarmupJob) -> WarmupResponse:
+    result = job.result
+    return WarmupResponse(
+        status="ok" if job.state == "done" else job.state,
+        catalog_id=job.catalog_id,
+        items_indexed=result.items if result is not None else 0,
+        job_id=job.job_id,
+        state=job.state,
+        progress=WarmupProgressDTO(**job.progress.as_dict()),
+        error=job.error,
+        seconds=result.seconds if result is not None else 0.0,
+        from_snapshot=result.from_snapshot if result is not None else False,
+        files=[WarmupFileDTO(**f) for f in result.files] if result is not None else [],
+    )
 
 
 @app.post("/warmup", response_model=WarmupResponse)
-def warmup(req: WarmupRequest) -> WarmupResponse:
+async def warmup(req: WarmupRequest, response: Response) -> WarmupResponse:
+    """Start (or join) a background warmup; 202 with the job unless ``wait`` is set."""
     try:
-        items = manager.warmup(req.catalog_id, req.references, limit_items=req.limit_items)
+        job, _ = warmups.submit(req.catalog_id, req.references, limit_items=req.limit_items)
     except FileNotFoundError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return WarmupResponse(status="ok", catalog_id=req.catalog_id, items_indexed=items)
+    except WarmupConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if req.wait:
+        # the build runs on the warmup pool; this only parks a thread until it ends
+        await asyncio.get_running_loop().run_in_executor(None, job.wait)
+        if job.state == "failed":
+            raise HTTPException(status_code=500, detail=job.error)
+        if job.state == "cancelled":
+            raise HTTPException(status_code=409, detail=f"Warmup job {job.job_id} was cancelled")
+    response.status_code = 200 if job.state == "done" else 202
+    return _job_response(job)
+
+
+@app.get("/warmup/jobs/{job_id}", response_model=WarmupResponse)
+def warmup_job(job_id: str) -> WarmupResponse:
+    job = warmups.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown warmup job")
+    return _job_response(job)
+
+
+@app.delete("/warmup/jobs/{job_id}", response_model=WarmupResponse)
+def cancel_warmup_job(job_id: str) -> WarmupResponse:
+    job = warmups.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown warmup job")
+    return _job_response(job)
+
+
+def _update_items(update: Callable[[str, Any], int], catalog_id: str, arg: Any) -> ItemsUpdateResponse:
+    # runs on the search pool: featurizing rows and applying them is CPU work under admission control
+    affected = update(catalog_id, arg)
+    stats = manager.catalog_stats(catalog_id)
+    return ItemsUpdateResponse(
+        status="ok",
+        catalog_id=catalog_id,
+        affected=affected,
+        items_indexed=stats["items"],
+        delta_items=stats["delta_items"],
+    )
+
+
+@app.put("/catalogs/{catalog_id}/items", response_model=ItemsUpdateResponse)
+async def upsert_items(catalog_id: str, req: ItemsUpsertRequest) -> ItemsUpdateResponse:
+    try:
+        return await search_pool.run(_update_items, manager.upsert_items, catalog_id, req.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/catalogs/{catalog_id}/items", response_model=ItemsUpdateResponse)
+async def delete_items(catalog_id: str, req: ItemsDeleteRequest) -> ItemsUpdateResponse:
+    return await search_pool.run(_update_items, manager.delete_items, catalog_id, req.ids)
 
 
 @app.post("/search", response_model=SearchResponse)
-def search(req: SearchRequest) -> SearchResponse:
-    if not manager.is_loaded(req.catalog_id):
-        raise HTTPException(status_code=400, detail="Catalog is not warmed up. Call /warmup first.")
-    result = manager.search_text(
+async def search(req: SearchRequest) -> SearchResponse:
+    # an unknown catalog raises CatalogNotLoaded (400) from the pool; an evicted
+    # one is reloaded there, off the event loop
+    result = await search_pool.run(
+        manager.search_text,
         catalog_id=req.catalog_id,
         query_text=req.query_text,
         top_k=req.top_k,
@@ -65,6 +210,65 @@ def search(req: SearchRequest) -> SearchResponse:
     )
 
 
+@app.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(req: BatchSearchRequest) -> BatchSearchResponse:
+    results = await search_pool.run(
+        manager.search_texts,
+        catalog_id=req.catalog_id,
+        query_texts=req.query_texts,
+        top_k=req.top_k,
+        threshold=req.threshold,
+    )
+    return BatchSearchResponse(
+        catalog_id=req.catalog_id,
+        results=[
+            SearchResponse(
+                catalog_id=req.catalog_id,
+                query_text=text,
+                best_match_id=result["best_match_id"],
+                best_match_name=result.get("best_match_name"),
+                best_score=result["best_score"],
+                top_k=[MatchDTO(**m) for m in result["top_k"]],
+            )
+            for text, result in zip(req.query_texts, results)
+        ],
+    )
+
+
+def _parse_cached(upload: BinaryIO, filename: str, with_features: bool) -> Tuple[ParseOutput, Optional[ItemFeatures]]:
+    """Parse an upload, reusing the content-hash cache so repeated documents skip OCR.
+
+    ``upload`` is the spooled request file: it is hashed in chunks and
+    parsed in place, never copied into one bytes object.
+    """
+    name = Path(filename)
+    key = upload_cache.key_file(upload, name.suffix)
+
+    cached = upload_cache.get(key)
+    if cached is not None:
+        parsed, features = cached
+        if features is not None or not with_features:
+            return parsed, features
+    else:
+        parsed, features = parse_any(name, upload), None
+
+    if with_features:
+        features = extract_features(parsed)
+    upload_cache.put(key, parsed, features)
+    return parsed, features
+
+
+async def _parse_upload(file: UploadFile, with_features: bool) -> Tuple[ParseOutput, Optional[ItemFeatures]]:
+    return await upload_pool.run(_parse_cached, file.file, file.filename or "uploaded", with_features)
+
+
+def _search_features(catalog_id: str, query: ItemFeatures, top_k: Optional[int], threshold: Optional[float]) -> Dict[str, Any]:
+    # an unknown catalog raises CatalogNotLoaded (400) here, on the pool: the
+    # check may map a snapshot another process wrote
+    with manager.acquire(catalog_id) as lease:
+        return run_vector_search(query, lease.value.index, top_k, threshold)
+
+
 @app.post("/search/file", response_model=SearchResponse)
 async def search_file(
     catalog_id: str = Form(...),
@@ -72,50 +276,24 @@ async def search_file(
     top_k: Optional[int] = Form(None),
     threshold: Optional[float] = Form(None),
 ) -> SearchResponse:
-    if not manager.is_loaded(catalog_id):
-        raise HTTPException(status_code=400, detail="Catalog is not warmed up. Call /warmup first.")
-
-    # Save to temp and parse (cross-platform)
-    suffix = Path(file.filename or "uploaded").suffix
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        tmp.write(await file.read())
-        tmp_path = Path(tmp.name)
-
-    try:
-        parsed = parse_any(tmp_path)
-        query_features = extract_features(parsed)
-        state = manager._catalogs[catalog_id]  # internal access for performance
-        result = run_vector_search(query_features, state.corpus, state.index, top_k, threshold)
-        return SearchResponse(
-            catalog_id=catalog_id,
-            query_text=parsed.pages_text[0] if parsed.pages_text else "",
-            best_match_id=result["best_match_id"],
-            best_match_name=result.get("best_match_name"),
-            best_score=result["best_score"],
-            top_k=[MatchDTO(**m) for m in result["top_k"]],
-        )
-    finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+    parsed, query_features = await _parse_upload(file, with_features=True)
+    assert query_features is not None
+    result = await search_pool.run(_search_features, catalog_id, query_features, top_k, threshold)
+    return SearchResponse(
+        catalog_id=catalog_id,
+        query_text=parsed.pages_text[0] if parsed.pages_text else "",
+        best_match_id=result["best_match_id"],
+        best_match_name=result.get("best_match_name"),
+        best_score=result["best_score"],
+        top_k=[MatchDTO(**m) for m in result["top_k"]],
+    )
 
 
 @app.post("/parse/file")
 async def parse_file(file: UploadFile = File(...)) -> JSONResponse:
-    suffix = Path(file.filename or "uploaded").suffix
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        tmp.write(await file.read())
-        tmp_path = Path(tmp.name)
-    try:
-        parsed = parse_any(tmp_path)
-        return JSONResponse({
-            "pages": parsed.pages_text,
-            "tables": len(parsed.tables),
-            "source": str(parsed.source_path),
-        })
-    finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+    parsed, _ = await _parse_upload(file, with_features=False)
+    return JSONResponse({
+        "pages": parsed.pages_text,
+        "tables": len(parsed.tables),
+        "source": str(parsed.source_path),
+    })
@@ -9,12 +9,34 @@ class WarmupRequest(BaseModel):
     catalog_id: str = Field(..., description="Logical catalog identifier")
     references: List[str] = Field(..., description="Relative paths under src/catalogues/")
     limit_items: Optional[int] = Field(None, description="Optional cap on number of items to index for faster testing")
+    wait: bool = Field(False, description="Block until the warmup job finishes instead of returning 202 with the job")
+
+
+class WarmupFileDTO(BaseModel):
+    reference: str
+    items: int
+    read_seconds: float
+    extract_seconds: float
+
+
+class WarmupProgressDTO(BaseModel):
+    phase: str
+    rows_parsed: int
+    features_extracted: int
+    postings_built: int
 
 
 class WarmupResponse(BaseModel):
-    status: str
+    status: str  # "ok" once the index is installed, otherwise the job state
     catalog_id: str
     items_indexed: int
+    job_id: Optional[str] = None
+    state: str = "done"  # queued, running, done, failed, cancelled
+    progress: Optional[WarmupProgressDTO] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    from_snapshot: bool = False
+    files: List[WarmupFileDTO] = Field(default_factory=list, description="Per-reference timing; empty when loaded from a snapshot")
 
 
 class SearchRequest(BaseModel):
@@ -24,6 +46,29 @@ class SearchRequest(BaseModel):
     threshold: Optional[float] = None
 
 
+class BatchSearchRequest(BaseModel):
+    catalog_id: str
+    query_texts: List[str] = Field(..., description="Queries scored together in one index pass")
+    top_k: Optional[int] = None
+    threshold: Optional[float] = None
+
+
+class ItemsUpsertRequest(BaseModel):
+    items: List[Dict[str, Any]] = Field(..., description="Catalog rows (id, title, sku, price, brand, marketplace); 'id' is required")
+
+
+class ItemsDeleteRequest(BaseModel):
+    ids: List[str]
+
+
+class ItemsUpdateResponse(BaseModel):
+    status: str
+    catalog_id: str
+    affected: int
+    items_indexed: int
+    delta_items: int
+
+
 class MatchDTO(BaseModel):
     item_id: str
     score: float
@@ -39,3 +84,6 @@ class SearchResponse(BaseModel):
     top_k: List[MatchDTO]
 
 
+class BatchSearchResponse(BaseModel):
+    catalog_id: str
+    results: List[SearchResponse]
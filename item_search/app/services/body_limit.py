@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from fastapi import HTTPException
+
+
+Message = Dict[str, Any]
+ASGIApp = Callable[[Dict[str, Any], Callable[[], Awaitable[Message]], Callable[[Message], Awaitable[None]]], Awaitable[None]]
+
+
+class BodySizeLimit:
+    """ASGI middleware refusing request bodies over ``max_bytes`` on ``paths`` with 413.
+
+    A declared ``Content-Length`` is checked before anything is read;
+    otherwise the body is counted while it streams in, so an oversized
+    upload is cut off as soon as it crosses the limit instead of being
+    spooled completely first. ``max_bytes`` of 0 disables the check.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: Iterable[str]) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"Upload exceeds {self.max_bytes} bytes")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[[], Awaitable[Message]], send: Callable[[Message], Awaitable[None]]) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0 or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        received = 0
+
+        async def limited_receive() -> Message:
+            # raised from inside the body read, so the route's exception handling answers 413
+            nonlocal received
+            if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                raise self._too_large()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise self._too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
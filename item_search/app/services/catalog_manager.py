@@ -1,59 +1,487 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import re
+import threading
+import time
+from contextlib import ExitStack, closing, contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from item_search.app.config import CATALOGUES_ROOT, MAX_LOADED_CATALOGS
-from item_search.app.services.search_service import build_query_features, run_vector_search
+try:
+    import fcntl
+except ImportError:  # not POSIX: builds are not coordinated across processes
+    fcntl = None  # type: ignore[assignment]
 
-from item_search.app.src.refine.parsers.tabular_parser import parse_tabular
+from item_search.app.config import (
+    CATALOGUES_ROOT,
+    CATALOG_MEMORY_BUDGET_BYTES,
+    MAX_RESIDENT_CATALOGS,
+    SHARED_REFRESH_SEC,
+    SNAPSHOTS_ROOT,
+    SNAPSHOTS_ENABLED,
+)
+from item_search.app.services.catalog_registry import CatalogBuilding, CatalogNotLoaded, CatalogRegistry, CatalogVersion
+from item_search.app.services.residency import ResidencyManager, estimate_footprint
+from item_search.app.services.search_cache import SearchCache
+from item_search.app.services.search_service import build_query_features, run_vector_search, run_vector_search_batch
+
+from item_search.app.src.refine.parsers.models import ParseOutput
+from item_search.app.src.refine.parsers.tabular_parser import parsed_item_from_row
 from item_search.app.src.refine.extractors.features import extract_features
 from item_search.app.src.refine.extractors.models import ItemFeatures
-from item_search.app.src.refine.searchers.cosine_index import CosineIndex
+from item_search.app.src.refine.searchers.incremental import IncrementalIndex
+from item_search.app.src.refine.searchers.ingest import FileLoadStats, iter_catalog_shards
+from item_search.app.src.refine.searchers.segments import SegmentedIndex, ShardPostings
+from item_search.app.src.refine.searchers.snapshot import (
+    SnapshotError,
+    load_snapshot,
+    read_snapshot_extra,
+    save_snapshot,
+)
+
+
+# reload-and-lease tries for an evicted catalog that other admissions keep evicting
+_RELOAD_ATTEMPTS = 3
 
 
 @dataclass
 class CatalogState:
-    corpus: ItemFeatures
-    index: CosineIndex
+    index: IncrementalIndex
+    version: int = 0  # bumped on every warmup and update; part of the search cache key
+    dirty: bool = False  # has in-memory updates the snapshot lacks
+
+
+@dataclass
+class CatalogSpec:
+    """What a catalog was warmed from; kept while it is evicted so it can be reloaded."""
+
+    references: List[str]
+    limit_items: Optional[int]
+    fingerprint: Dict[str, Any]
+    snapshot: Optional[Path] = None  # snapshot of the installed build, if one was written
+    snapshot_id: Optional[Tuple[int, int]] = None  # (inode, mtime) of that snapshot file
+    checked_at: float = 0.0  # last look for a newer snapshot from another process
+
+
+@dataclass
+class WarmupResult:
+    items: int
+    seconds: float
+    from_snapshot: bool = False
+    files: List[Dict[str, Any]] = field(default_factory=list)  # per reference, empty for snapshots
+
+
+class WarmupCancelled(Exception):
+    pass
+
+
+@dataclass
+class WarmupProgress:
+    """Live counters of a warmup build, updated by the building thread."""
+
+    phase: str = "queued"  # queued, reading, indexing, snapshot, done
+    file_stats: List[FileLoadStats] = field(default_factory=list)
+    features_extracted: int = 0
+    postings_built: int = 0
+
+    @property
+    def rows_parsed(self) -> int:
+        return sum(st.items for st in self.file_stats)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "rows_parsed": self.rows_parsed,
+            "features_extracted": self.features_extracted,
+            "postings_built": self.postings_built,
+        }
+
+
+def _tracked(shards: Iterable[ShardPostings], progress: WarmupProgress, cancel: threading.Event) -> Iterator[ShardPostings]:
+    for shard in shards:
+        if cancel.is_set():
+            raise WarmupCancelled()
+        progress.features_extracted += len(shard.doc_ids)
+        progress.postings_built += len(shard.docs)
+        yield shard
+    progress.phase = "indexing"  # stream consumed; segments are finalized next
+
+
+def snapshot_path(catalog_id: str) -> Path:
+    safe = re.sub(r"[^\w.-]", "_", catalog_id)[:64]
+    digest = hashlib.sha1(catalog_id.encode("utf-8")).hexdigest()[:8]
+    return SNAPSHOTS_ROOT / f"{safe}-{digest}.idx"
+
+
+def _file_id(path: Path) -> Optional[Tuple[int, int]]:
+    # snapshots are replaced by rename, so a new build always has a new inode
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def _spec_from_snapshot(catalog_id: str, snap: Path) -> Optional[CatalogSpec]:
+    """Spec of a catalog warmed by another process, from its snapshot header."""
+    file_id = _file_id(snap)
+    extra = read_snapshot_extra(snap)
+    if extra.get("catalog_id") != catalog_id or "references" not in extra:
+        return None  # foreign file or written before specs were stored
+    return CatalogSpec(extra["references"], extra.get("limit_items"), extra["fingerprint"], snapshot=snap, snapshot_id=file_id)
+
+
+@contextmanager
+def _build_lock(snap: Path, cancel: threading.Event) -> Iterator[None]:
+    """Serialize warmups of one catalog across worker processes (flock on a side file).
+
+    The process that waited finds the snapshot just written and maps it
+    instead of building again.
+    """
+    if fcntl is None or not SNAPSHOTS_ENABLED:
+        yield
+        return
+    lock_path = snap.with_name(snap.name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        while True:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if cancel.is_set():
+                    raise WarmupCancelled()
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _fingerprint(paths: List[Path], limit_items: Optional[int]) -> Dict[str, Any]:
+    """Identify the catalog inputs a snapshot was built from."""
+    files = []
+    for p in paths:
+        st = p.stat()
+        files.append({"path": str(p), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+    return {"files": files, "limit_items": limit_items if limit_items and limit_items > 0 else None}
+
+
+def _cache_key(
+    catalog_id: str,
+    state: CatalogState,
+    query: ItemFeatures,
+    top_k: Optional[int],
+    threshold: Optional[float],
+) -> tuple:
+    # results depend only on the normalized tokens of each query window
+    tokens = tuple(tuple(it.tokens) for it in query.items)
+    # a background IDF refresh changes scores without a new version
+    return (catalog_id, state.version, state.index.generation, tokens, top_k, threshold)
 
 
 class CatalogManager:
-    def __init__(self) -> None:
-        self._catalogs: Dict[str, CatalogState] = {}
+    def __init__(
+        self,
+        budget_bytes: int = CATALOG_MEMORY_BUDGET_BYTES,
+        max_resident: int = MAX_RESIDENT_CATALOGS,
+    ) -> None:
+        self._registry: CatalogRegistry[CatalogState] = CatalogRegistry()
+        self._residency = ResidencyManager(budget_bytes, max_resident)
+        self._specs: Dict[str, CatalogSpec] = {}  # every warmed catalog, resident or not
+        self._reload_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.cache = SearchCache()
+        # schedules a background warmup (catalog_id, references, limit_items) for an
+        # evicted catalog that cannot come back from its snapshot; WarmupJobs sets it.
+        # Unset, such a catalog is rebuilt inline by the request that needs it
+        self.rebuild: Optional[Callable[[str, List[str], Optional[int]], Any]] = None
+
+    def _install(self, catalog_id: str, state: CatalogState, spec: CatalogSpec, reload: bool = False) -> None:
+        # atomic swap: searches already running keep the previous version,
+        # which is released once the last of them finishes
+        state.version = self._registry.next_version()
+        self._registry.install(catalog_id, state, version=state.version)
+        self._specs[catalog_id] = spec
+        self.cache.invalidate(catalog_id)
+        self._evict(self._residency.admit(catalog_id, estimate_footprint(state.index), self._evictable, reload=reload))
+
+    def _touch(self, catalog_id: str, state: CatalogState) -> None:
+        # index changed in place: retire cached results of the previous version
+        state.version = self._registry.next_version()
+        state.dirty = True
+        self.cache.invalidate(catalog_id)
+        self._evict(self._residency.resize(catalog_id, estimate_footprint(state.index), self._evictable))
+
+    def _evictable(self, catalog_id: str) -> bool:
+        # only catalogs that can come back unchanged from their snapshot
+        entry = self._registry.current(catalog_id)
+        spec = self._specs.get(catalog_id)
+        return entry is not None and not entry.value.dirty and spec is not None and spec.snapshot is not None
+
+    def _evict(self, victims: List[str]) -> None:
+        for catalog_id in victims:
+            if self._residency.is_resident(catalog_id):
+                continue  # re-installed meanwhile
+            # in-flight searches finish on the evicted version; it is released after them
+            self._registry.remove(catalog_id)
+            self.cache.invalidate(catalog_id)
+            print(f"Evicted catalog {catalog_id!r}.")
+
+    def _reload_lock(self, catalog_id: str) -> threading.Lock:
+        with self._lock:
+            return self._reload_locks.setdefault(catalog_id, threading.Lock())
+
+    def _reload(self, catalog_id: str, force: bool = False) -> bool:
+        """Bring an evicted (or, with ``force``, replaced) catalog back; call with its reload lock held.
+
+        Returns False when a rebuild was scheduled instead, i.e. the catalog
+        is not installed yet. Raises :class:`CatalogNotLoaded` when its
+        reference files are gone.
+        """
+        spec = self._specs.get(catalog_id)
+        if spec is None or (catalog_id in self._registry and not force):
+            return True
+        if spec.snapshot is not None:
+            try:
+                if read_snapshot_extra(spec.snapshot).get("fingerprint") == spec.fingerprint:
+                    print(f"Reloading catalog {catalog_id!r} from snapshot.")
+                    index = IncrementalIndex(load_snapshot(spec.snapshot))
+                    self._install(catalog_id, CatalogState(index=index), spec, reload=True)
+                    return True
+            except (OSError, SnapshotError) as e:
+                print(f"Snapshot of {catalog_id!r} unusable, rebuilding: {e}")
+        try:
+            if self.rebuild is None:
+                self.warmup(catalog_id, spec.references, spec.limit_items)
+                return True
+            # a full build takes minutes: never on a request thread
+            self.rebuild(catalog_id, spec.references, spec.limit_items)
+            return False
+        except FileNotFoundError as e:
+            print(f"Catalog {catalog_id!r} cannot be rebuilt: {e}")
+            raise CatalogNotLoaded(catalog_id)
+
+    def _refresh_shared(self, catalog_id: str) -> None:
+        """Pick up a catalog (re)warmed by another worker process through its snapshot.
+
+        Checked at most every ``SHARED_REFRESH_SEC`` per known catalog; a
+        resident catalog whose snapshot was replaced is swapped to the new
+        build, an unknown one is registered and mapped on first access.
+        """
+        if not SNAPSHOTS_ENABLED:
+            return
+        spec = self._specs.get(catalog_id)
+        now = time.monotonic()
+        if spec is not None:
+            if now - spec.checked_at < SHARED_REFRESH_SEC:
+                return
+            spec.checked_at = now
+        snap = snapshot_path(catalog_id)
+        file_id = _file_id(snap)
+        if file_id is None or (spec is not None and file_id == spec.snapshot_id):
+            return
+        try:
+            fresh = _spec_from_snapshot(catalog_id, snap)
+        except (OSError, SnapshotError):
+            return
+        if fresh is None:
+            return
+        fresh.checked_at = now
+        self._specs[catalog_id] = fresh
+        if catalog_id in self._registry:
+            print(f"Catalog {catalog_id!r} was re-warmed by another worker.")
+            with self._reload_lock(catalog_id):
+                self._reload(catalog_id, force=True)
+
+    @contextmanager
+    def acquire(self, catalog_id: str) -> Iterator[CatalogVersion[CatalogState]]:
+        """Lease the current version of a catalog, reloading it if it was evicted.
+
+        Raises :class:`CatalogNotLoaded` for catalogs that were never warmed
+        and :class:`CatalogBuilding` while an evicted catalog is rebuilt in
+        the background.
+        """
+        self._refresh_shared(catalog_id)
+        with ExitStack() as stack:
+            lease = self._lease(catalog_id, stack)
+            self._residency.touch(catalog_id)
+            yield lease
+
+    def _lease(self, catalog_id: str, stack: ExitStack) -> CatalogVersion[CatalogState]:
+        try:
+            return stack.enter_context(self._registry.lease(catalog_id))
+        except CatalogNotLoaded:
+            if catalog_id not in self._specs:
+                raise
+        with self._reload_lock(catalog_id):
+            # another admission may evict the catalog again before it is leased
+            for _ in range(_RELOAD_ATTEMPTS):
+                if not self._reload(catalog_id):
+                    raise CatalogBuilding(catalog_id)
+                try:
+                    return stack.enter_context(self._registry.lease(catalog_id))
+                except CatalogNotLoaded:
+                    continue
+        raise CatalogNotLoaded(catalog_id)
 
     def loaded_catalogs(self) -> List[str]:
-        return list(self._catalogs.keys())
+        """Warmed catalogs, including evicted ones and those warmed by other workers."""
+        if SNAPSHOTS_ENABLED and SNAPSHOTS_ROOT.is_dir():
+            for snap in SNAPSHOTS_ROOT.glob("*.idx"):
+                try:
+                    catalog_id = read_snapshot_extra(snap).get("catalog_id")
+                except (OSError, SnapshotError):
+                    continue
+                if isinstance(catalog_id, str) and snap == snapshot_path(catalog_id):
+                    self._refresh_shared(catalog_id)
+        return list(self._specs)
 
-    def is_loaded(self, catalog_id: str) -> bool:
-        return catalog_id in self._catalogs
+    def resident_catalogs(self) -> List[str]:
+        return self._registry.ids()
 
-    def warmup(self, catalog_id: str, references: List[str], limit_items: Optional[int] = None) -> int:
-        if len(self._catalogs) >= MAX_LOADED_CATALOGS and catalog_id not in self._catalogs:
-            raise RuntimeError("Max loaded catalogs reached")
+    def is_loaded(self, catalog_id: str) -> bool:
+        if catalog_id not in self._specs:
+            self._refresh_shared(catalog_id)
+        return catalog_id in self._specs
 
-        print("Warming up!")
-        ref_features_list: List[ItemFeatures] = []
+    def resolve_references(self, references: List[str]) -> List[Path]:
+        paths: List[Path] = []
         for rel in references:
             path = (CATALOGUES_ROOT / rel).resolve()
             if not path.exists():
                 raise FileNotFoundError(f"Reference not found: {path}")
+            paths.append(path)
+        return paths
 
-            parsed = parse_tabular(path)
-            ref_features_list.append(extract_features(parsed))
+    def warmup(
+        self,
+        catalog_id: str,
+        references: List[str],
+        limit_items: Optional[int] = None,
+        progress: Optional[WarmupProgress] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> WarmupResult:
+        """Build (or load from snapshot) and install a catalog index.
+
+        ``progress`` is updated as rows are read and indexed; setting
+        ``cancel`` aborts the build with :class:`WarmupCancelled` before the
+        new index is installed, leaving the previous one in place.
+        """
+        progress = progress if progress is not None else WarmupProgress()
+        cancel = cancel if cancel is not None else threading.Event()
+
+        print("Warming up!")
+        t0 = time.perf_counter()
+        progress.phase = "reading"
+        paths = self.resolve_references(references)
+
+        fingerprint = _fingerprint(paths, limit_items)
+        snap = snapshot_path(catalog_id)
+        # another worker process building the same catalog holds this lock; once
+        # it is released the fresh snapshot below is simply mapped
+        with _build_lock(snap, cancel):
+            if SNAPSHOTS_ENABLED and snap.exists():
+                try:
+                    if read_snapshot_extra(snap).get("fingerprint") == fingerprint:
+                        print("Loading snapshot.")
+                        index = load_snapshot(snap)
+                        if cancel.is_set():
+                            raise WarmupCancelled()
+                        progress.phase = "done"
+                        spec = CatalogSpec(list(references), limit_items, fingerprint, snapshot=snap, snapshot_id=_file_id(snap))
+                        self._install(catalog_id, CatalogState(index=IncrementalIndex(index)), spec)
+                        return WarmupResult(items=len(index), seconds=time.perf_counter() - t0, from_snapshot=True)
+                except (OSError, SnapshotError) as e:
+                    print(f"Snapshot ignored, rebuilding: {e}")
+
+            print("Indexing items.")
+            # files are read ahead concurrently and rows stream in shards, featurized
+            # on worker processes for large references; reading stops at limit_items
+            index = SegmentedIndex()
+            # closing: a cancelled build stops the readers and worker processes at once
+            with closing(iter_catalog_shards(paths, limit_items, file_stats=progress.file_stats)) as shards:
+                index.fit_shards(_tracked(shards, progress, cancel))
+            if cancel.is_set():
+                raise WarmupCancelled()
+
+            spec = CatalogSpec(list(references), limit_items, fingerprint)
+            if SNAPSHOTS_ENABLED:
+                progress.phase = "snapshot"
+                try:
+                    extra = {
+                        "catalog_id": catalog_id,
+                        "fingerprint": fingerprint,
+                        "references": list(references),
+                        "limit_items": limit_items,
+                    }
+                    save_snapshot(index, snap, extra=extra)
+                    spec.snapshot, spec.snapshot_id = snap, _file_id(snap)
+                except OSError as e:
+                    print(f"Snapshot not written (catalog stays resident): {e}")
+                else:
+                    # serve the mapped file like the other workers do; the heap-built
+                    # postings are freed once the local reference goes
+                    try:
+                        index = load_snapshot(snap)
+                    except (OSError, SnapshotError) as e:
+                        print(f"Snapshot not mapped, serving the built index: {e}")
+
+            progress.phase = "done"
+            self._install(catalog_id, CatalogState(index=IncrementalIndex(index)), spec)
+            files = [
+                {
+                    "reference": rel,
+                    "items": st.items,
+                    "read_seconds": st.read_seconds,
+                    "extract_seconds": st.extract_seconds,
+                }
+                for rel, st in zip(references, progress.file_stats)
+            ]
+            return WarmupResult(items=len(index), seconds=time.perf_counter() - t0, files=files)
 
-        print("Merging items.")
-        items = [it for rf in ref_features_list for it in rf.items]
-        if limit_items is not None and limit_items > 0:
-            items = items[:limit_items]
+    def upsert_items(self, catalog_id: str, rows: List[Dict[str, Any]]) -> int:
+        """Add or replace catalog rows (same fields as reference files) by their ``id``.
 
-        merged_ref = ItemFeatures(items=items)
-        index = CosineIndex()
-        index.fit(merged_ref)
+        Updates live in memory only: the next warmup from files drops them.
+        """
+        if any(r.get("id") is None for r in rows):
+            raise ValueError("Every item needs an 'id'")
+        parsed = ParseOutput(source_path=Path("<update>"), items_raw=[parsed_item_from_row(r) for r in rows])
+        features = extract_features(parsed)
+        with self.acquire(catalog_id) as lease:
+            count = lease.value.index.upsert(features.items)
+            self._touch(catalog_id, lease.value)
+        return count
 
-        self._catalogs[catalog_id] = CatalogState(corpus=merged_ref, index=index)
-        return len(merged_ref.items)
+    def delete_items(self, catalog_id: str, ids: List[str]) -> int:
+        with self.acquire(catalog_id) as lease:
+            removed = lease.value.index.delete(ids)
+            if removed:
+                self._touch(catalog_id, lease.value)
+        return removed
+
+    def catalog_stats(self, catalog_id: str) -> Dict[str, Any]:
+        with self.acquire(catalog_id) as lease:
+            # updates bump the catalog's own version, not the registry entry's
+            return {**lease.value.index.stats(), "version": lease.value.version}
+
+    def index_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        for cid in self._registry.ids():
+            try:
+                stats[cid] = self.catalog_stats(cid)
+            except CatalogNotLoaded:
+                continue
+        return stats
+
+    def registry_stats(self) -> Dict[str, Any]:
+        return self._registry.stats()
+
+    def residency_stats(self) -> Dict[str, Any]:
+        return self._residency.stats()
 
     def search_text(
         self,
@@ -62,11 +490,35 @@ class CatalogManager:
         top_k: Optional[int] = None,
         threshold: Optional[float] = None,
     ) -> Dict[str, Any]:
-        if catalog_id not in self._catalogs:
-            raise RuntimeError("Catalog not loaded")
-            
         query_features = build_query_features(query_text)
-        state = self._catalogs[catalog_id]
-        return run_vector_search(query_features, state.corpus, state.index, top_k, threshold)
+        with self.acquire(catalog_id) as lease:
+            state = lease.value
+            key = _cache_key(catalog_id, state, query_features, top_k, threshold)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            result = run_vector_search(query_features, state.index, top_k, threshold)
+        self.cache.put(key, result)
+        return result
 
+    def search_texts(
+        self,
+        catalog_id: str,
+        query_texts: List[str],
+        top_k: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        queries = [build_query_features(text) for text in query_texts]
+        with self.acquire(catalog_id) as lease:
+            state = lease.value
+            keys = [_cache_key(catalog_id, state, q, top_k, threshold) for q in queries]
+            results: List[Optional[Dict[str, Any]]] = [self.cache.get(k) for k in keys]
 
+            # only cache misses go to the index, still as a single batch
+            missing = [i for i, r in enumerate(results) if r is None]
+            if missing:
+                fresh = run_vector_search_batch([queries[i] for i in missing], state.index, top_k, threshold)
+                for i, r in zip(missing, fresh):
+                    self.cache.put(keys[i], r)
+                    results[i] = r
+        return [r for r in results if r is not None]
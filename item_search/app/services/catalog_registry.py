@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import itertools
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class CatalogNotLoaded(RuntimeError):
+    def __init__(self, catalog_id: str) -> None:
+        super().__init__("Catalog not loaded")
+        self.catalog_id = catalog_id
+
+
+class CatalogBuilding(RuntimeError):
+    """An evicted catalog is being rebuilt in the background; retry later."""
+
+    def __init__(self, catalog_id: str) -> None:
+        super().__init__("Catalog is being rebuilt")
+        self.catalog_id = catalog_id
+
+
+@dataclass(eq=False)
+class CatalogVersion(Generic[T]):
+    """One installed build of a catalog; ``refs`` counts searches still using it."""
+
+    catalog_id: str
+    version: int
+    value: T
+    refs: int = 0
+    retired: bool = False
+    released: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+class CatalogRegistry(Generic[T]):
+    """Versioned catalog map with atomic swap and refcounted release.
+
+    Readers lease the current version for the duration of a request; a new
+    version is built elsewhere and installed with a single swap under the
+    lock, so searches never wait on a build. A replaced version is retired
+    and released (``on_release`` called, registry reference dropped) once
+    its last lease ends. The lock is only held for dict lookups and counter
+    updates.
+    """
+
+    def __init__(self, on_release: Optional[Callable[[CatalogVersion[T]], None]] = None) -> None:
+        self._lock = threading.Lock()
+        self._current: Dict[str, CatalogVersion[T]] = {}
+        self._retired: List[CatalogVersion[T]] = []  # replaced, still leased
+        self._versions = itertools.count(1)
+        self._on_release = on_release
+        self._swaps = 0
+        self._released = 0
+
+    def __contains__(self, catalog_id: object) -> bool:
+        return catalog_id in self._current
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._current)
+
+    def next_version(self) -> int:
+        """Allocate a version number (also used for in-place updates of a version)."""
+        return next(self._versions)
+
+    def current(self, catalog_id: str) -> Optional[CatalogVersion[T]]:
+        return self._current.get(catalog_id)
+
+    def install(self, catalog_id: str, value: T, version: Optional[int] = None) -> CatalogVersion[T]:
+        """Make ``value`` the catalog's current version; the previous one is retired."""
+        with self._lock:
+            entry = CatalogVersion(catalog_id, version if version is not None else self.next_version(), value)
+            old = self._current.get(catalog_id)
+            self._current[catalog_id] = entry
+            if old is not None:
+                self._swaps += 1
+                to_release = self._retire_locked(old)
+            else:
+                to_release = None
+        if to_release is not None:
+            self._release(to_release)
+        return entry
+
+    def remove(self, catalog_id: str) -> Optional[CatalogVersion[T]]:
+        with self._lock:
+            old = self._current.pop(catalog_id, None)
+            to_release = self._retire_locked(old) if old is not None else None
+        if to_release is not None:
+            self._release(to_release)
+        return old
+
+    def _retire_locked(self, entry: CatalogVersion[T]) -> Optional[CatalogVersion[T]]:
+        entry.retired = True
+        if entry.refs == 0:
+            return entry
+        self._retired.append(entry)
+        return None
+
+    @contextmanager
+    def lease(self, catalog_id: str) -> Iterator[CatalogVersion[T]]:
+        """Pin the current version of ``catalog_id`` for the duration of the block.
+
+        Raises :class:`CatalogNotLoaded` when the catalog is not loaded.
+        """
+        with self._lock:
+            entry = self._current.get(catalog_id)
+            if entry is None:
+                raise CatalogNotLoaded(catalog_id)
+            entry.refs += 1
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry.refs -= 1
+                done = entry.retired and entry.refs == 0
+                if done:
+                    self._retired.remove(entry)
+            if done:
+                self._release(entry)
+
+    def _release(self, entry: CatalogVersion[T]) -> None:
+        with self._lock:
+            self._released += 1
+        if self._on_release is not None:
+            self._on_release(entry)
+        entry.value = None  # type: ignore[assignment]  # last reference to the index goes here
+        entry.released.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "versions": {cid: {"version": e.version, "leases": e.refs} for cid, e in self._current.items()},
+                "retired_in_use": len(self._retired),
+                "swaps": self._swaps,
+                "released": self._released,
+            }
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+
+T = TypeVar("T")
+
+
+class Overloaded(RuntimeError):
+    """The pool already has ``max_pending`` tasks running or queued."""
+
+    def __init__(self, name: str, max_pending: int) -> None:
+        super().__init__(f"{name} pool is busy ({max_pending} requests in flight)")
+        self.name = name
+
+
+class BoundedExecutor:
+    """Thread pool with a cap on running + queued tasks, awaitable from the event loop.
+
+    CPU-bound request work (parsing, feature extraction, scoring) runs here
+    instead of on the event loop or Starlette's shared threadpool, so one
+    kind of request cannot starve another; past ``workers + max_queue``
+    tasks new ones are refused with :class:`Overloaded` instead of piling up.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise Overloaded(self.name, self.max_pending)
+            self._pending += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _: Any) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, List, Optional
 
 from item_search.app.src.refine.parsers.ocr_parser import parse_ocr
 from item_search.app.src.refine.parsers.docx_parser import parse_docx
@@ -9,20 +9,26 @@ from item_search.app.src.refine.parsers.odt_parser import parse_odt
 from item_search.app.src.refine.parsers.models import ParseOutput
 
 
-def parse_any(path: Path) -> ParseOutput:
+def parse_any(path: Path, fileobj: Optional[BinaryIO] = None) -> ParseOutput:
+    """Parse by file suffix; with ``fileobj`` (e.g. an upload) nothing is read from ``path``.
+
+    DOCX, ODT, TXT and images are parsed straight from the stream; only
+    PDFs are written to a temp file, for poppler.
+    """
     suf = path.suffix.lower()
     if suf in (".jpg", ".jpeg", ".png"):
-        return parse_ocr(path)
+        return parse_ocr(path, fileobj)
     if suf == ".pdf":
-        return parse_ocr(path)
+        return parse_ocr(path, fileobj)
     if suf == ".docx":
-        return parse_docx(path)
+        return parse_docx(path, fileobj)
     if suf == ".odt":
-        return parse_odt(path)
+        return parse_odt(path, fileobj)
     if suf == ".txt":
-        text = Path(path).read_text(encoding="utf-8", errors="ignore")
+        if fileobj is not None:
+            text = fileobj.read().decode("utf-8", errors="ignore")
+        else:
+            text = Path(path).read_text(encoding="utf-8", errors="ignore")
         return ParseOutput(source_path=path, pages_text=[text])
     # default to OCR
-    return parse_ocr(path)
-
-
+    return parse_ocr(path, fileobj)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import mmap
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+
+from item_search.app.src.refine.searchers.cosine_index import CosineIndex
+from item_search.app.src.refine.searchers.incremental import IncrementalIndex
+
+
+_VOCAB_ENTRY_BYTES = 120  # dict slot + short str key + int
+
+
+def _is_mapped(array: Any) -> bool:
+    """Whether an array is a view into an mmap'd file (through ndarray/memoryview bases)."""
+    owner = array
+    while owner is not None:
+        if isinstance(owner, mmap.mmap):
+            return True
+        owner = owner.base if isinstance(owner, np.ndarray) else getattr(owner, "obj", None)
+    return False
+
+
+def _segment_arrays(seg: CosineIndex) -> Iterator[np.ndarray]:
+    p = seg._postings
+    yield from (p.offsets, p.doc_ids, p.weights, seg._doc_norms)
+    yield from seg._docs.columns().values()
+
+
+def _segment_heap_bytes(seg: CosineIndex) -> int:
+    arrays = sum(int(a.nbytes) for a in _segment_arrays(seg) if not _is_mapped(a))
+    return arrays + sum(len(m) for m in seg._docs.marketplaces)
+
+
+def estimate_footprint(index: IncrementalIndex) -> int:
+    """Approximate heap bytes owned by a catalog index.
+
+    Arrays mapped from a snapshot are not counted: their pages live in the
+    shared page cache, which the kernel reclaims on its own, and unloading
+    the catalog would not give them back to this process. Heap arrays
+    (indexes built in memory, segments rewritten by merges, the update
+    delta) are counted exactly; the vocabulary is a dict of Python strings,
+    estimated with a per-term constant.
+    """
+    base = index.base
+    nbytes = sum(_segment_heap_bytes(seg) for seg in base.segments)
+    idf = base._idf
+    nbytes += 0 if isinstance(idf, np.ndarray) and _is_mapped(idf) else 8 * len(idf)
+    delta = index._view.delta
+    if delta is not None:
+        nbytes += delta.memory_usage()
+    return int(nbytes + len(index._view.vocab) * _VOCAB_ENTRY_BYTES)
+
+
+class ResidencyManager:
+    """LRU bookkeeping of resident catalogs under a byte budget.
+
+    The manager only decides; the caller unloads the victims it returns.
+    Catalogs for which ``evictable`` is false (no usable snapshot, unsaved
+    updates) are never chosen, so the budget can be exceeded when nothing
+    else is left to evict. ``budget_bytes`` or ``max_catalogs`` of 0 means
+    no limit.
+    """
+
+    def __init__(self, budget_bytes: int, max_catalogs: int = 0) -> None:
+        self.budget_bytes = budget_bytes
+        self.max_catalogs = max_catalogs
+        self._lock = threading.Lock()
+        self._resident: "OrderedDict[str, int]" = OrderedDict()  # catalog_id -> bytes, LRU first
+        self._evictions = 0
+        self._reloads = 0
+
+    def touch(self, catalog_id: str) -> None:
+        with self._lock:
+            if catalog_id in self._resident:
+                self._resident.move_to_end(catalog_id)
+
+    def admit(self, catalog_id: str, nbytes: int, evictable: Callable[[str], bool], reload: bool = False) -> List[str]:
+        """Record ``catalog_id`` as resident (most recent); returns catalogs to unload."""
+        with self._lock:
+            self._resident[catalog_id] = nbytes
+            self._resident.move_to_end(catalog_id)
+            if reload:
+                self._reloads += 1
+            return self._victims_locked(catalog_id, evictable)
+
+    def resize(self, catalog_id: str, nbytes: int, evictable: Callable[[str], bool]) -> List[str]:
+        with self._lock:
+            if catalog_id not in self._resident:
+                return []
+            self._resident[catalog_id] = nbytes
+            return self._victims_locked(catalog_id, evictable)
+
+    def _over_locked(self) -> bool:
+        over_bytes = self.budget_bytes > 0 and sum(self._resident.values()) > self.budget_bytes
+        over_count = self.max_catalogs > 0 and len(self._resident) > self.max_catalogs
+        return over_bytes or over_count
+
+    def _victims_locked(self, keep: str, evictable: Callable[[str], bool]) -> List[str]:
+        victims: List[str] = []
+        for cid in list(self._resident):
+            if not self._over_locked():
+                break
+            if cid == keep or not evictable(cid):
+                continue
+            del self._resident[cid]
+            victims.append(cid)
+        self._evictions += len(victims)
+        return victims
+
+    def forget(self, catalog_id: str) -> None:
+        with self._lock:
+            self._resident.pop(catalog_id, None)
+
+    def is_resident(self, catalog_id: str) -> bool:
+        return catalog_id in self._resident
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "max_catalogs": self.max_catalogs,
+                "resident_bytes": sum(self._resident.values()),
+                "resident": dict(self._resident),
+                "evictions": self._evictions,
+                "reloads": self._reloads,
+            }
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from item_search.app.src.refine.extractors.features import extract_features
 from item_search.app.src.refine.extractors.models import ItemFeatures
 from item_search.app.src.refine.parsers.models import ParseOutput
-from item_search.app.src.refine.searchers.models import search as run_search
-from item_search.app.src.refine.searchers.cosine_index import CosineIndex
+from item_search.app.src.refine.searchers.models import SearchResult, VectorIndex, search_prepared
 from item_search.app.src.refine.config import TOP_K, SIMILARITY_THRESHOLD
 
 
@@ -16,31 +15,48 @@ def build_query_features(query_text: str) -> ItemFeatures:
     return extract_features(po)
 
 
+def _result_dict(r0: Optional[SearchResult]) -> Dict[str, Any]:
+    if r0 is None:
+        return {"best_match_id": None, "best_match_name": None, "best_score": 0.0, "top_k": []}
+    return {
+        "best_match_id": r0.best_match_id,
+        "best_match_name": next((m.meta.get("name") for m in r0.top_k if m.item_id == r0.best_match_id), None),
+        "best_score": r0.best_score,
+        "top_k": [
+            {"item_id": m.item_id, "score": m.score, "meta": dict(m.meta)} for m in r0.top_k
+        ],
+    }
+
+
 def run_vector_search(
     query: ItemFeatures,
-    corpus: ItemFeatures,
-    index: CosineIndex,
+    index: VectorIndex,
     top_k: Optional[int],
     threshold: Optional[float],
 ) -> Dict[str, Any]:
-    results = run_search(
+    # index is fitted once in CatalogManager.warmup; never refit per request
+    results = search_prepared(
         query=query,
-        reference=corpus,
         index=index,
         top_k=top_k or TOP_K,
         threshold=threshold or SIMILARITY_THRESHOLD,
     )
-
-    if not results:
-        return {"best_match_id": None, "best_match_name": None, "best_score": 0.0, "top_k": []}
-    r0 = results[0]
-    return {
-        "best_match_id": r0.best_match_id,
-        "best_match_name": next((m.meta.get("name") for m in r0.top_k if m.item_id == r0.best_match_id), None),
-        "best_score": r0.best_score,
-        "top_k": [
-            {"item_id": m.item_id, "score": m.score, "meta": dict(m.meta)} for m in r0.top_k
-        ],
-    }
+    return _result_dict(results[0] if results else None)
 
 
+def run_vector_search_batch(
+    queries: List[ItemFeatures],
+    index: VectorIndex,
+    top_k: Optional[int],
+    threshold: Optional[float],
+) -> List[Dict[str, Any]]:
+    """Search many queries in one index pass; one result per query (its first item, as in run_vector_search)."""
+    merged = ItemFeatures(items=[q.items[0] for q in queries if q.items])
+    results = search_prepared(
+        query=merged,
+        index=index,
+        top_k=top_k or TOP_K,
+        threshold=threshold or SIMILARITY_THRESHOLD,
+    )
+    it = iter(results)
+    return [_result_dict(next(it) if q.items else None) for q in queries]
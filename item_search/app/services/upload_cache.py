@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from item_search.app.config import UPLOAD_CACHE_ROOT, UPLOAD_CACHE_MAX_BYTES
+from item_search.app.src.refine.config import OCR_LANGUAGE, PARSER_VERSION
+from item_search.app.src.refine.extractors.models import ItemFeature, ItemFeatures
+from item_search.app.src.refine.parsers.models import ParsedItem, ParsedTable, ParseOutput
+
+
+def _encode(parsed: ParseOutput, features: Optional[ItemFeatures]) -> bytes:
+    entry: Dict[str, Any] = {
+        "parsed": {
+            "source_path": str(parsed.source_path),
+            "pages_text": parsed.pages_text,
+            "tables": [vars(t) for t in parsed.tables],
+            "items_raw": [vars(it) for it in parsed.items_raw],
+            "meta": parsed.meta,
+        },
+        "features": None,
+    }
+    if features is not None:
+        items = []
+        for it in features.items:
+            item = {name: getattr(it, name) for name in ItemFeature.__slots__}
+            if it.token_ids is not None:
+                item["token_ids"] = it.token_ids.tolist()
+            items.append(item)
+        entry["features"] = {"items": items, "meta": features.meta}
+    return json.dumps(entry, ensure_ascii=False).encode("utf-8")
+
+
+def _decode(data: bytes) -> Tuple[ParseOutput, Optional[ItemFeatures]]:
+    entry = json.loads(data.decode("utf-8"))
+    p = entry["parsed"]
+    parsed = ParseOutput(
+        source_path=Path(p["source_path"]),
+        pages_text=p["pages_text"],
+        tables=[ParsedTable(**t) for t in p["tables"]],
+        items_raw=[ParsedItem(**it) for it in p["items_raw"]],
+        meta=p["meta"],
+    )
+    f = entry["features"]
+    if f is None:
+        return parsed, None
+    items = []
+    for it in f["items"]:
+        if it["token_ids"] is not None:
+            it["token_ids"] = array("i", it["token_ids"])
+        items.append(ItemFeature(**it))
+    return parsed, ItemFeatures(items=items, meta=f["meta"])
+
+
+class UploadCache:
+    """Bounded on-disk cache of parsed uploads keyed by content hash.
+
+    Entries hold the ``ParseOutput`` and, once a search has needed them, the
+    extracted ``ItemFeatures``, so a repeated upload skips parsing and OCR.
+    They are stored as JSON, so reading a planted file cannot run code.
+    Sizes are tracked in memory (the directory is listed once, oldest mtime
+    first) and least recently used files are removed above ``max_bytes``.
+    """
+
+    def __init__(self, root: Path = UPLOAD_CACHE_ROOT, max_bytes: int = UPLOAD_CACHE_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._entries: Optional["OrderedDict[str, int]"] = None  # key -> size, least recent first
+        self._total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _finish_key(h: Any, suffix: str) -> str:
+        # suffix picks the parser; version and OCR language change the output
+        h.update(f"|{suffix.lower()}|{PARSER_VERSION}|{OCR_LANGUAGE}".encode("utf-8"))
+        return h.hexdigest()
+
+    @staticmethod
+    def key(data: bytes, suffix: str) -> str:
+        return UploadCache._finish_key(hashlib.sha256(data), suffix)
+
+    @staticmethod
+    def key_file(f: BinaryIO, suffix: str, chunk_size: int = 1024 * 1024) -> str:
+        """Same key as :meth:`key`, hashed chunk by chunk; ``f`` is rewound afterwards."""
+        h = hashlib.sha256()
+        f.seek(0)
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+        f.seek(0)
+        return UploadCache._finish_key(h, suffix)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def _scan_locked(self) -> "OrderedDict[str, int]":
+        if self._entries is None:
+            for p in self.root.glob("*.pkl"):  # pickled entries of earlier versions are never read
+                p.unlink(missing_ok=True)
+            found = []
+            for p in self.root.glob("*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                found.append((st.st_mtime, p.stem, st.st_size))
+            found.sort()
+            self._entries = OrderedDict((key, size) for _, key, size in found)
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    def get(self, key: str) -> Optional[Tuple[ParseOutput, Optional[ItemFeatures]]]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            parsed, features = _decode(path.read_bytes())
+            os.utime(path)  # LRU order across restarts
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+            entries = self._scan_locked()
+            if key in entries:
+                entries.move_to_end(key)
+        return parsed, features
+
+    def put(self, key: str, parsed: ParseOutput, features: Optional[ItemFeatures]) -> None:
+        if not self.enabled:
+            return
+        try:
+            data = _encode(parsed, features)
+        except (TypeError, ValueError):  # e.g. dates in spreadsheet rows: not cached
+            return
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            entries = self._scan_locked()
+            self._total += len(data) - entries.pop(key, 0)
+            entries[key] = len(data)
+            while self._total > self.max_bytes and entries:
+                old, size = entries.popitem(last=False)
+                self._path(old).unlink(missing_ok=True)
+                self._total -= size
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+            }
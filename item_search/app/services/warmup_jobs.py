@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from item_search.app.config import WARMUP_JOBS_KEEP, WARMUP_WORKERS
+from item_search.app.services.catalog_manager import (
+    CatalogManager,
+    WarmupCancelled,
+    WarmupProgress,
+    WarmupResult,
+)
+
+
+ACTIVE_STATES = ("queued", "running")
+
+
+def _norm_limit(limit_items: Optional[int]) -> Optional[int]:
+    return limit_items if limit_items is not None and limit_items > 0 else None
+
+
+class WarmupConflict(Exception):
+    """A different warmup of the same catalog is already queued or running."""
+
+    def __init__(self, job: "WarmupJob") -> None:
+        super().__init__(f"Warmup job {job.job_id} for catalog {job.catalog_id!r} is {job.state}")
+        self.job = job
+
+
+@dataclass
+class WarmupJob:
+    job_id: str
+    catalog_id: str
+    references: List[str]
+    limit_items: Optional[int]
+    state: str = "queued"  # queued, running, done, failed, cancelled
+    progress: WarmupProgress = field(default_factory=WarmupProgress)
+    result: Optional[WarmupResult] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    done_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def same_request(self, references: List[str], limit_items: Optional[int]) -> bool:
+        return self.references == list(references) and self.limit_items == _norm_limit(limit_items)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done_event.wait(timeout)
+
+
+class WarmupJobs:
+    """Runs catalog warmups in the background, at most one per catalog.
+
+    A warmup for a catalog that already has an identical job queued or
+    running returns that job instead of starting another build; a different
+    request for the same catalog is refused with :class:`WarmupConflict`.
+    The catalog's previous index keeps serving searches until the new one
+    is installed.
+    """
+
+    def __init__(self, manager: CatalogManager, workers: int = WARMUP_WORKERS, keep: int = WARMUP_JOBS_KEEP) -> None:
+        self.manager = manager
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warmup")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, WarmupJob]" = OrderedDict()
+        self._active: Dict[str, WarmupJob] = {}  # catalog_id -> queued/running job
+        self._latest: Dict[str, WarmupJob] = {}  # catalog_id -> most recent job
+        manager.rebuild = self._rebuild
+
+    def submit(self, catalog_id: str, references: List[str], limit_items: Optional[int] = None) -> Tuple[WarmupJob, bool]:
+        """Queue a warmup; returns the job and whether it was newly created.
+
+        Missing references are checked here, so such requests fail
+        immediately instead of as a failed job.
+        """
+        self.manager.resolve_references(references)  # file system checks, kept out of the lock
+        with self._lock:
+            job = self._active.get(catalog_id)
+            if job is not None:
+                if job.same_request(references, limit_items):
+                    return job, False
+                raise WarmupConflict(job)
+            job = WarmupJob(
+                job_id=uuid.uuid4().hex,
+                catalog_id=catalog_id,
+                references=list(references),
+                limit_items=_norm_limit(limit_items),
+            )
+            self._jobs[job.job_id] = job
+            self._active[catalog_id] = job
+            self._latest[catalog_id] = job
+            self._trim_locked()
+        self._pool.submit(self._run, job)
+        return job, True
+
+    def _rebuild(self, catalog_id: str, references: List[str], limit_items: Optional[int]) -> None:
+        """Rebuild an evicted catalog whose snapshot is gone or stale (called by the manager)."""
+        try:
+            self.submit(catalog_id, references, limit_items)
+        except WarmupConflict:
+            pass  # another warmup of the catalog is already on its way
+
+    def _run(self, job: WarmupJob) -> None:
+        with self._lock:
+            if job.state != "queued":  # cancelled while waiting for a worker
+                return
+            job.state = "running"
+            job.started_at = time.time()
+        state, result, error = "done", None, None
+        try:
+            result = self.manager.warmup(
+                job.catalog_id,
+                job.references,
+                limit_items=job.limit_items,
+                progress=job.progress,
+                cancel=job.cancel_event,
+            )
+        except WarmupCancelled:
+            state = "cancelled"
+        except Exception as e:
+            state, error = "failed", f"{type(e).__name__}: {e}"
+        self._finish(job, state, result, error)
+
+    def _finish(self, job: WarmupJob, state: str, result: Optional[WarmupResult] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.state, job.result, job.error = state, result, error
+            job.finished_at = time.time()
+            if self._active.get(job.catalog_id) is job:
+                del self._active[job.catalog_id]
+        job.done_event.set()
+
+    def _trim_locked(self) -> None:
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.keep:
+                break
+            job = self._jobs[job_id]
+            if not job.active:
+                del self._jobs[job_id]
+                if self._latest.get(job.catalog_id) is job:
+                    del self._latest[job.catalog_id]
+
+    def get(self, job_id: str) -> Optional[WarmupJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[WarmupJob]:
+        """Request cancellation; a queued job is cancelled at once, a running one at its next shard."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return job
+            job.cancel_event.set()
+            queued = job.state == "queued"
+        if queued:
+            self._finish(job, "cancelled")
+        return job
+
+    def catalog_state(self, catalog_id: str) -> str:
+        """``building``, ``ready``, ``failed`` (last warmup failed) or ``absent``."""
+        with self._lock:
+            latest = self._latest.get(catalog_id)
+        if latest is not None and latest.active:
+            return "building"
+        if latest is not None and latest.state == "failed":
+            return "failed"
+        return "ready" if self.manager.is_loaded(catalog_id) else "absent"
+
+    def catalog_states(self) -> Dict[str, str]:
+        with self._lock:
+            ids = set(self._latest)
+        ids.update(self.manager.loaded_catalogs())
+        return {cid: self.catalog_state(cid) for cid in sorted(ids)}
+
+    def latest(self, catalog_id: str) -> Optional[WarmupJob]:
+        with self._lock:
+            return self._latest.get(catalog_id)
+
+    def shutdown(self) -> None:
+        """Cancel every queued and running job and stop the workers."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j.active]
+        for job in jobs:
+            self.cancel(job.job_id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return {"jobs": counts, "active": sorted(self._active)}
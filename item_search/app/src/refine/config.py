@@ -3,6 +3,11 @@ from __future__ import annotations
 # minimal config placeholders
 
 OCR_LANGUAGE = "rus+eng"
+OCR_WORKERS = 2  # pages OCR'd concurrently (env OCR_WORKERS overrides)
+OCR_DPI = 200  # PDF rasterization resolution (env OCR_DPI overrides)
+OCR_RASTER_CHUNK_PAGES = 4  # PDF pages held as bitmaps at once (env OCR_RASTER_CHUNK_PAGES overrides)
+# Bump when parsers or feature extraction change their output (invalidates cached uploads)
+PARSER_VERSION = 1
 TOP_K = 5
 SIMILARITY_THRESHOLD = 0.35  # baseline threshold for "similar enough"
 
@@ -10,6 +15,11 @@ SIMILARITY_THRESHOLD = 0.35  # baseline threshold for "similar enough"
 WINDOW_SIZE = 60
 WINDOW_STRIDE = 30
 
+# Tokenizer memo for short free texts such as queries: entries (0 disables; env
+# TOKEN_CACHE_SIZE overrides) and the longest text memoized, in characters
+TOKEN_CACHE_SIZE = 10_000
+TOKEN_CACHE_MAX_LEN = 512
+
 # Query TF clipping
 QUERY_TF_CLIP = 2
 
@@ -25,6 +35,46 @@ BRAND_BOOST = 1.5
 # Anchors (query)
 SKU_ANCHOR_BOOST = 3.0
 
+# Scoring engine for CosineIndex.search: "python" (dict accumulator) or "numpy" (vectorized)
+SCORING_ENGINE = "python"
+# Batched multi-query scoring (e.g. all windows of an uploaded document):
+# used when a search() call has at least this many non-empty queries (0 disables)
+BATCH_MIN_QUERIES = 8
+# cap on (query, posting) pairs expanded at once by the batched pass
+BATCH_MAX_PAIRS = 4_000_000
+# Drop candidates below the request threshold inside the index (disables fuzzy fallback)
+PRUNE_BELOW_THRESHOLD = False
+
+# Segmented index: docs per segment at build time, and background merging of
+# small adjacent segments once there are more than SEGMENT_MERGE_FACTOR of them
+SEGMENT_SIZE = 100_000
+SEGMENT_MERGE_FACTOR = 8
+SEGMENT_MAX_MERGE_DOCS = 2_000_000
+
+# Warmup feature extraction: rows per shard, worker processes (0 = one per CPU
+# the process may use, i.e. its affinity mask and cgroup CPU quota, at most
+# EXTRACT_MAX_WORKERS; 1 = in-process; env EXTRACT_WORKERS overrides) and the
+# total reference size below which extraction stays in-process
+EXTRACT_SHARD_ROWS = 5000
+EXTRACT_WORKERS = 0
+EXTRACT_MAX_WORKERS = 4
+EXTRACT_PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+# Niceness added to extraction worker processes so a rebuild yields CPU to
+# searches served by the same host (0 = same priority)
+EXTRACT_NICE = 10
+
+# Warmup reference reading: files read ahead concurrently on threads (1 = one
+# at a time; env REFERENCE_READ_WORKERS overrides) and row shards buffered
+# per file ahead of the consumer
+REFERENCE_READ_WORKERS = 4
+REFERENCE_PREFETCH_SHARDS = 2
+
+# Incremental updates: merge the delta segment into the base (in a background thread) once pending
+# items plus tombstones reach this many (0 = only on explicit merge)
+DELTA_MERGE_ITEMS = 2000
+# Recompute IDF at merge time once this share of the catalog changed since the last refresh
+IDF_REFRESH_RATIO = 0.1
+
 # Fuzzy fallbacks
 FUZZY_SKU_THRESHOLD = 0.85
 FUZZY_NAME_THRESHOLD = 0.6
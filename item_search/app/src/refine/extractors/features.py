@@ -1,19 +1,31 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from ..parsers.models import ParseOutput, ParsedItem, ParsedTable
+from ..parsers.tabular_parser import parsed_item_from_row
 from .models import ItemFeatures, ItemFeature
-from ..utils import normalize_text, simple_tokenize, filter_stopwords, normalize_numbers
-from ..config import WINDOW_SIZE, WINDOW_STRIDE
+from .vocabulary import Vocabulary
+from ..utils import Tokenizer, normalize_text
+from ..config import TOKEN_CACHE_MAX_LEN, TOKEN_CACHE_SIZE, WINDOW_SIZE, WINDOW_STRIDE
+
+
+# catalog rows carry their id, so their texts never repeat; short page texts
+# (search queries) do, and are memoized
+_item_tokenizer = Tokenizer()
+_page_tokenizer = Tokenizer(
+    cache_size=int(os.getenv("TOKEN_CACHE_SIZE", TOKEN_CACHE_SIZE)),
+    cache_max_len=TOKEN_CACHE_MAX_LEN,
+)
 
 
 def _make_item_id(prefix: str, index: int) -> str:
     return f"{prefix}:{index}"
 
 
-def _feature_from_parsed_item(pi: ParsedItem, idx: int) -> ItemFeature:
+def _feature_from_parsed_item(pi: ParsedItem, idx: int, vocabulary: Optional[Vocabulary] = None) -> ItemFeature:
     name = pi.name or ""
     parts: List[str] = [name]
 
@@ -35,8 +47,7 @@ def _feature_from_parsed_item(pi: ParsedItem, idx: int) -> ItemFeature:
             continue
         parts.append(f"{k}:{v}")
 
-    text_repr = normalize_numbers(normalize_text(" ".join(parts)))
-    tokens = filter_stopwords(simple_tokenize(text_repr))
+    text_repr, tokens = _item_tokenizer.tokenize(" ".join(parts))
     attrs: Dict[str, str] = {}
     if pi.brand:
         attrs["brand"] = str(pi.brand)
@@ -51,6 +62,14 @@ def _feature_from_parsed_item(pi: ParsedItem, idx: int) -> ItemFeature:
             if k in pi.attrs and pi.attrs[k] is not None:
                 attrs[k] = str(pi.attrs[k])
 
+    if vocabulary is not None:
+        return ItemFeature(
+            item_id=_make_item_id("raw", idx),
+            name=name,
+            attrs=attrs,
+            text_repr=text_repr,
+            token_ids=vocabulary.ids(tokens),
+        )
     return ItemFeature(
         item_id=_make_item_id("raw", idx),
         name=name,
@@ -111,8 +130,7 @@ def _features_from_table(table: ParsedTable, base_idx: int) -> List[ItemFeature]
             else:
                 parts.append(val)
 
-        text_repr = normalize_numbers(normalize_text(" ".join(parts)))
-        tokens = filter_stopwords(simple_tokenize(text_repr))
+        text_repr, tokens = _item_tokenizer.tokenize(" ".join(parts))
 
         features.append(
             ItemFeature(
@@ -131,8 +149,7 @@ def _features_from_table(table: ParsedTable, base_idx: int) -> List[ItemFeature]
 def _features_from_pages_text(pages_text: List[str], base_idx: int) -> List[ItemFeature]:
     features: List[ItemFeature] = []
     for i, page in enumerate(pages_text or []):
-        full = normalize_numbers(normalize_text(page))
-        tokens = filter_stopwords(simple_tokenize(full))
+        _, tokens = _page_tokenizer.tokenize(page)
         # windowing
         if not tokens:
             continue
@@ -188,4 +205,12 @@ def extract_features(parse_output: ParseOutput) -> ItemFeatures:
     return ItemFeatures(items=items, meta={"source": str(parse_output.source_path)})
 
 
+def iter_row_features(
+    rows: Iterable[Dict[str, Any]], start: int = 0, vocabulary: Optional[Vocabulary] = None
+) -> Iterator[ItemFeature]:
+    """Features of catalog rows numbered from ``start`` within their file (``raw:<n>`` ids).
 
+    With ``vocabulary`` the items carry interned ``token_ids`` and no token strings.
+    """
+    for idx, r in enumerate(rows, start):
+        yield _feature_from_parsed_item(parsed_item_from_row(r), idx, vocabulary)
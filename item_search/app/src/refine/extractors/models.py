@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class ItemFeature:
     item_id: str
     name: str
@@ -12,6 +13,8 @@ class ItemFeature:
     attrs: Dict[str, str] = field(default_factory=dict)
     text_repr: str = ""
     embedding: Optional[List[float]] = None
+    # ids in the Vocabulary the item was extracted with; set instead of ``tokens``
+    token_ids: Optional["array[int]"] = None
 
 
 @dataclass
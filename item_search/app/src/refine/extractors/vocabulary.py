@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, List
+
+
+class Vocabulary:
+    """Append-only token table shared by feature extraction and index building.
+
+    Each distinct token string is stored once and numbered in first-seen
+    order, so items can carry ``array('i')`` token ids instead of lists of
+    fresh strings, and the index builder consumes those ids without hashing
+    the strings again. Adding tokens is thread-safe; lookups take no lock.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self.tokens: List[str] = []  # token id -> token
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._ids
+
+    def get(self, token: str, default: int = -1) -> int:
+        return self._ids.get(token, default)
+
+    def intern(self, token: str) -> int:
+        tid = self._ids.get(token)
+        if tid is None:
+            with self._lock:
+                tid = self._ids.get(token)
+                if tid is None:
+                    tid = len(self.tokens)
+                    self.tokens.append(token)
+                    self._ids[token] = tid
+        return tid
+
+    def ids(self, tokens: List[str]) -> "array[int]":
+        """Token ids of ``tokens`` (in order, repeats kept), adding unseen tokens."""
+        ids = list(map(self._ids.get, tokens))
+        if None in ids:
+            ids = [tid if tid is not None else self.intern(token) for tid, token in zip(ids, tokens)]
+        return array("i", ids)
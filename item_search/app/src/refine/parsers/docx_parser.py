@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, List, Optional
 import docx  # python-docx
 
 from .models import ParseOutput, ParsedTable
 
 
-def parse_docx(path: Path) -> ParseOutput:
-    document = docx.Document(str(path))
+def parse_docx(path: Path, fileobj: Optional[BinaryIO] = None) -> ParseOutput:
+    """Parse a DOCX file; with ``fileobj`` the document is read from it and ``path`` only names it."""
+    document = docx.Document(fileobj if fileobj is not None else str(path))
 
     tables: List[ParsedTable] = []
     for t in document.tables:
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from .models import ParseOutput, ParsedTable
-from ..config import OCR_LANGUAGE
+from ..config import OCR_LANGUAGE, OCR_WORKERS, OCR_DPI, OCR_RASTER_CHUNK_PAGES
 import pytesseract
 from PIL import Image
 import os
@@ -15,39 +19,100 @@ _tess_cmd = os.getenv("TESSERACT_CMD")
 if _tess_cmd:
     pytesseract.pytesseract.tesseract_cmd = _tess_cmd
 
+_ocr_workers = int(os.getenv("OCR_WORKERS", OCR_WORKERS))
+_ocr_dpi = int(os.getenv("OCR_DPI", OCR_DPI))
+_raster_chunk_pages = int(os.getenv("OCR_RASTER_CHUNK_PAGES", OCR_RASTER_CHUNK_PAGES))
 
-def _ocr_images_to_text(images: List["Image.Image"]) -> List[str]:  # type: ignore[name-defined]
-    texts: List[str] = []
-    for img in images:
-        text = pytesseract.image_to_string(img, lang=OCR_LANGUAGE)
-        texts.append(text or "")
-    return texts
 
+def _ocr_page(img: "Image.Image") -> Tuple[str, float]:  # type: ignore[name-defined]
+    t0 = time.perf_counter()
+    text = pytesseract.image_to_string(img, lang=OCR_LANGUAGE)
+    return text or "", time.perf_counter() - t0
 
-def _pdf_to_images(path: Path) -> List["Image.Image"]:  # type: ignore[name-defined]
+
+def _ocr_images_to_text(
+    images: List["Image.Image"], workers: Optional[int] = None  # type: ignore[name-defined]
+) -> Tuple[List[str], List[float]]:
+    """OCR pages concurrently; returns texts and per-page seconds in page order.
+
+    Each page runs in its own tesseract subprocess, so a thread pool gives
+    real parallelism without pickling page bitmaps to worker processes.
+    """
+    workers = max(1, min(workers or _ocr_workers, len(images)))
+    if workers == 1:
+        results = [_ocr_page(img) for img in images]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+            results = list(pool.map(_ocr_page, images))
+    return [text for text, _ in results], [sec for _, sec in results]
+
+
+def _poppler_kwargs() -> Dict[str, str]:
     # On Windows, pdf2image may require explicit poppler path; read from env if provided
     poppler_path = os.getenv("POPPLER_PATH")
-    if poppler_path:
-        images = convert_from_path(str(path), poppler_path=poppler_path)
-    else:
-        images = convert_from_path(str(path))
-    return images
+    return {"poppler_path": poppler_path} if poppler_path else {}
 
 
-def parse_ocr(path: Path) -> ParseOutput:
+def _iter_pdf_page_chunks(
+    path: Path, chunk_pages: Optional[int] = None, dpi: Optional[int] = None
+) -> Iterator[List["Image.Image"]]:  # type: ignore[name-defined]
+    """Rasterize a PDF ``chunk_pages`` pages at a time.
+
+    Only one chunk of page bitmaps is alive at once, so peak memory depends on
+    the chunk size and DPI rather than on the page count.
+    """
+    chunk = max(1, chunk_pages or _raster_chunk_pages)
+    num_pages = int(pdfinfo_from_path(str(path), **_poppler_kwargs())["Pages"])
+    for first in range(1, num_pages + 1, chunk):
+        last = min(first + chunk - 1, num_pages)
+        yield convert_from_path(
+            str(path), dpi=dpi or _ocr_dpi, first_page=first, last_page=last, **_poppler_kwargs()
+        )
+
+
+def _ocr_pdf(path: Path) -> Tuple[List[str], List[float]]:
+    pages_text: List[str] = []
+    page_seconds: List[float] = []
+    for images in _iter_pdf_page_chunks(path):
+        texts, seconds = _ocr_images_to_text(images)
+        pages_text.extend(texts)
+        page_seconds.extend(seconds)
+        for img in images:
+            img.close()
+        del images
+    return pages_text, page_seconds
+
+
+def parse_ocr(path: Path, fileobj: Optional[BinaryIO] = None) -> ParseOutput:
     """Run OCR over scanned PDF or images.
 
-    - If input is PDF, convert pages to images, then OCR.
+    - If input is PDF, rasterize pages in bounded chunks and OCR each chunk.
     - If input is an image, OCR directly.
+    - With ``fileobj`` the content is read from it and ``path`` only names it;
+      images are decoded from the stream, only PDFs are copied to a temp file
+      because poppler needs a path.
     """
     suffix = path.suffix.lower()
 
-    if suffix == ".pdf":
-        images = _pdf_to_images(path)
-        pages_text = _ocr_images_to_text(images)
+    if suffix == ".pdf" and fileobj is not None:
+        # closed before poppler opens it (required on Windows), removed afterwards
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            shutil.copyfileobj(fileobj, tmp)
+        tmp_path = Path(tmp.name)
+        try:
+            pages_text, page_seconds = _ocr_pdf(tmp_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    elif suffix == ".pdf":
+        pages_text, page_seconds = _ocr_pdf(path)
     else:
-        image = Image.open(str(path))
-        pages_text = _ocr_images_to_text([image])
-
-    return ParseOutput(source_path=path, pages_text=pages_text, tables=[], items_raw=[])
+        with Image.open(fileobj if fileobj is not None else str(path)) as image:
+            pages_text, page_seconds = _ocr_images_to_text([image])
 
+    return ParseOutput(
+        source_path=path,
+        pages_text=pages_text,
+        tables=[],
+        items_raw=[],
+        meta={"ocr_page_seconds": page_seconds},
+    )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, List, Optional
 
 from .models import ParseOutput, ParsedTable
 from odf.opendocument import load
@@ -9,15 +9,16 @@ from odf import text as odf_text
 from odf import table as odf_table
 
 
-def parse_odt(path: Path) -> ParseOutput:
+def parse_odt(path: Path, fileobj: Optional[BinaryIO] = None) -> ParseOutput:
     """Parse ODT text and tables using odfpy (no try/except on import).
 
     Notes:
     - Requires 'odfpy' package.
     - Extracts paragraphs and basic table cells.
+    - With ``fileobj`` the document is read from it; ``path`` only names it.
     """
 
-    doc = load(str(path))
+    doc = load(fileobj if fileobj is not None else str(path))
 
     # paragraphs
     paras: List[str] = []
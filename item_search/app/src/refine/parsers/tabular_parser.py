@@ -3,7 +3,7 @@ from __future__ import annotations
 import csv
 import json
 from pathlib import Path
-from typing import Iterable, List, Dict, Any, cast
+from typing import Iterable, Iterator, List, Dict, Any, cast
 
 import openpyxl
 from .models import ParseOutput, ParsedTable, ParsedItem
@@ -43,31 +43,57 @@ def _load_csv(path: Path) -> Iterable[Dict[str, Any]]:
 
 def _load_xlsx(path: Path) -> Iterable[Dict[str, Any]]:
     wb = openpyxl.load_workbook(str(path), read_only=True, data_only=True)
-    ws = cast(Any, wb.active)
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
-        return []
-    headers = [str(h).strip() if h is not None else "" for h in rows[0]]
-    for r in rows[1:]:
-        obj = {headers[i]: r[i] for i in range(len(headers))}
-        yield obj
-
-
-def parse_tabular(path: Path) -> ParseOutput:
-    """Load a reference catalog file (CSV/XLSX/JSON/JSONL) into ParsedTable and ParsedItem list."""
+    try:
+        ws = cast(Any, wb.active)
+        rows = ws.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return
+        headers = [str(h).strip() if h is not None else "" for h in first]
+        for r in rows:
+            obj = {headers[i]: r[i] for i in range(len(headers))}
+            yield obj
+    finally:
+        wb.close()
+
+
+def iter_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream raw rows of a reference catalog file (CSV/XLSX/JSON/JSONL)."""
     suffix = path.suffix.lower()
     if suffix == ".jsonl":
-        rows_iter = _load_jsonl(path)
-    elif suffix == ".json":
-        rows_iter = _load_json(path)
-    elif suffix == ".csv":
-        rows_iter = _load_csv(path)
-    elif suffix == ".xlsx":
-        rows_iter = _load_xlsx(path)
+        return iter(_load_jsonl(path))
+    if suffix == ".json":
+        return iter(_load_json(path))
+    if suffix == ".csv":
+        return iter(_load_csv(path))
+    if suffix == ".xlsx":
+        return iter(_load_xlsx(path))
+    raise ValueError(f"Unsupported tabular format: {suffix}")
+
+
+def parsed_item_from_row(r: Dict[str, Any]) -> ParsedItem:
+    """Project a catalog row onto the commonly used ParsedItem fields."""
+    raw_price = r.get("price")
+    price_val: Any
+    if raw_price is None:
+        price_val = None
     else:
-        raise ValueError(f"Unsupported tabular format: {suffix}")
+        s = str(raw_price).strip()
+        price_val = float(s.replace(" ", "").replace(",", ".")) if s else None
+
+    return ParsedItem(
+        name=str(r.get("title", r.get("name", ""))),
+        sku=None if r.get("sku") is None else str(r.get("sku")),
+        price=price_val,
+        brand=None if r.get("brand") is None else str(r.get("brand")),
+        attrs={"marketplace": r.get("marketplace"), "id": r.get("id")},
+        raw_row=r,
+    )
 
-    rows: List[Dict[str, Any]] = list(rows_iter)
+
+def parse_tabular(path: Path) -> ParseOutput:
+    """Load a reference catalog file (CSV/XLSX/JSON/JSONL) into ParsedTable and ParsedItem list."""
+    rows: List[Dict[str, Any]] = list(iter_rows(path))
     headers: List[str] = sorted({k for r in rows for k in r.keys()}) if rows else []
 
     # Table view
@@ -75,26 +101,6 @@ def parse_tabular(path: Path) -> ParseOutput:
     table = ParsedTable(headers=headers, rows=table_rows, meta={"count": len(rows)})
 
     # Items view (project commonly used fields)
-    items: List[ParsedItem] = []
-    for r in rows:
-        raw_price = r.get("price")
-        price_val: Any
-        if raw_price is None:
-            price_val = None
-        else:
-            s = str(raw_price).strip()
-            price_val = float(s.replace(" ", "").replace(",", ".")) if s else None
-
-        items.append(
-            ParsedItem(
-                name=str(r.get("title", r.get("name", ""))),
-                sku=None if r.get("sku") is None else str(r.get("sku")),
-                price=price_val,
-                brand=None if r.get("brand") is None else str(r.get("brand")),
-                attrs={"marketplace": r.get("marketplace"), "id": r.get("id")},
-                raw_row=r,
-            )
-        )
+    items: List[ParsedItem] = [parsed_item_from_row(r) for r in rows]
 
     return ParseOutput(source_path=path, pages_text=[], tables=[table], items_raw=items)
-
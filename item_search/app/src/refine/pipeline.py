@@ -6,19 +6,16 @@ from typing import List
 from .parsers.models import ParseOutput
 from .parsers.ocr_parser import parse_ocr
 from .parsers.docx_parser import parse_docx
-from .parsers.tabular_parser import parse_tabular
 from .parsers import parse_odt  # type: ignore[attr-defined]
 from .extractors.features import extract_features
 from .extractors.models import ItemFeatures
-from .searchers.models import SearchResult, search
-from .searchers.cosine_index import CosineIndex
+from .searchers.models import SearchResult, search_prepared
+from .searchers.ingest import FileLoadStats, iter_catalog_shards
+from .searchers.segments import SegmentedIndex
 from .config import TOP_K, SIMILARITY_THRESHOLD
 from .io.excel import to_excel
 
 
-#
-from tqdm import tqdm
-
 def run_pipeline(
     target_pdf: Path,
     reference_tables: List[Path],
@@ -39,28 +36,22 @@ def run_pipeline(
     else:
         parsed = parse_ocr(target_pdf)
 
-    # 2) parse references and merge
-    ref_parsed: List[ParseOutput] = []
-    for p in reference_tables:
-        ref_parsed.append(parse_tabular(p))
-
-    # 3) extract features
+    # 2) extract features
     print("Вытаскиваем фичи из query")
     query_features: ItemFeatures = extract_features(parsed)
 
-    # Для каждого из каталогов выгружаем его товары
-    ref_features_list: List[ItemFeatures] = []
-    for rp in tqdm(ref_parsed, desc="Вытаскиваем фичи из рефки", total=len(ref_parsed)):
-        ref_features_list.append(extract_features(rp))
-
-    # Сливаем рефку воедино
-    merged_ref = ItemFeatures(items=[it for rf in ref_features_list for it in rf.items])
+    # 3) references: files are read concurrently and featurized in parallel,
+    # in file order, straight into the index
+    print("Вытаскиваем фичи из рефки")
+    file_stats: List[FileLoadStats] = []
+    index = SegmentedIndex()
+    index.fit_shards(iter_catalog_shards(reference_tables, file_stats=file_stats))
+    for st in file_stats:
+        print(f"  {st.path.name}: {st.items} items, read {st.read_seconds:.2f}s, extract {st.extract_seconds:.2f}s")
 
     # 4) search with TF-IDF baseline
-    index = CosineIndex()
-    results: List[SearchResult] = search(
+    results: List[SearchResult] = search_prepared(
         query=query_features,
-        reference=merged_ref,
         index=index,
         top_k=TOP_K,
         threshold=SIMILARITY_THRESHOLD,
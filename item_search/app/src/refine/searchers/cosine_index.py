@@ -1,156 +1,374 @@
 from __future__ import annotations
 
+import heapq
+import threading
+from array import array
 from collections import Counter, defaultdict
 from math import log, sqrt
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from .models import Match, VectorIndex
-from ..extractors.models import ItemFeatures
-from ..config import QUERY_TF_CLIP, SKU_ANCHOR_BOOST, NAME_BOOST, SKU_FIELD_BOOST, BRAND_BOOST, MIN_DF, MAX_DF_RATIO
+from .doc_store import DocStore, DocStoreBuilder
+from .postings import CsrPostings
+from ..extractors.models import ItemFeature, ItemFeatures
+from ..extractors.vocabulary import Vocabulary
+from ..config import QUERY_TF_CLIP, SKU_ANCHOR_BOOST, NAME_BOOST, SKU_FIELD_BOOST, BRAND_BOOST, MIN_DF, MAX_DF_RATIO, SCORING_ENGINE
+from ..config import BATCH_MIN_QUERIES, BATCH_MAX_PAIRS
+
+
+def vocab_from_df(df_counter: Counter[str], num_docs: int) -> Tuple[Dict[str, int], List[float]]:
+    """DF-pruned vocabulary (ids in first-seen order) and smoothed IDF per term."""
+    max_df = max(1, int(MAX_DF_RATIO * num_docs))
+    vocab: Dict[str, int] = {}
+    idf: List[float] = []
+    for token, df in df_counter.items():
+        if df >= MIN_DF and df <= max_df:
+            vocab[token] = len(vocab)
+            # smooth idf
+            idf.append(log((1.0 + num_docs) / (1.0 + df)) + 1.0)
+    return vocab, idf
+
+
+def _field_hints(it: ItemFeature) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Lowercased sku, brand and name of a doc (None when empty), for field boosts."""
+    name_hint = it.name or ""
+    sku_hint = it.attrs.get("sku") if hasattr(it, "attrs") else None
+    brand_hint = it.attrs.get("brand") if hasattr(it, "attrs") else None
+    return (
+        str(sku_hint).lower() if sku_hint else None,
+        str(brand_hint).lower() if brand_hint else None,
+        name_hint.lower() if name_hint else None,
+    )
+
+
+def _field_boost(token: str, sku: Optional[str], brand: Optional[str], name: Optional[str]) -> float:
+    boost = 1.0
+    if sku is not None and token in sku:
+        boost *= SKU_FIELD_BOOST
+    if brand is not None and token in brand:
+        boost *= BRAND_BOOST
+    if name is not None and token in name:
+        boost *= NAME_BOOST
+    return boost
+
+
+def doc_terms(it: ItemFeature) -> Iterator[Tuple[str, int, float]]:
+    """(token, tf, field boost) for each distinct token of a doc, in first-seen order."""
+    sku, brand, name = _field_hints(it)
+    for token, cnt in Counter(it.tokens).items():
+        yield token, cnt, _field_boost(token, sku, brand, name)
+
+
+def doc_term_ids(it: ItemFeature, vocabulary: Vocabulary) -> Tuple[Counter[int], List[float]]:
+    """Like :func:`doc_terms` for an item carrying ``token_ids`` from ``vocabulary``:
+    tf per distinct token id (first-seen order) and the field boosts in that order."""
+    sku, brand, name = _field_hints(it)
+    tokens = vocabulary.tokens
+    tf = Counter(it.token_ids)
+    return tf, [_field_boost(tokens[tid], sku, brand, name) for tid in tf]
+
+
+def item_meta(it: ItemFeature) -> Dict[str, str]:
+    """Meta returned with matches (price, sku, marketplace, id, name)."""
+    meta: Dict[str, str] = {}
+    for k in ("price", "sku", "marketplace", "id"):
+        if k in it.attrs:
+            meta[k] = str(it.attrs[k])
+    meta["name"] = it.name
+    return meta
+
+
+def query_vector(tokens: List[str], vocab: Dict[str, int], idf: Sequence[float]) -> Tuple[Dict[int, float], float]:
+    """Query term weights and norm; tf is clipped and sku-like anchors are boosted."""
+    tf = Counter(tokens)
+    q_weights: Dict[int, float] = {}
+    # simple sku anchor detection: tokens mixing digits and letters
+    anchors = {t for t in tf if any(ch.isdigit() for ch in t) and any(ch.isalpha() for ch in t)}
+    for token, cnt in tf.items():
+        tid = vocab.get(token)
+        if tid is None:
+            continue
+        clipped = min(int(cnt), QUERY_TF_CLIP)
+        boost = SKU_ANCHOR_BOOST if token in anchors else 1.0
+        q_weights[tid] = float(clipped) * idf[tid] * boost
+    q_norm = sqrt(sum(w * w for w in q_weights.values())) or 1.0
+    return q_weights, q_norm
+
+
+def _select_top_k(
+    docs: np.ndarray, dots: np.ndarray, denom: np.ndarray, top_k: int, min_score: float
+) -> List[Tuple[int, float]]:
+    """Cosine from dot products, then top-k ordered by (score desc, doc asc); ``docs`` ascending."""
+    sims = np.zeros_like(dots)
+    np.divide(dots, denom, out=sims, where=denom > 0.0)
+    keep = (sims > 0.0) & (sims >= min_score)
+    docs, sims = docs[keep], sims[keep]
+
+    if docs.size > top_k:
+        # partial selection of the k-th best score; keep its ties so the
+        # final (score desc, doc asc) order matches the python engine
+        kth = -np.partition(-sims, top_k - 1)[top_k - 1]
+        sel = sims >= kth
+        docs, sims = docs[sel], sims[sel]
+    order = np.lexsort((docs, -sims))[:top_k]
+    return list(zip(docs[order].tolist(), sims[order].tolist()))
 
 
 class CosineIndex(VectorIndex):
     """Sparse TF-IDF cosine index with inverted lists.
 
-    - No external dependencies
+    - Postings are contiguous CSR arrays (int32 doc ids, float32 weights)
     - Scales to large catalogs via postings per token
     """
 
-    def __init__(self) -> None:
+    ENGINES = ("python", "numpy")
+
+    def __init__(self, engine: str = SCORING_ENGINE, batch_min_queries: int = BATCH_MIN_QUERIES) -> None:
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown scoring engine: {engine!r} (expected one of {self.ENGINES})")
+        self.engine = engine
+        # queries per search() call at which scoring switches to the batched pass (0 = never)
+        self.batch_min_queries = batch_min_queries
+        self._local = threading.local()
         self._vocab: Dict[str, int] = {}
-        self._idf: List[float] = []
-        self._postings: Dict[int, List[Tuple[int, float]]] = {}
-        self._doc_norms: List[float] = []
-        self._doc_meta: List[Dict[str, str]] = []
-        self._doc_ids: List[str] = []
+        # idf/doc_norms/postings are numpy views when loaded from a snapshot
+        self._idf: Sequence[float] = []
+        self._postings: CsrPostings = CsrPostings.empty()
+        self._doc_norms: np.ndarray = np.zeros(0, dtype=np.float32)
+        self._docs: DocStore = DocStore.empty()  # ids and match meta, column-wise
+        self._fitted = False
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._fitted
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by arrays (postings, norms, idf, doc columns)."""
+        return self._postings.nbytes + int(self._doc_norms.nbytes) + self._docs.nbytes + 8 * len(self._idf)
 
     def fit(self, corpus: ItemFeatures) -> None:
         self._build(corpus)
 
-    def _build(self, corpus: ItemFeatures) -> None:
-        num_docs = len(corpus.items)
-        self._doc_ids = [it.item_id for it in corpus.items]
+    def fit_frozen(self, corpus: ItemFeatures, vocab: Dict[str, int], idf: Sequence[float]) -> None:
+        """Fit ``corpus`` against a fixed vocabulary and IDF (e.g. a delta over a base index).
+
+        Tokens outside ``vocab`` are ignored, so scores are comparable with
+        the index the vocabulary came from.
+        """
+        self._vocab = vocab
+        self._idf = idf
+        self._build_postings(corpus)
 
+    def _build(self, corpus: ItemFeatures) -> None:
         # 1) build df and vocab
         df_counter: Counter[str] = Counter()
-        tokenized_docs: List[List[str]] = []
         for it in corpus.items:
-            tokens = list(dict.fromkeys(it.tokens))  # unique per doc
-            tokenized_docs.append(it.tokens)
-            df_counter.update(tokens)
-
-        # DF pruning
-        max_df = max(1, int(MAX_DF_RATIO * num_docs))
-        kept_tokens = [t for t, df in df_counter.items() if df >= MIN_DF and df <= max_df]
-
-        self._vocab = {}
-        for token in kept_tokens:
-            self._vocab[token] = len(self._vocab)
+            df_counter.update(list(dict.fromkeys(it.tokens)))  # unique per doc
 
         # 2) idf
-        self._idf = [0.0] * len(self._vocab)
-        for token, df in df_counter.items():
-            if token not in self._vocab:
-                continue
-            tid = self._vocab[token]
-            # smooth idf
-            self._idf[tid] = log((1.0 + num_docs) / (1.0 + df)) + 1.0
+        self._vocab, self._idf = vocab_from_df(df_counter, len(corpus.items))
+        self._build_postings(corpus)
+
+    def _build_postings(self, corpus: ItemFeatures) -> None:
+        num_docs = len(corpus.items)
 
-        # 3) postings and norms
-        postings: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
-        doc_norms: List[float] = [0.0] * num_docs
-        doc_meta: List[Dict[str, str]] = []
+        # 3) postings and norms, collected as flat (term, doc, weight) columns
+        post_tids = array("i")
+        post_docs = array("i")
+        post_weights = array("f")
+        doc_norms = np.zeros(num_docs, dtype=np.float32)
+        docs = DocStoreBuilder()
 
         for doc_idx, it in enumerate(corpus.items):
-            tf = Counter(it.tokens)
-            # field boosts via attrs hints
-            name_hint = it.name or ""
-            sku_hint = it.attrs.get("sku") if hasattr(it, "attrs") else None
-            brand_hint = it.attrs.get("brand") if hasattr(it, "attrs") else None
             weights: Dict[int, float] = {}
-            for token, cnt in tf.items():
+            for token, cnt, boost in doc_terms(it):
                 if token not in self._vocab:
                     continue
                 tid = self._vocab[token]
-                boost = 1.0
-                if sku_hint and token in str(sku_hint).lower():
-                    boost *= SKU_FIELD_BOOST
-                if brand_hint and token in str(brand_hint).lower():
-                    boost *= BRAND_BOOST
-                if name_hint and token in name_hint.lower():
-                    boost *= NAME_BOOST
                 w = float(cnt) * self._idf[tid] * boost
                 weights[tid] = w
             norm = sqrt(sum(w * w for w in weights.values())) or 1.0
             doc_norms[doc_idx] = norm
             for tid, w in weights.items():
-                postings[tid].append((doc_idx, w))
+                post_tids.append(tid)
+                post_docs.append(doc_idx)
+                post_weights.append(w)
+            docs.append(it.item_id, item_meta(it))
 
-            # store meta (price, sku, marketplace, name)
-            meta: Dict[str, str] = {}
-            for k in ("price", "sku", "marketplace", "id"):
-                if k in it.attrs:
-                    meta[k] = str(it.attrs[k])
-            meta["name"] = it.name
-            doc_meta.append(meta)
-
-        self._postings = postings
+        self._postings = CsrPostings.from_columns(
+            np.frombuffer(post_tids, dtype=np.int32),
+            np.frombuffer(post_docs, dtype=np.int32),
+            np.frombuffer(post_weights, dtype=np.float32),
+            num_terms=len(self._vocab),
+        )
         self._doc_norms = doc_norms
-        self._doc_meta = doc_meta
+        self._docs = docs.build()
+        self._fitted = True
 
     def _query_vector(self, tokens: List[str]) -> Tuple[Dict[int, float], float]:
-        # clip tf and apply anchor boosts (sku-like)
-        tf = Counter(tokens)
-        q_weights: Dict[int, float] = {}
-        # simple sku anchor detection
-        has_sku_anchor = any(any(ch.isdigit() for ch in t) and any(ch.isalpha() for ch in t) for t in tokens)
-        for token, cnt in tf.items():
-            tid = self._vocab.get(token)
-            if tid is None:
-                continue
-            clipped = min(int(cnt), QUERY_TF_CLIP)
-            boost = SKU_ANCHOR_BOOST if has_sku_anchor and any(c.isdigit() for c in token) and any(c.isalpha() for c in token) else 1.0
-            q_weights[tid] = float(clipped) * self._idf[tid] * boost
-        q_norm = sqrt(sum(w * w for w in q_weights.values())) or 1.0
-        return q_weights, q_norm
-
-    def search(self, query: ItemFeatures, top_k: int = 5) -> List[List[Match]]:
-        results: List[List[Match]] = []
-        for it in query.items:
-            q_weights, q_norm = self._query_vector(it.tokens)
-            if not q_weights:
-                results.append([])
-                continue
+        return query_vector(tokens, self._vocab, self._idf)
 
-            scores: Dict[int, float] = defaultdict(float)
-            for tid, qw in q_weights.items():
-                for doc_idx, dw in self._postings.get(tid, ()):  # postings for token
-                    scores[doc_idx] += qw * dw
+    def _score_python(
+        self, q_weights: Dict[int, float], q_norm: float, top_k: int, min_score: float
+    ) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for tid, qw in q_weights.items():
+            for doc_idx, dw in self._postings.get(tid, ()):  # postings for token
+                scores[doc_idx] += qw * dw
 
-            # cosine
-            matches: List[Tuple[int, float]] = []
+        # cosine; candidates below min_score never reach the heap
+        doc_norms = self._doc_norms
+
+        def _candidates() -> Iterator[Tuple[float, int]]:
             for doc_idx, dot in scores.items():
-                denom = self._doc_norms[doc_idx] * q_norm
+                denom = float(doc_norms[doc_idx]) * q_norm
                 if denom <= 0.0:
                     continue
                 sim = dot / denom
-                if sim > 0.0:
-                    matches.append((doc_idx, sim))
-
-            matches.sort(key=lambda x: x[1], reverse=True)
-            top = matches[:top_k]
-
-            out: List[Match] = []
-            for doc_idx, score in top:
-                meta = self._doc_meta[doc_idx]
-                out.append(
-                    Match(
-                        item_id=self._doc_ids[doc_idx],
-                        score=score,
-                        meta=meta,
-                    )
-                )
-            results.append(out)
-        return results
+                if sim > 0.0 and sim >= min_score:
+                    yield -sim, doc_idx
+
+        # bounded heap instead of a full sort; ties broken by doc order so
+        # every engine returns the same ranking
+        return [(doc_idx, -neg) for neg, doc_idx in heapq.nsmallest(top_k, _candidates())]
+
+    def _score_buffer(self) -> np.ndarray:
+        # one zeroed accumulator per thread, reset after each query; float64 so
+        # sums round exactly like the python engine and ties rank identically
+        buf = getattr(self._local, "scores", None)
+        if buf is None or buf.shape[0] != len(self._doc_norms):
+            buf = np.zeros(len(self._doc_norms), dtype=np.float64)
+            self._local.scores = buf
+        return buf
+
+    def _score_numpy(
+        self, q_weights: Dict[int, float], q_norm: float, top_k: int, min_score: float
+    ) -> List[Tuple[int, float]]:
+        buf = self._score_buffer()
+        postings = self._postings
+        touched: List[np.ndarray] = []
+        for tid, qw in q_weights.items():
+            start, end = postings.span(tid)
+            if start == end:
+                continue
+            docs = postings.doc_ids[start:end]
+            # doc ids are unique within a term, so fancy-index += needs no np.add.at
+            buf[docs] += np.multiply(postings.weights[start:end], qw, dtype=np.float64)
+            touched.append(docs)
+        if not touched:
+            return []
+
+        cand = touched[0] if len(touched) == 1 else np.unique(np.concatenate(touched))
+        dots = buf[cand]
+        buf[cand] = 0.0
+        denom = self._doc_norms[cand].astype(np.float64) * q_norm
+        return _select_top_k(cand, dots, denom, top_k, min_score)
+
+    def _score_batch(
+        self, vectors: List[Tuple[Dict[int, float], float]], top_k: int, min_score: float
+    ) -> List[List[Tuple[int, float]]]:
+        """Score many queries term-at-a-time: each term's postings are read once per chunk.
+
+        Queries are grouped so that one chunk expands to at most
+        BATCH_MAX_PAIRS (query, posting) pairs, bounding temporary memory.
+        """
+        postings = self._postings
+        ranked: List[List[Tuple[int, float]]] = [[] for _ in vectors]
+        chunk: List[int] = []
+        chunk_pairs = 0
+        for qi, (q_weights, _) in enumerate(vectors):
+            pairs = sum(int(postings.offsets[t + 1] - postings.offsets[t]) for t in q_weights)
+            if chunk and chunk_pairs + pairs > BATCH_MAX_PAIRS:
+                self._score_chunk(vectors, chunk, top_k, min_score, ranked)
+                chunk, chunk_pairs = [], 0
+            chunk.append(qi)
+            chunk_pairs += pairs
+        if chunk:
+            self._score_chunk(vectors, chunk, top_k, min_score, ranked)
+        return ranked
+
+    def _score_chunk(
+        self,
+        vectors: List[Tuple[Dict[int, float], float]],
+        chunk: List[int],
+        top_k: int,
+        min_score: float,
+        ranked: List[List[Tuple[int, float]]],
+    ) -> None:
+        postings = self._postings
+        num_docs = len(self._doc_norms)
+
+        # sparse query matrix, column-wise: term -> [(row in chunk, query weight)]
+        by_term: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+        for row, qi in enumerate(chunk):
+            for tid, qw in vectors[qi][0].items():
+                by_term[tid].append((row, qw))
+
+        keys: List[np.ndarray] = []
+        vals: List[np.ndarray] = []
+        for tid, users in by_term.items():
+            start, end = postings.span(tid)
+            if start == end:
+                continue
+            docs = postings.doc_ids[start:end].astype(np.int64)
+            weights = postings.weights[start:end].astype(np.float64)
+            rows = np.fromiter((u[0] for u in users), dtype=np.int64, count=len(users))
+            qws = np.fromiter((u[1] for u in users), dtype=np.float64, count=len(users))
+            keys.append((rows[:, None] * num_docs + docs[None, :]).ravel())
+            vals.append((qws[:, None] * weights[None, :]).ravel())
+        if not keys:
+            return
+
+        # reduce contributions per (row, doc); keys sort by row, then doc
+        key_arr = np.concatenate(keys)
+        val_arr = np.concatenate(vals)
+        order = np.argsort(key_arr, kind="stable")
+        key_arr, val_arr = key_arr[order], val_arr[order]
+        starts = np.flatnonzero(np.r_[True, key_arr[1:] != key_arr[:-1]])
+        dots = np.add.reduceat(val_arr, starts)
+        key_arr = key_arr[starts]
+        rows = key_arr // num_docs
+        docs = (key_arr % num_docs).astype(np.int32)
+
+        q_norms = np.array([vectors[qi][1] for qi in chunk], dtype=np.float64)
+        denom = self._doc_norms[docs].astype(np.float64) * q_norms[rows]
+        bounds = np.searchsorted(rows, np.arange(len(chunk) + 1))
+        for row, qi in enumerate(chunk):
+            lo, hi = int(bounds[row]), int(bounds[row + 1])
+            if lo < hi:
+                ranked[qi] = _select_top_k(docs[lo:hi], dots[lo:hi], denom[lo:hi], top_k, min_score)
+
+    def _rank(
+        self, vectors: List[Tuple[Dict[int, float], float]], top_k: int, min_score: float
+    ) -> List[List[Tuple[int, float]]]:
+        """(doc, score) top-k per query vector, ordered by (score desc, doc asc)."""
+        score = {
+            "python": self._score_python,
+            "numpy": self._score_numpy,
+        }[self.engine]
+        active = [i for i, (q_weights, _) in enumerate(vectors) if q_weights]
+        ranked: List[List[Tuple[int, float]]] = [[] for _ in vectors]
+        if top_k <= 0:
+            active = []
+        if self.batch_min_queries and len(active) >= self.batch_min_queries:
+            for i, res in zip(active, self._score_batch([vectors[i] for i in active], top_k, min_score)):
+                ranked[i] = res
+        else:
+            for i in active:
+                q_weights, q_norm = vectors[i]
+                ranked[i] = score(q_weights, q_norm, top_k, min_score)
+        return ranked
 
+    def _match(self, doc_idx: int, sim: float) -> Match:
+        return Match(item_id=self._docs.item_id(doc_idx), score=sim, meta=self._docs.meta(doc_idx))
 
+    def search(self, query: ItemFeatures, top_k: int = 5, min_score: float = 0.0) -> List[List[Match]]:
+        """Top-k matches per query item; matches scoring below ``min_score`` are dropped."""
+        vectors = [self._query_vector(it.tokens) for it in query.items]
+        ranked = self._rank(vectors, top_k, min_score)
+        return [[self._match(doc_idx, sim) for doc_idx, sim in top] for top in ranked]
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from math import isfinite
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+class StringColumn:
+    """Strings packed into one UTF-8 buffer.
+
+    Row ``i`` is ``data[offsets[i]:offsets[i + 1]]``. ``present`` marks the
+    rows that hold a value (None when all do); missing rows are empty.
+    Arrays may be views into an mmap'd snapshot.
+    """
+
+    __slots__ = ("data", "offsets", "present")
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, present: Optional[np.ndarray] = None) -> None:
+        self.data = data
+        self.offsets = offsets
+        self.present = present
+
+    @classmethod
+    def from_values(cls, values: Sequence[Optional[str]], nullable: bool = False) -> "StringColumn":
+        encoded = [v.encode("utf-8") if v is not None else b"" for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        present = np.fromiter((v is not None for v in values), dtype=np.bool_, count=len(values)) if nullable else None
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets, present)
+
+    @classmethod
+    def concat(cls, columns: Sequence["StringColumn"]) -> "StringColumn":
+        if len(columns) == 1:
+            return columns[0]
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for col in columns:
+            offsets.append(col.offsets[1:] + (base - col.offsets[0]))
+            base += int(col.offsets[-1] - col.offsets[0])
+        present = None
+        if any(col.present is not None for col in columns):
+            present = np.concatenate([col.present if col.present is not None else np.ones(len(col), dtype=np.bool_) for col in columns])
+        data = np.concatenate([col.data[col.offsets[0] : col.offsets[-1]] for col in columns])
+        return cls(data, np.concatenate(offsets), present)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + self.offsets.nbytes + (self.present.nbytes if self.present is not None else 0))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if self.present is not None and not self.present[i]:
+            return None
+        return self.data[self.offsets[i] : self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        buf = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        present = self.present.tolist() if self.present is not None else None
+        for i in range(len(offsets) - 1):
+            if present is not None and not present[i]:
+                yield None
+            else:
+                yield buf[offsets[i] : offsets[i + 1]].decode("utf-8")
+
+    def slice(self, first: int, last: int) -> "StringColumn":
+        offsets = self.offsets[first : last + 1]
+        present = self.present[first:last] if self.present is not None else None
+        return StringColumn(self.data[offsets[0] : offsets[-1]], offsets - offsets[0], present)
+
+    def take(self, rows: np.ndarray) -> "StringColumn":
+        """Rows ``rows`` (ascending or not) gathered into a new column."""
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        byte_rows = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1], dtype=np.int64)
+        present = self.present[rows] if self.present is not None else None
+        return StringColumn(self.data[byte_rows], offsets, present)
+
+
+# prices are kept as float64 (NaN = missing) when every value reads back as
+# the same string; otherwise as text
+PriceColumn = Union[np.ndarray, StringColumn]
+
+
+def _price_column(values: Sequence[Optional[str]]) -> PriceColumn:
+    prices = np.full(len(values), np.nan, dtype=np.float64)
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        try:
+            x = float(v)
+        except ValueError:
+            return StringColumn.from_values(values, nullable=True)
+        if not isfinite(x) or str(x) != v:
+            return StringColumn.from_values(values, nullable=True)
+        prices[i] = x
+    return prices
+
+
+def _price_text(prices: PriceColumn) -> StringColumn:
+    if isinstance(prices, StringColumn):
+        return prices
+    return StringColumn.from_values([str(x) if x == x else None for x in prices.tolist()], nullable=True)
+
+
+class DocStore:
+    """Item ids and match metadata of an index's docs, held column-wise.
+
+    Replaces a list of per-doc meta dicts: ids, names, prices, skus and
+    catalog ids are parallel columns, marketplaces are small integer codes
+    into ``marketplaces``. ``meta(i)`` rebuilds the dict ``item_meta``
+    produced for doc ``i`` only when a match is returned.
+    """
+
+    __slots__ = ("ids", "names", "prices", "skus", "sources", "marketplace_codes", "marketplaces")
+
+    _STRINGS = ("ids", "names", "skus", "sources")
+
+    def __init__(
+        self,
+        ids: StringColumn,
+        names: StringColumn,
+        prices: PriceColumn,
+        skus: StringColumn,
+        sources: StringColumn,
+        marketplace_codes: np.ndarray,
+        marketplaces: List[str],
+    ) -> None:
+        self.ids = ids
+        self.names = names
+        self.prices = prices
+        self.skus = skus
+        self.sources = sources  # the catalog's own item id (``id`` meta)
+        self.marketplace_codes = marketplace_codes  # int32 index into marketplaces, -1 = missing
+        self.marketplaces = marketplaces
+
+    @classmethod
+    def empty(cls) -> "DocStore":
+        return DocStoreBuilder().build()
+
+    @classmethod
+    def concat(cls, stores: Sequence["DocStore"]) -> "DocStore":
+        """Stores appended in order; marketplace codes are remapped to one table."""
+        if not stores:
+            return cls.empty()
+        if len(stores) == 1:
+            return stores[0]
+        table: Dict[str, int] = {}
+        codes: List[np.ndarray] = []
+        for store in stores:
+            lut = np.array([table.setdefault(m, len(table)) for m in store.marketplaces] + [-1], dtype=np.int32)
+            codes.append(lut[store.marketplace_codes])  # -1 picks the trailing -1
+        if all(isinstance(s.prices, np.ndarray) for s in stores):
+            prices: PriceColumn = np.concatenate([s.prices for s in stores])
+        else:
+            prices = StringColumn.concat([_price_text(s.prices) for s in stores])
+        return cls(
+            StringColumn.concat([s.ids for s in stores]),
+            StringColumn.concat([s.names for s in stores]),
+            prices,
+            StringColumn.concat([s.skus for s in stores]),
+            StringColumn.concat([s.sources for s in stores]),
+            np.concatenate(codes),
+            list(table),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        columns = (self.ids, self.names, self.prices, self.skus, self.sources, self.marketplace_codes)
+        return sum(int(c.nbytes) for c in columns) + sum(len(m) for m in self.marketplaces)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def item_id(self, i: int) -> str:
+        return self.ids[i]  # type: ignore[return-value]  # not nullable
+
+    def price(self, i: int) -> Optional[str]:
+        if isinstance(self.prices, StringColumn):
+            return self.prices[i]
+        x = float(self.prices[i])
+        return str(x) if x == x else None
+
+    def meta(self, i: int) -> Dict[str, str]:
+        """Meta returned with matches, as ``item_meta`` built it (price, sku, marketplace, id, name)."""
+        meta: Dict[str, str] = {}
+        price = self.price(i)
+        if price is not None:
+            meta["price"] = price
+        sku = self.skus[i]
+        if sku is not None:
+            meta["sku"] = sku
+        code = int(self.marketplace_codes[i])
+        if code >= 0:
+            meta["marketplace"] = self.marketplaces[code]
+        source = self.sources[i]
+        if source is not None:
+            meta["id"] = source
+        meta["name"] = self.names[i] or ""
+        return meta
+
+    def iter_meta(self) -> Iterator[Dict[str, str]]:
+        for i in range(len(self)):
+            yield self.meta(i)
+
+    def slice(self, first: int, last: int) -> "DocStore":
+        prices = self.prices.slice(first, last) if isinstance(self.prices, StringColumn) else self.prices[first:last]
+        return DocStore(
+            self.ids.slice(first, last),
+            self.names.slice(first, last),
+            prices,
+            self.skus.slice(first, last),
+            self.sources.slice(first, last),
+            self.marketplace_codes[first:last],
+            self.marketplaces,
+        )
+
+    def take(self, keep: np.ndarray) -> "DocStore":
+        """Docs where the boolean mask ``keep`` is set."""
+        rows = np.flatnonzero(keep)
+        return DocStore(
+            self.ids.take(rows),
+            self.names.take(rows),
+            self.prices.take(rows) if isinstance(self.prices, StringColumn) else self.prices[rows],
+            self.skus.take(rows),
+            self.sources.take(rows),
+            self.marketplace_codes[rows],
+            self.marketplaces,
+        )
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Flat arrays by name, for snapshots; ``marketplaces`` is stored separately."""
+        out: Dict[str, np.ndarray] = {"marketplace_codes": self.marketplace_codes}
+        for name in self._STRINGS + ("prices",):
+            col = getattr(self, name)
+            if isinstance(col, StringColumn):
+                out[f"{name}.data"] = col.data
+                out[f"{name}.offsets"] = col.offsets
+                if col.present is not None:
+                    out[f"{name}.present"] = col.present
+            else:
+                out[name] = col
+        return out
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], marketplaces: List[str]) -> "DocStore":
+        def column(name: str) -> PriceColumn:
+            if f"{name}.data" not in columns:
+                return columns[name]
+            return StringColumn(columns[f"{name}.data"], columns[f"{name}.offsets"], columns.get(f"{name}.present"))
+
+        return cls(
+            column("ids"),  # type: ignore[arg-type]
+            column("names"),  # type: ignore[arg-type]
+            column("prices"),
+            column("skus"),  # type: ignore[arg-type]
+            column("sources"),  # type: ignore[arg-type]
+            columns["marketplace_codes"],
+            marketplaces,
+        )
+
+
+class DocStoreBuilder:
+    """Collects docs one at a time and packs them into a ``DocStore``."""
+
+    def __init__(self) -> None:
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._prices: List[Optional[str]] = []
+        self._skus: List[Optional[str]] = []
+        self._sources: List[Optional[str]] = []
+        self._codes: List[int] = []
+        self._marketplaces: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def append(self, item_id: str, meta: Dict[str, str]) -> None:
+        """Add a doc with the meta dict ``item_meta`` built for it."""
+        self._ids.append(item_id)
+        self._names.append(meta.get("name", ""))
+        self._prices.append(meta.get("price"))
+        self._skus.append(meta.get("sku"))
+        self._sources.append(meta.get("id"))
+        marketplace = meta.get("marketplace")
+        self._codes.append(-1 if marketplace is None else self._marketplaces.setdefault(marketplace, len(self._marketplaces)))
+
+    def build(self) -> DocStore:
+        return DocStore(
+            StringColumn.from_values(self._ids),
+            StringColumn.from_values(self._names),
+            _price_column(self._prices),
+            StringColumn.from_values(self._skus, nullable=True),
+            StringColumn.from_values(self._sources, nullable=True),
+            np.array(self._codes, dtype=np.int32),
+            list(self._marketplaces),
+        )
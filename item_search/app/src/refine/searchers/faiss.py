@@ -8,4 +8,8 @@ class FaissIndex(VectorIndex):  # type: ignore[misc]
     def __init__(self):
         raise NotImplementedError("FAISS adapter not implemented in baseline")
 
+    @property
+    def is_fitted(self) -> bool:
+        return False
+
 
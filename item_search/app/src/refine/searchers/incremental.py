@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_left
+from collections import Counter
+from copy import copy
+from itertools import chain
+from math import log
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from .cosine_index import CosineIndex, query_vector
+from .models import Match, VectorIndex
+from .segments import SegmentedIndex
+from ..extractors.models import ItemFeature, ItemFeatures
+from ..config import DELTA_MERGE_ITEMS, IDF_REFRESH_RATIO
+
+
+def item_key(item: ItemFeature) -> str:
+    key = item.attrs.get("id")
+    if key is None:
+        raise ValueError(f"Item {item.item_id!r} has no 'id' attribute; updates are keyed by id")
+    return str(key)
+
+
+class _GrownVocab(Mapping[str, int]):
+    """Base vocabulary plus terms first seen in pending updates, numbered after the base ones."""
+
+    def __init__(self, base: Dict[str, int], extra: Dict[str, int]) -> None:
+        self.base = base
+        self.extra = extra
+
+    def __getitem__(self, token: str) -> int:
+        tid = self.base.get(token)
+        return tid if tid is not None else self.extra[token]
+
+    def get(self, token: str, default: Any = None) -> Any:  # type: ignore[override]
+        tid = self.base.get(token)
+        return tid if tid is not None else self.extra.get(token, default)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self.base or token in self.extra
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        return chain(self.base, self.extra)
+
+
+class _GrownIdf(Sequence[float]):
+    """IDF of a ``_GrownVocab``: the base IDF followed by that of the new terms."""
+
+    def __init__(self, base: Sequence[float], extra: List[float]) -> None:
+        self.base = base
+        self.extra = extra
+        self._split = len(base)
+
+    def __getitem__(self, tid: int) -> float:  # type: ignore[override]
+        return self.base[tid] if tid < self._split else self.extra[tid - self._split]
+
+    def __len__(self) -> int:
+        return self._split + len(self.extra)
+
+
+class _View(NamedTuple):
+    base: SegmentedIndex
+    delta: Optional[CosineIndex]  # pending items fitted with ``vocab``/``idf``
+    pending: Dict[str, ItemFeature]
+    tombstones: FrozenSet[int]  # base docs deleted or replaced
+    vocab: Mapping[str, int]  # base vocabulary, grown by terms only pending items have
+    idf: Sequence[float]
+
+
+def _grow_vocab(base: SegmentedIndex, items: Iterable[ItemFeature], num_docs: int) -> Tuple[Mapping[str, int], Sequence[float]]:
+    """Vocabulary and IDF for fitting ``items`` over ``base``: unknown terms get appended ids.
+
+    Base IDF is kept as is, so delta scores stay comparable with base
+    scores; a new term gets the smoothed IDF of its DF among ``items`` out
+    of ``num_docs`` live docs.
+    """
+    known = base._vocab
+    df: Counter[str] = Counter()
+    for it in items:
+        df.update(t for t in dict.fromkeys(it.tokens) if t not in known)
+    if not df:
+        return known, base._idf
+    extra = {token: len(known) + i for i, token in enumerate(df)}
+    extra_idf = [log((1.0 + num_docs) / (1.0 + n)) + 1.0 for n in df.values()]
+    return _GrownVocab(known, extra), _GrownIdf(base._idf, extra_idf)
+
+
+def _rank_live(
+    base: SegmentedIndex, vectors: List[Tuple[Dict[int, float], float]], top_k: int, min_score: float, dead: FrozenSet[int]
+) -> List[List[Tuple[int, float]]]:
+    """Base top-k per query without tombstoned docs.
+
+    Ranks with plain ``top_k`` first; only queries that lost hits to
+    tombstones and may have more candidates are ranked again, with ``k``
+    doubled (up to ``top_k`` plus every tombstone).
+    """
+    ranked = base._rank(vectors, top_k, min_score)
+    if not dead:
+        return ranked
+    live = [[hit for hit in hits if hit[0] not in dead] for hits in ranked]
+    k, limit = top_k, top_k + len(dead)
+    todo = [qi for qi, hits in enumerate(ranked) if len(hits) == k and len(live[qi]) < top_k]
+    while todo and k < limit:
+        k = min(max(2 * k, k + 1), limit)
+        for qi, hits in zip(todo, base._rank([vectors[qi] for qi in todo], k, min_score)):
+            ranked[qi] = hits
+            live[qi] = [hit for hit in hits if hit[0] not in dead]
+        todo = [qi for qi in todo if len(ranked[qi]) == k and len(live[qi]) < top_k]
+    return live
+
+
+class IncrementalIndex(VectorIndex):
+    """Updatable index: a segmented base, a small delta segment and tombstones.
+
+    - Upserts are fitted into the delta against the base vocabulary and IDF,
+      so delta scores are directly comparable with base scores; terms the
+      base has never seen get new ids after the base ones, so updated items
+      are found by their new words right away
+    - Replaced and deleted base docs are tombstoned and filtered out of results
+    - When delta items plus tombstones reach ``merge_items`` a background
+      thread rewrites the affected base segments without deleted docs,
+      appends the delta as a new segment and adopts the grown vocabulary;
+      IDF is refreshed at that point once the number of changed items
+      exceeds ``idf_refresh_ratio`` of the catalog. Updates made while a
+      merge runs are carried over to the merged base
+
+    Readers take an immutable view, so searches never block on updates.
+    Items are keyed by their ``id`` attribute.
+    """
+
+    def __init__(
+        self,
+        base: Union[CosineIndex, SegmentedIndex, None] = None,
+        merge_items: int = DELTA_MERGE_ITEMS,
+        idf_refresh_ratio: float = IDF_REFRESH_RATIO,
+    ) -> None:
+        self.merge_items = merge_items
+        self.idf_refresh_ratio = idf_refresh_ratio
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()  # one merge at a time, background or explicit
+        self._merger: Optional[threading.Thread] = None
+        if base is None:
+            base = SegmentedIndex()
+        elif isinstance(base, CosineIndex):
+            base = SegmentedIndex.from_segments([base]) if base.is_fitted else SegmentedIndex(base.engine, base.batch_min_queries)
+        self._view = _View(base, None, {}, frozenset(), base._vocab, base._idf)
+        self._base_keys: Optional[Dict[str, List[int]]] = None
+        self._changed = 0  # items upserted/deleted since IDF was last computed
+        self._next_row = len(base)  # row number of the next new item (``raw:<n>``)
+        self._merges = 0
+        self._idf_refreshes = 0
+
+    @property
+    def base(self) -> SegmentedIndex:
+        return self._view.base
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._view.base.is_fitted
+
+    @property
+    def generation(self) -> int:
+        """Bumped when scores change without an update (a background IDF refresh)."""
+        return self._idf_refreshes
+
+    def __len__(self) -> int:
+        view = self._view
+        return len(view.base) - len(view.tombstones) + len(view.pending)
+
+    def memory_usage(self) -> int:
+        view = self._view
+        return view.base.memory_usage() + (view.delta.memory_usage() if view.delta is not None else 0)
+
+    def stats(self) -> Dict[str, Any]:
+        view = self._view
+        return {
+            "items": len(self),
+            "delta_items": len(view.pending),
+            "tombstones": len(view.tombstones),
+            "new_terms": len(view.vocab) - len(view.base._vocab),
+            "merges": self._merges,
+            "idf_refreshes": self._idf_refreshes,
+            **view.base.stats(),
+        }
+
+    def fit(self, corpus: ItemFeatures) -> None:
+        base = SegmentedIndex.from_segments([], like=self._view.base)
+        base.fit(corpus)
+        with self._merge_lock, self._lock:
+            self._view = _View(base, None, {}, frozenset(), base._vocab, base._idf)
+            self._base_keys = None
+            self._changed = 0
+            self._next_row = len(base)
+
+    def _keys(self, base: SegmentedIndex) -> Dict[str, List[int]]:
+        if self._base_keys is None:
+            keys: Dict[str, List[int]] = {}
+            for doc_idx, key in enumerate(base.iter_keys()):
+                if key is not None:
+                    keys.setdefault(key, []).append(doc_idx)
+            self._base_keys = keys
+        return self._base_keys
+
+    def upsert(self, items: Iterable[ItemFeature]) -> int:
+        """Add or replace items by id; visible to the next search.
+
+        A replacement takes over the ``item_id`` of the doc it replaces, a new
+        item gets the next ``raw:<n>`` after the rows indexed so far.
+        """
+        items = list(items)
+        keyed = [(item_key(it), it) for it in items]
+        with self._lock:
+            view = self._view
+            base_keys = self._keys(view.base)
+            pending = dict(view.pending)
+            tombstones = set(view.tombstones)
+            for key, it in keyed:
+                docs = base_keys.get(key, ())
+                tombstones.update(docs)
+                previous = pending.pop(key, None)  # re-inserted at the end, like an appended row
+                # the item keeps the id it was indexed under; new ones continue the row numbering
+                if previous is not None:
+                    it.item_id = previous.item_id
+                elif docs:
+                    it.item_id = view.base._match(docs[0], 0.0).item_id
+                else:
+                    it.item_id = f"raw:{self._next_row}"
+                    self._next_row += 1
+                pending[key] = it
+            self._changed += len(keyed)
+            self._apply(view.base, pending, tombstones)
+        self._maybe_merge()
+        return len(keyed)
+
+    def delete(self, keys: Iterable[str]) -> int:
+        """Remove items by id; returns how many indexed items were removed."""
+        with self._lock:
+            view = self._view
+            base_keys = self._keys(view.base)
+            pending = dict(view.pending)
+            tombstones = set(view.tombstones)
+            removed = 0
+            for key in map(str, keys):
+                docs = [d for d in base_keys.get(key, ()) if d not in tombstones]
+                tombstones.update(docs)
+                removed += len(docs) + (pending.pop(key, None) is not None)
+            self._changed += removed
+            if removed:
+                self._apply(view.base, pending, tombstones)
+        self._maybe_merge()
+        return removed
+
+    def _apply(self, base: SegmentedIndex, pending: Dict[str, ItemFeature], tombstones: Set[int]) -> None:
+        delta: Optional[CosineIndex] = None
+        vocab: Mapping[str, int] = base._vocab
+        idf: Sequence[float] = base._idf
+        if pending:
+            # refit of the delta only: cost is proportional to the pending items
+            items = list(pending.values())
+            vocab, idf = _grow_vocab(base, items, len(base) - len(tombstones) + len(pending))
+            delta = CosineIndex(engine=base.engine, batch_min_queries=base.batch_min_queries)
+            delta.fit_frozen(ItemFeatures(items=items), vocab, idf)  # type: ignore[arg-type]
+        self._view = _View(base, delta, pending, frozenset(tombstones), vocab, idf)
+
+    # --- merging ------------------------------------------------------------
+
+    def _merge_due(self) -> bool:
+        view = self._view
+        return len(view.pending) + len(view.tombstones) >= self.merge_items > 0
+
+    def _maybe_merge(self) -> None:
+        """Start the background merger once enough changes have piled up."""
+        with self._lock:
+            if not self._merge_due() or (self._merger is not None and self._merger.is_alive()):
+                return
+            self._merger = threading.Thread(target=self._merge_loop, name="delta-merge", daemon=True)
+            self._merger.start()
+
+    def _merge_loop(self) -> None:
+        while True:
+            with self._lock:
+                if not self._merge_due():
+                    return
+            self.merge()
+
+    def wait_for_merges(self, timeout: Optional[float] = None) -> None:
+        merger = self._merger
+        if merger is not None:
+            merger.join(timeout)
+
+    def merge(self) -> None:
+        """Fold the delta and tombstones into the base segments.
+
+        The new base is built without holding the index lock, so searches
+        and updates go on meanwhile; updates made in that time are rebased
+        onto the merged base when it is installed.
+        """
+        with self._merge_lock:
+            snap = self._view
+            changed = self._changed
+            if not snap.pending and not snap.tombstones:
+                return
+            base = snap.base
+            delta = snap.delta
+            if len(snap.vocab) > len(base._vocab):
+                vocab = dict(base._vocab)
+                vocab.update(snap.vocab.extra)  # type: ignore[attr-defined]
+                idf = list(base._idf) + snap.idf.extra  # type: ignore[attr-defined]
+                base = base.with_vocab(vocab, idf)
+                if delta is not None:
+                    delta = copy(delta)
+                    delta._vocab, delta._idf = vocab, idf
+            merged = base.with_changes(snap.tombstones, delta)
+            refresh = changed >= self.idf_refresh_ratio * len(merged)
+            if refresh:
+                merged = merged.with_refreshed_idf()
+            merged.maybe_merge()
+
+            with self._lock:
+                current = self._view
+                # base docs tombstoned meanwhile, in merged ids (the snapshot's tombstones are gone)
+                dropped = sorted(snap.tombstones)
+                tombstones = {d - bisect_left(dropped, d) for d in current.tombstones - snap.tombstones}
+                # the snapshot's pending items are the last segment of merged, in pending order
+                first = len(snap.base) - len(snap.tombstones)
+                for pos, (key, it) in enumerate(snap.pending.items()):
+                    if current.pending.get(key) is not it:  # replaced or deleted meanwhile
+                        tombstones.add(first + pos)
+                pending = {key: it for key, it in current.pending.items() if snap.pending.get(key) is not it}
+                self._base_keys = None
+                self._apply(merged, pending, tombstones)
+                if refresh:
+                    self._changed -= changed
+                    self._idf_refreshes += 1
+                self._merges += 1
+
+    # --- search -------------------------------------------------------------
+
+    def search(self, query: ItemFeatures, top_k: int = 5, min_score: float = 0.0) -> List[List[Match]]:
+        """Top-k over base and delta, ordered as if the delta were appended to the base."""
+        base, delta, _, dead, vocab, idf = self._view
+        vectors = [query_vector(it.tokens, vocab, idf) for it in query.items]  # type: ignore[arg-type]
+        # new terms only occur in the delta; the base skips them but keeps the full query norm
+        known = len(base._vocab)
+        base_vectors = [
+            (w if all(tid < known for tid in w) else {tid: x for tid, x in w.items() if tid < known}, norm) for w, norm in vectors
+        ]
+        base_ranked = _rank_live(base, base_vectors, top_k, min_score, dead)
+        delta_ranked = delta._rank(vectors, top_k, min_score) if delta is not None else [[] for _ in vectors]
+
+        num_base = len(base)
+        results: List[List[Match]] = []
+        for from_base, from_delta in zip(base_ranked, delta_ranked):
+            hits: List[Tuple[float, int]] = [(-sim, doc) for doc, sim in from_base]
+            hits.extend((-sim, num_base + doc) for doc, sim in from_delta)
+            out: List[Match] = []
+            for neg, doc in heapq.nsmallest(top_k, hits):
+                if doc < num_base:
+                    out.append(base._match(doc, -neg))
+                else:
+                    assert delta is not None
+                    out.append(delta._match(doc - num_base, -neg))
+            results.append(out)
+        return results
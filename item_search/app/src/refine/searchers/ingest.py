@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .segments import ShardPostings, shard_postings
+from ..extractors.features import iter_row_features
+from ..extractors.vocabulary import Vocabulary
+from ..parsers.tabular_parser import iter_rows
+from ..config import (
+    EXTRACT_SHARD_ROWS,
+    EXTRACT_WORKERS,
+    EXTRACT_MAX_WORKERS,
+    EXTRACT_PARALLEL_MIN_BYTES,
+    EXTRACT_NICE,
+    REFERENCE_READ_WORKERS,
+    REFERENCE_PREFETCH_SHARDS,
+)
+
+
+_extract_workers = int(os.getenv("EXTRACT_WORKERS", EXTRACT_WORKERS))
+_read_workers = int(os.getenv("REFERENCE_READ_WORKERS", REFERENCE_READ_WORKERS))
+_extract_nice = int(os.getenv("EXTRACT_NICE", EXTRACT_NICE))
+
+_END = object()  # reader sentinel: file fully read
+
+
+@dataclass
+class FileLoadStats:
+    """Per-reference timing of a warmup build."""
+
+    path: Path
+    items: int = 0
+    read_seconds: float = 0.0  # reading and decoding rows, on the reader thread
+    extract_seconds: float = 0.0  # featurization summed over the file's shards
+
+
+def extract_shard(rows: List[Dict[str, Any]], start: int, vocabulary: Optional[Vocabulary] = None) -> ShardPostings:
+    """Featurize catalog rows (numbered from ``start`` in their file) into raw postings.
+
+    With ``vocabulary`` tokens are interned into it as they are extracted
+    (in-process builds); otherwise the shard gets its own token table.
+    """
+    return shard_postings(iter_row_features(rows, start, vocabulary), vocabulary)
+
+
+def _lower_priority(increment: int) -> None:
+    if increment > 0 and hasattr(os, "nice"):
+        os.nice(increment)
+
+
+def _extract_timed(rows: List[Dict[str, Any]], start: int, vocabulary: Optional[Vocabulary] = None) -> Tuple[ShardPostings, float]:
+    t0 = time.perf_counter()
+    shard = extract_shard(rows, start, vocabulary)
+    return shard, time.perf_counter() - t0
+
+
+def _read_chunks(path: Path, shard_rows: int, cap: Optional[int], stats: FileLoadStats) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """Row chunks of one file with their first row number; at most ``cap`` rows."""
+    rows = iter_rows(path)
+    try:
+        start = 0
+        while cap is None or start < cap:
+            t0 = time.perf_counter()
+            chunk = list(islice(rows, shard_rows if cap is None else min(shard_rows, cap - start)))
+            stats.read_seconds += time.perf_counter() - t0
+            if not chunk:
+                return
+            yield chunk, start
+            start += len(chunk)
+    finally:
+        close = getattr(rows, "close", None)  # releases open workbooks on early stop
+        if close is not None:
+            close()
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _read_into(q: queue.Queue, stop: threading.Event, path: Path, shard_rows: int, cap: Optional[int], stats: FileLoadStats) -> None:
+    try:
+        for chunk in _read_chunks(path, shard_rows, cap, stats):
+            if not _put(q, chunk, stop):
+                return
+        _put(q, _END, stop)
+    except BaseException as e:  # handed to the consumer, which re-raises in order
+        _put(q, e, stop)
+
+
+def _row_shards(
+    paths: Sequence[Path],
+    limit_items: Optional[int],
+    shard_rows: int,
+    read_workers: int,
+    stats: List[FileLoadStats],
+) -> Iterator[Tuple[int, List[Dict[str, Any]], int]]:
+    """(file index, rows, first row number) in file order, then row order.
+
+    With several files, up to ``read_workers`` of them are read ahead on
+    threads into small bounded queues; the caller still sees file order.
+    """
+    remaining = limit_items if limit_items is not None and limit_items > 0 else None
+    if read_workers <= 1 or len(paths) <= 1:
+        for i, path in enumerate(paths):
+            for chunk, start in _read_chunks(path, shard_rows, remaining, stats[i]):
+                stats[i].items += len(chunk)
+                yield i, chunk, start
+                if remaining is not None:
+                    remaining -= len(chunk)
+            if remaining == 0:
+                return
+        return
+
+    stop = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(maxsize=REFERENCE_PREFETCH_SHARDS) for _ in paths]
+    readers = ThreadPoolExecutor(max_workers=min(read_workers, len(paths)), thread_name_prefix="ref-read")
+    try:
+        # FIFO submission: the file being consumed always has a running reader
+        for i, path in enumerate(paths):
+            readers.submit(_read_into, queues[i], stop, path, shard_rows, remaining, stats[i])
+        for i, q in enumerate(queues):
+            while True:
+                item = q.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                chunk, start = item
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                stats[i].items += len(chunk)
+                yield i, chunk, start
+                if remaining == 0:
+                    return
+    finally:
+        stop.set()
+        readers.shutdown(wait=True, cancel_futures=True)
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPUs allowed by the cgroup CPU quota (v2 ``cpu.max`` or v1 CFS), None if unlimited."""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota_us = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period_us = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+    except (OSError, ValueError):
+        return None
+    return quota_us / period_us if quota_us > 0 and period_us > 0 else None
+
+
+def available_cpus() -> int:
+    """CPUs this process may actually use: affinity mask, then the container's CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, int(limit)))
+    return max(1, cpus)
+
+
+def _resolve_workers(workers: Optional[int]) -> int:
+    n = _extract_workers if workers is None else workers
+    return n if n > 0 else min(available_cpus(), EXTRACT_MAX_WORKERS)
+
+
+def iter_catalog_shards(
+    paths: Sequence[Path],
+    limit_items: Optional[int] = None,
+    workers: Optional[int] = None,
+    shard_rows: int = EXTRACT_SHARD_ROWS,
+    parallel_min_bytes: int = EXTRACT_PARALLEL_MIN_BYTES,
+    read_workers: Optional[int] = None,
+    file_stats: Optional[List[FileLoadStats]] = None,
+) -> Iterator[ShardPostings]:
+    """Raw postings of reference catalogs, shard by shard and in row order.
+
+    Files are read ahead concurrently on threads and rows are featurized on
+    a process pool when the references are large enough; at most two shards
+    per worker are in flight, and shards are yielded in file and row order
+    so the index is identical to a serial build. Per-file timings are
+    appended to ``file_stats`` when given.
+    """
+    workers = _resolve_workers(workers)
+    read_workers = _read_workers if read_workers is None else read_workers
+    stats = [FileLoadStats(path=p) for p in paths]
+    if file_stats is not None:
+        file_stats.extend(stats)
+
+    total_bytes = sum(p.stat().st_size for p in paths)
+    # a limit below one shard per worker reads too few rows to pay for spawning the pool
+    few_rows = limit_items is not None and 0 < limit_items < shard_rows * workers
+    with closing(_row_shards(paths, limit_items, shard_rows, read_workers, stats)) as shards:
+        if workers == 1 or few_rows or total_bytes < parallel_min_bytes:
+            # one interned token table for the whole build: rows carry token ids
+            # and the index builder takes the shards' ids without remapping
+            vocabulary = Vocabulary()
+            for i, rows, start in shards:
+                shard, seconds = _extract_timed(rows, start, vocabulary)
+                stats[i].extract_seconds += seconds
+                yield shard
+            return
+
+        # spawn: forking a process that already runs threads (server, merges) is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_lower_priority, initargs=(_extract_nice,))
+        with pool:
+            pending: Deque[Tuple[int, Future]] = deque()
+
+            def _done() -> ShardPostings:
+                i, fut = pending.popleft()
+                shard, seconds = fut.result()
+                stats[i].extract_seconds += seconds
+                return shard
+
+            for i, rows, start in shards:
+                pending.append((i, pool.submit(_extract_timed, rows, start)))
+                if len(pending) >= 2 * workers:
+                    yield _done()
+            while pending:
+                yield _done()
@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
 
 from ..extractors.models import ItemFeatures
-from ..config import FUZZY_SKU_THRESHOLD, FUZZY_NAME_THRESHOLD
+from ..config import FUZZY_SKU_THRESHOLD, FUZZY_NAME_THRESHOLD, PRUNE_BELOW_THRESHOLD
 from difflib import SequenceMatcher
 
 
@@ -29,8 +29,10 @@ class SearchResult:
 
 @runtime_checkable
 class VectorIndex(Protocol):
+    @property
+    def is_fitted(self) -> bool: ...
     def fit(self, corpus: ItemFeatures) -> None: ...
-    def search(self, query: ItemFeatures, top_k: int = 5) -> List[List[Match]]: ...
+    def search(self, query: ItemFeatures, top_k: int = 5, min_score: float = 0.0) -> List[List[Match]]: ...
 
 
 def _price_from_meta(meta: Dict[str, Any]) -> Optional[float]:
@@ -46,12 +48,27 @@ def _price_from_meta(meta: Dict[str, Any]) -> Optional[float]:
 
 def search(query: ItemFeatures, reference: ItemFeatures, index: VectorIndex, top_k: int = 5,
            threshold: float = 0.35) -> List[SearchResult]:
-    """Run vector search, apply threshold, choose cheapest among passed.
+    """Fit ``index`` on ``reference`` and run :func:`search_prepared`.
 
-    Returns list aligned to query.items order.
+    Convenient for one-shot pipelines; long-lived services should fit once
+    and call :func:`search_prepared` per query.
     """
     index.fit(reference)
-    all_matches = index.search(query, top_k=top_k)
+    return search_prepared(query, index, top_k=top_k, threshold=threshold)
+
+
+def search_prepared(query: ItemFeatures, index: VectorIndex, top_k: int = 5,
+                    threshold: float = 0.35, prune: bool = PRUNE_BELOW_THRESHOLD) -> List[SearchResult]:
+    """Run vector search on an already fitted index, apply threshold, choose cheapest among passed.
+
+    With ``prune`` the index drops candidates below ``threshold`` while
+    selecting top-k, which also leaves the fuzzy fallback nothing to rescue.
+
+    Returns list aligned to query.items order.
+    """
+    if not index.is_fitted:
+        raise RuntimeError("Index is not fitted; call fit() first or use search()")
+    all_matches = index.search(query, top_k=top_k, min_score=threshold if prune else 0.0)
 
     results: List[SearchResult] = []
     for q_it, matches in zip(query.items, all_matches):
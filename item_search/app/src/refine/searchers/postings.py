@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+class CsrPostings:
+    """Inverted lists in CSR layout.
+
+    Term ``tid`` owns ``doc_ids[offsets[tid]:offsets[tid + 1]]`` and the
+    matching slice of ``weights``; doc ids are ascending within a term.
+    Arrays may be views into an mmap'd snapshot.
+    """
+
+    def __init__(self, offsets: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray) -> None:
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+
+    @classmethod
+    def empty(cls) -> "CsrPostings":
+        return cls(np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+
+    @classmethod
+    def from_columns(cls, tids: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray, num_terms: int) -> "CsrPostings":
+        """Group flat (term, doc, weight) columns by term; input must be in doc order."""
+        order = np.argsort(tids, kind="stable")
+        offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tids, minlength=num_terms), out=offsets[1:])
+        return cls(
+            offsets,
+            np.ascontiguousarray(doc_ids[order], dtype=np.int32),
+            np.ascontiguousarray(weights[order], dtype=np.float32),
+        )
+
+    @property
+    def num_terms(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.doc_ids.nbytes + self.weights.nbytes)
+
+    def __len__(self) -> int:
+        return self.num_terms
+
+    def span(self, tid: int) -> Tuple[int, int]:
+        return int(self.offsets[tid]), int(self.offsets[tid + 1])
+
+    def get(self, tid: int, default: Iterable[Tuple[int, float]] = ()) -> Iterable[Tuple[int, float]]:
+        if tid < 0 or tid >= self.num_terms:
+            return default
+        start, end = self.span(tid)
+        return zip(self.doc_ids[start:end].tolist(), self.weights[start:end].tolist())
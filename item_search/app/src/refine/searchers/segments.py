@@ -0,0 +1,553 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_right
+from itertools import islice, repeat
+from typing import Any, Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cosine_index import CosineIndex, doc_term_ids, doc_terms, item_meta, query_vector, vocab_from_df
+from .models import Match, VectorIndex
+from .doc_store import DocStore, DocStoreBuilder
+from .postings import CsrPostings
+from ..extractors.models import ItemFeature, ItemFeatures
+from ..extractors.vocabulary import Vocabulary
+from ..config import SCORING_ENGINE, BATCH_MIN_QUERIES, SEGMENT_SIZE, SEGMENT_MERGE_FACTOR, SEGMENT_MAX_MERGE_DOCS
+from ..config import EXTRACT_SHARD_ROWS
+
+
+def _posting_terms(postings: CsrPostings) -> np.ndarray:
+    """Term id of every posting (CSR offsets expanded to a column)."""
+    return np.repeat(np.arange(postings.num_terms, dtype=np.int32), np.diff(postings.offsets))
+
+
+def merge_segments(segments: Sequence[CosineIndex], keeps: Optional[Sequence[Optional[np.ndarray]]] = None) -> CosineIndex:
+    """Concatenate segments that share a vocabulary and IDF into one.
+
+    ``keeps[i]`` optionally masks the live docs of segment ``i``. Weights and
+    norms are copied as is, so scores do not change.
+    """
+    first = segments[0]
+    tids: List[np.ndarray] = []
+    docs: List[np.ndarray] = []
+    weights: List[np.ndarray] = []
+    norms: List[np.ndarray] = []
+    stores: List[DocStore] = []
+    base = 0
+    for i, seg in enumerate(segments):
+        keep = keeps[i] if keeps is not None else None
+        p = seg._postings
+        seg_tids = _posting_terms(p)
+        seg_docs = p.doc_ids.astype(np.int64)
+        seg_weights = np.asarray(p.weights)
+        seg_norms = np.asarray(seg._doc_norms)
+        seg_store = seg._docs
+        if keep is not None:
+            remap = np.cumsum(keep, dtype=np.int64) - 1
+            live = keep[p.doc_ids]
+            seg_tids, seg_docs, seg_weights = seg_tids[live], remap[seg_docs[live]], seg_weights[live]
+            seg_norms = seg_norms[keep]
+            seg_store = seg_store.take(keep)
+        tids.append(seg_tids)
+        docs.append(seg_docs + base)
+        weights.append(seg_weights)
+        norms.append(seg_norms)
+        stores.append(seg_store)
+        base += len(seg_store)
+
+    merged = CosineIndex(engine=first.engine, batch_min_queries=first.batch_min_queries)
+    merged._vocab = first._vocab
+    merged._idf = first._idf
+    # segments are concatenated in order and doc ids only grow, so per-term doc order holds
+    merged._postings = CsrPostings.from_columns(
+        np.concatenate(tids), np.concatenate(docs), np.concatenate(weights), num_terms=first._postings.num_terms
+    )
+    merged._doc_norms = np.ascontiguousarray(np.concatenate(norms), dtype=np.float32)
+    merged._docs = DocStore.concat(stores)
+    merged._fitted = True
+    return merged
+
+
+class ShardPostings(NamedTuple):
+    """Raw postings of a run of consecutive docs.
+
+    Shards are built independently (possibly in worker processes) and
+    combined in order by ``SegmentedIndex.fit_shards``. A shard either has
+    shard-local token ids (``tokens``/``df`` set, e.g. from a worker
+    process) or ids of a ``vocabulary`` shared with the build.
+    """
+
+    tokens: Optional[List[str]]  # local token id -> token, first-seen order
+    df: Optional[np.ndarray]  # int32 docs per local token
+    gids: np.ndarray  # int32 token id per posting
+    docs: np.ndarray  # int32 shard-local doc per posting, ascending
+    tfs: np.ndarray  # int32
+    boosts: np.ndarray  # float32 field boost
+    store: DocStore  # ids and meta of the shard's docs
+    vocabulary: Optional[Vocabulary] = None
+
+    @property
+    def doc_ids(self) -> Sequence[str]:
+        return self.store.ids  # type: ignore[return-value]
+
+
+def shard_postings(items: Iterable[ItemFeature], vocabulary: Optional[Vocabulary] = None) -> ShardPostings:
+    """Reduce items to raw (term, doc, tf, boost) columns; IDF is applied later.
+
+    With ``vocabulary`` the items carry ``token_ids`` from it and the shard
+    keeps those ids, so no token strings are hashed or copied here.
+    """
+    if vocabulary is not None:
+        return _shard_postings_ids(items, vocabulary)
+    tokens: Dict[str, int] = {}
+    df = array("i")
+    gids = array("i")
+    docs = array("i")
+    tfs = array("i")
+    boosts = array("f")
+    store = DocStoreBuilder()
+    for doc, it in enumerate(items):
+        for token, cnt, boost in doc_terms(it):
+            lid = tokens.get(token)
+            if lid is None:
+                lid = tokens[token] = len(tokens)
+                df.append(0)
+            df[lid] += 1
+            gids.append(lid)
+            docs.append(doc)
+            tfs.append(cnt)
+            boosts.append(boost)
+        store.append(it.item_id, item_meta(it))
+    return ShardPostings(
+        list(tokens),
+        np.frombuffer(df, dtype=np.int32),
+        np.frombuffer(gids, dtype=np.int32),
+        np.frombuffer(docs, dtype=np.int32),
+        np.frombuffer(tfs, dtype=np.int32),
+        np.frombuffer(boosts, dtype=np.float32),
+        store.build(),
+    )
+
+
+def _shard_postings_ids(items: Iterable[ItemFeature], vocabulary: Vocabulary) -> ShardPostings:
+    gids = array("i")
+    docs = array("i")
+    tfs = array("i")
+    boosts = array("f")
+    store = DocStoreBuilder()
+    for doc, it in enumerate(items):
+        tf, doc_boosts = doc_term_ids(it, vocabulary)
+        gids.extend(tf)
+        docs.extend(repeat(doc, len(tf)))
+        tfs.extend(tf.values())
+        boosts.extend(doc_boosts)
+        store.append(it.item_id, item_meta(it))
+    return ShardPostings(
+        None,
+        None,
+        np.frombuffer(gids, dtype=np.int32),
+        np.frombuffer(docs, dtype=np.int32),
+        np.frombuffer(tfs, dtype=np.int32),
+        np.frombuffer(boosts, dtype=np.float32),
+        store.build(),
+        vocabulary,
+    )
+
+
+class _SegmentBuffer:
+    """Raw postings of one segment before the global IDF is known."""
+
+    def __init__(self) -> None:
+        self.gids: List[np.ndarray] = []  # stream-wide token ids, pruned by DF at finish
+        self.docs: List[np.ndarray] = []
+        self.tfs: List[np.ndarray] = []
+        self.boosts: List[np.ndarray] = []
+        self.stores: List[DocStore] = []
+        self.num_docs = 0
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def extend(self, shard: ShardPostings, gids: np.ndarray, first: int, last: int) -> None:
+        """Append shard docs ``[first, last)``; ``gids`` are the shard's postings in global token ids."""
+        lo, hi = np.searchsorted(shard.docs, [first, last])
+        self.gids.append(gids[lo:hi])
+        self.docs.append(shard.docs[lo:hi] - first + self.num_docs)
+        self.tfs.append(shard.tfs[lo:hi])
+        self.boosts.append(shard.boosts[lo:hi])
+        self.stores.append(shard.store.slice(first, last))
+        self.num_docs += last - first
+
+    def finish(
+        self,
+        remap: np.ndarray,
+        idf_arr: np.ndarray,
+        vocab: Dict[str, int],
+        idf: Sequence[float],
+        engine: str,
+        batch_min_queries: int,
+    ) -> CosineIndex:
+        num_docs = self.num_docs
+        tids = remap[np.concatenate(self.gids)] if self.gids else np.zeros(0, dtype=np.int64)
+        live = tids >= 0
+        tids = tids[live]
+        docs = np.concatenate(self.docs).astype(np.int32)[live] if self.docs else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate(self.tfs)[live] if self.tfs else np.zeros(0, dtype=np.int32)
+        boosts = np.concatenate(self.boosts)[live] if self.boosts else np.zeros(0, dtype=np.float32)
+        # same operation order as CosineIndex._build_postings: (tf * idf) * boost
+        weights = tfs.astype(np.float64) * idf_arr[tids]
+        weights *= boosts.astype(np.float64)
+        # bincount adds in posting order, i.e. per doc in first-seen token order
+        norms = np.sqrt(np.bincount(docs, weights=weights * weights, minlength=num_docs))
+        norms[norms == 0.0] = 1.0
+
+        seg = CosineIndex(engine=engine, batch_min_queries=batch_min_queries)
+        seg._vocab, seg._idf = vocab, idf
+        seg._postings = CsrPostings.from_columns(tids.astype(np.int32), docs, weights.astype(np.float32), num_terms=len(vocab))
+        seg._doc_norms = norms.astype(np.float32)
+        seg._docs = DocStore.concat(self.stores)
+        seg._fitted = True
+        return seg
+
+
+class _Layout(NamedTuple):
+    segments: Tuple[CosineIndex, ...]
+    starts: Tuple[int, ...]  # global doc id of each segment's first doc
+
+
+def _layout(segments: Sequence[CosineIndex]) -> _Layout:
+    starts: List[int] = []
+    total = 0
+    for seg in segments:
+        starts.append(total)
+        total += len(seg)
+    return _Layout(tuple(segments), tuple(starts))
+
+
+class SegmentedIndex(VectorIndex):
+    """Index made of immutable ``CosineIndex`` segments sharing one global vocabulary and IDF.
+
+    - Built in one pass over an item stream or over independently built
+      shards; items are reduced to compact posting columns on arrival and
+      cut into fixed-size segments
+    - Global doc ids follow segment order; results match a single index over
+      the same docs, ties included
+    - Small adjacent segments are merged in a background thread once there are
+      more than ``merge_factor`` of them; merges keep doc order and ids
+    """
+
+    def __init__(
+        self,
+        engine: str = SCORING_ENGINE,
+        batch_min_queries: int = BATCH_MIN_QUERIES,
+        segment_size: int = SEGMENT_SIZE,
+        merge_factor: int = SEGMENT_MERGE_FACTOR,
+        max_merge_docs: int = SEGMENT_MAX_MERGE_DOCS,
+    ) -> None:
+        if engine not in CosineIndex.ENGINES:
+            raise ValueError(f"Unknown scoring engine: {engine!r} (expected one of {CosineIndex.ENGINES})")
+        self.engine = engine
+        self.batch_min_queries = batch_min_queries
+        self.segment_size = segment_size
+        self.merge_factor = merge_factor
+        self.max_merge_docs = max_merge_docs
+        self._vocab: Dict[str, int] = {}
+        self._idf: Sequence[float] = []
+        self._layout = _layout(())
+        self._lock = threading.Lock()
+        self._merger: Optional[threading.Thread] = None
+        self._merges = 0
+        self._fitted = False
+
+    @classmethod
+    def from_segments(cls, segments: Sequence[CosineIndex], like: Optional["SegmentedIndex"] = None, **kwargs: Any) -> "SegmentedIndex":
+        """Wrap fitted segments that share a vocabulary and IDF (settings copied from ``like``)."""
+        if like is not None:
+            kwargs = {**like._settings(), **kwargs}
+        elif segments:
+            kwargs = {"engine": segments[0].engine, "batch_min_queries": segments[0].batch_min_queries, **kwargs}
+        index = cls(**kwargs)
+        if segments:
+            index._vocab, index._idf = segments[0]._vocab, segments[0]._idf
+        elif like is not None:
+            index._vocab, index._idf = like._vocab, like._idf
+        index._layout = _layout([s for s in segments if len(s)])
+        index._fitted = True
+        return index
+
+    def _settings(self) -> Dict[str, Any]:
+        return {
+            "engine": self.engine,
+            "batch_min_queries": self.batch_min_queries,
+            "segment_size": self.segment_size,
+            "merge_factor": self.merge_factor,
+            "max_merge_docs": self.max_merge_docs,
+        }
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._fitted
+
+    @property
+    def segments(self) -> Tuple[CosineIndex, ...]:
+        return self._layout.segments
+
+    def __len__(self) -> int:
+        layout = self._layout
+        return layout.starts[-1] + len(layout.segments[-1]) if layout.segments else 0
+
+    def memory_usage(self) -> int:
+        return sum(
+            seg._postings.nbytes + int(seg._doc_norms.nbytes) + seg._docs.nbytes for seg in self.segments
+        ) + 8 * len(self._idf)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"segments": len(self.segments), "segment_merges": self._merges}
+
+    def iter_meta(self) -> Iterator[Dict[str, str]]:
+        for seg in self.segments:
+            yield from seg._docs.iter_meta()
+
+    def iter_keys(self) -> Iterator[Optional[str]]:
+        """Catalog id (``id`` meta) of every doc in order, None where missing."""
+        for seg in self.segments:
+            yield from seg._docs.sources
+
+    def fit(self, corpus: ItemFeatures) -> None:
+        self.fit_stream(corpus.items)
+
+    def fit_stream(self, items: Iterable[ItemFeature]) -> None:
+        """Build in a single pass over an item stream (e.g. a generator over catalog rows).
+
+        Items are reduced to compact posting columns as they arrive, so
+        features are never held in bulk. Output matches ``CosineIndex.fit``.
+        """
+        it = iter(items)
+        chunks = iter(lambda: list(islice(it, EXTRACT_SHARD_ROWS)), [])
+        self.fit_shards(shard_postings(chunk) for chunk in chunks)
+
+    def fit_shards(self, shards: Iterable[ShardPostings]) -> None:
+        """Build from consecutive doc shards, consumed in order.
+
+        Shard-local token ids are mapped to stream-wide ids in first-seen
+        order and DF counts are summed, so the result does not depend on how
+        docs were sharded; shards already in ids of a shared vocabulary (in-
+        process extraction) are taken as they are, and that vocabulary
+        becomes the stream-wide table. Once the stream ends the global
+        vocabulary and IDF are known and every ``segment_size`` block is
+        finalized into a segment.
+        """
+        tokens: Optional[Vocabulary] = None  # every token seen, first-seen order
+        df = np.zeros(1024, dtype=np.int64)
+        buffers: List[_SegmentBuffer] = []
+        num_docs = 0
+        for shard in shards:
+            if shard.vocabulary is not None:
+                if tokens is None and num_docs == 0:
+                    tokens = shard.vocabulary
+                elif shard.vocabulary is not tokens:
+                    raise ValueError("Shards of one build must share a single vocabulary")
+                gids = shard.gids.astype(np.int64)
+            else:
+                if tokens is None:
+                    tokens = Vocabulary()
+                lut = np.frombuffer(tokens.ids(shard.tokens), dtype=np.int32).astype(np.int64)
+                gids = lut[shard.gids]
+            if len(tokens) > df.size:
+                df = np.concatenate([df, np.zeros(max(len(tokens), 2 * df.size) - df.size, dtype=np.int64)])
+            if shard.vocabulary is not None:
+                # term ids are distinct within a doc, so postings per term are its DF
+                terms, counts = np.unique(gids, return_counts=True)
+                df[terms] += counts
+            else:
+                df[lut] += shard.df
+            first, size = 0, len(shard.doc_ids)
+            while first < size:
+                if not buffers or len(buffers[-1]) >= self.segment_size:
+                    buffers.append(_SegmentBuffer())
+                last = min(size, first + self.segment_size - len(buffers[-1]))
+                buffers[-1].extend(shard, gids, first, last)
+                first = last
+            num_docs += size
+
+        table = tokens.tokens if tokens is not None else []
+        vocab, idf = vocab_from_df(dict(zip(table, df[: len(table)].tolist())), num_docs)
+        remap = np.full(len(table), -1, dtype=np.int64)
+        for token, tid in vocab.items():
+            remap[tokens.get(token)] = tid  # type: ignore[union-attr]
+        del tokens, table, df
+
+        with self._lock:
+            self._vocab, self._idf = vocab, idf
+            self._layout = _layout(())
+            self._fitted = False
+        idf_arr = np.asarray(idf, dtype=np.float64)
+        buffers.reverse()
+        while buffers:
+            buf = buffers.pop()  # raw columns are released as each segment is finalized
+            self._add_segment(buf.finish(remap, idf_arr, vocab, idf, self.engine, self.batch_min_queries))
+            del buf
+        self._fitted = True
+
+    def _add_segment(self, seg: CosineIndex) -> None:
+        with self._lock:
+            self._layout = _layout(self._layout.segments + (seg,))
+        self.maybe_merge()
+
+    # --- background merging -------------------------------------------------
+
+    def _pick_merge(self, segments: Sequence[CosineIndex]) -> Optional[Tuple[int, int]]:
+        """Cheapest run of ``merge_factor`` adjacent segments, if one is due and within size cap."""
+        if self.merge_factor < 2 or len(segments) <= self.merge_factor:
+            return None
+        sizes = [len(s) for s in segments]
+        best: Optional[Tuple[int, int]] = None
+        best_total = 0
+        for lo in range(len(sizes) - self.merge_factor + 1):
+            total = sum(sizes[lo : lo + self.merge_factor])
+            if total <= self.max_merge_docs and (best is None or total < best_total):
+                best, best_total = (lo, lo + self.merge_factor), total
+        return best
+
+    def maybe_merge(self) -> None:
+        """Start the background merger if too many segments have accumulated."""
+        with self._lock:
+            if self._merger is not None and self._merger.is_alive():
+                return
+            if self._pick_merge(self._layout.segments) is None:
+                return
+            self._merger = threading.Thread(target=self._merge_loop, name="segment-merge", daemon=True)
+            self._merger.start()
+
+    def wait_for_merges(self, timeout: Optional[float] = None) -> None:
+        merger = self._merger
+        if merger is not None:
+            merger.join(timeout)
+
+    def _merge_loop(self) -> None:
+        while True:
+            segments = self._layout.segments
+            window = self._pick_merge(segments)
+            if window is None:
+                return
+            lo, hi = window
+            merged = merge_segments(segments[lo:hi])
+            with self._lock:
+                current = self._layout.segments
+                # only appends can happen meanwhile, so the window is still in place
+                if current[lo:hi] != segments[lo:hi]:
+                    return
+                self._layout = _layout(current[:lo] + (merged,) + current[hi:])
+                self._merges += 1
+
+    # --- changes (used by IncrementalIndex) ---------------------------------
+
+    def with_changes(self, deleted: Collection[int], added: Optional[CosineIndex]) -> "SegmentedIndex":
+        """New index without ``deleted`` global docs and with ``added`` as a trailing segment.
+
+        Only segments containing deletions are rewritten; ``added`` must share
+        this index's vocabulary and IDF.
+        """
+        layout = self._layout
+        by_segment: Dict[int, List[int]] = {}
+        for doc in deleted:
+            i = bisect_right(layout.starts, doc) - 1
+            by_segment.setdefault(i, []).append(doc - layout.starts[i])
+        segments: List[CosineIndex] = []
+        for i, seg in enumerate(layout.segments):
+            if i in by_segment:
+                keep = np.ones(len(seg), dtype=bool)
+                keep[by_segment[i]] = False
+                if not keep.any():
+                    continue
+                seg = merge_segments([seg], [keep])
+            segments.append(seg)
+        if added is not None and len(added):
+            segments.append(added)
+        return SegmentedIndex.from_segments(segments, like=self)
+
+    def with_vocab(self, vocab: Dict[str, int], idf: Sequence[float]) -> "SegmentedIndex":
+        """New index over the same docs with ``vocab`` grown by terms appended after the current ones.
+
+        Existing segments get empty posting lists for the new terms, so their
+        weights and scores do not change.
+        """
+        grown: List[CosineIndex] = []
+        for seg in self.segments:
+            p = seg._postings
+            extra = len(vocab) - p.num_terms
+            out = CosineIndex(engine=seg.engine, batch_min_queries=seg.batch_min_queries)
+            out._vocab, out._idf = vocab, idf
+            out._postings = CsrPostings(np.concatenate([p.offsets, np.repeat(p.offsets[-1:], extra)]), p.doc_ids, p.weights)
+            out._doc_norms = seg._doc_norms
+            out._docs = seg._docs
+            out._fitted = True
+            grown.append(out)
+        index = SegmentedIndex.from_segments(grown, like=self)
+        index._vocab, index._idf = vocab, idf
+        return index
+
+    def with_refreshed_idf(self) -> "SegmentedIndex":
+        """New index with IDF recomputed from global posting-list lengths.
+
+        Weights and norms are rescaled per segment; the vocabulary is kept,
+        DF pruning is only re-applied by a full fit.
+        """
+        segments = self.segments
+        num_docs = len(self)
+        df = np.zeros(len(self._vocab), dtype=np.float64)
+        for seg in segments:
+            df += np.diff(seg._postings.offsets)
+        new_idf = np.log((1.0 + num_docs) / (1.0 + df)) + 1.0
+        old_idf = np.asarray(self._idf, dtype=np.float64)
+        scale = np.divide(new_idf, old_idf, out=np.ones_like(new_idf), where=old_idf > 0.0)
+        idf = new_idf.tolist()
+
+        refreshed: List[CosineIndex] = []
+        for seg in segments:
+            p = seg._postings
+            weights = p.weights.astype(np.float64) * scale[_posting_terms(p)]
+            norms = np.sqrt(np.bincount(p.doc_ids, weights=weights * weights, minlength=len(seg)))
+            norms[norms == 0.0] = 1.0
+            out = CosineIndex(engine=seg.engine, batch_min_queries=seg.batch_min_queries)
+            out._vocab, out._idf = self._vocab, idf
+            out._postings = CsrPostings(p.offsets, p.doc_ids, weights.astype(np.float32))
+            out._doc_norms = norms.astype(np.float32)
+            out._docs = seg._docs
+            out._fitted = True
+            refreshed.append(out)
+        index = SegmentedIndex.from_segments(refreshed, like=self)
+        index._idf = idf
+        return index
+
+    # --- search -------------------------------------------------------------
+
+    def _query_vector(self, tokens: List[str]) -> Tuple[Dict[int, float], float]:
+        return query_vector(tokens, self._vocab, self._idf)
+
+    def _rank(
+        self, vectors: List[Tuple[Dict[int, float], float]], top_k: int, min_score: float
+    ) -> List[List[Tuple[int, float]]]:
+        """(global doc, score) top-k per query vector, ordered by (score desc, doc asc)."""
+        layout = self._layout
+        if len(layout.segments) == 1:
+            return layout.segments[0]._rank(vectors, top_k, min_score)
+        hits: List[List[Tuple[float, int]]] = [[] for _ in vectors]
+        for seg, start in zip(layout.segments, layout.starts):
+            for qi, top in enumerate(seg._rank(vectors, top_k, min_score)):
+                hits[qi].extend((-sim, start + doc) for doc, sim in top)
+        return [[(doc, -neg) for neg, doc in heapq.nsmallest(top_k, h)] for h in hits]
+
+    def _match(self, doc_idx: int, sim: float) -> Match:
+        layout = self._layout
+        i = bisect_right(layout.starts, doc_idx) - 1
+        return layout.segments[i]._match(doc_idx - layout.starts[i], sim)
+
+    def search(self, query: ItemFeatures, top_k: int = 5, min_score: float = 0.0) -> List[List[Match]]:
+        """Top-k matches per query item across all segments."""
+        vectors = [self._query_vector(it.tokens) for it in query.items]
+        ranked = self._rank(vectors, top_k, min_score)
+        return [[self._match(doc_idx, sim) for doc_idx, sim in top] for top in ranked]
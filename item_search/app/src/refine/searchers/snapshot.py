@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .cosine_index import CosineIndex
+from .doc_store import DocStore
+from .postings import CsrPostings
+from .segments import SegmentedIndex
+
+
+# Layout: fixed preamble | JSON header | 64-byte aligned raw little-endian arrays.
+SNAPSHOT_MAGIC = b"ISIXSNAP"
+SNAPSHOT_VERSION = 4  # other versions are refused and rebuilt from the catalog
+_PREAMBLE = struct.Struct("<8sIQ")  # magic, version, header length
+_ALIGN = 64
+
+
+class SnapshotError(ValueError):
+    """Snapshot file is missing, corrupt or written by an incompatible version."""
+
+
+def _aligned(pos: int) -> int:
+    return (pos + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _segment_arrays(prefix: str, seg: CosineIndex) -> Dict[str, np.ndarray]:
+    postings = seg._postings
+    arrays = {
+        f"{prefix}offsets": np.asarray(postings.offsets, dtype="<i8"),
+        f"{prefix}doc_ids": np.asarray(postings.doc_ids, dtype="<i4"),
+        f"{prefix}weights": np.asarray(postings.weights, dtype="<f4"),
+        f"{prefix}doc_norms": np.asarray(seg._doc_norms, dtype="<f4"),
+    }
+    for name, arr in seg._docs.columns().items():
+        arrays[f"{prefix}docs.{name}"] = arr.astype(arr.dtype.newbyteorder("<"), copy=False)
+    return arrays
+
+
+def _doc_columns(arrays: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    start = f"{prefix}docs."
+    return {name[len(start) :]: arr for name, arr in arrays.items() if name.startswith(start)}
+
+
+def save_snapshot(index: Union[CosineIndex, SegmentedIndex], path: Path, extra: Optional[Dict[str, Any]] = None) -> Path:
+    """Write a fitted index to ``path`` atomically (tmp file + rename).
+
+    Segments are stored as they are (one per ``CosineIndex``), sharing the
+    vocabulary and IDF arrays; each segment's doc ids and metadata are
+    stored as columns next to its postings.
+    """
+    if not index.is_fitted:
+        raise ValueError("Cannot snapshot an unfitted index")
+
+    segments = index.segments if isinstance(index, SegmentedIndex) else (index,)
+    arrays: Dict[str, np.ndarray] = {"idf": np.asarray(index._idf, dtype="<f8")}
+    for i, seg in enumerate(segments):
+        arrays.update(_segment_arrays(f"{i}.", seg))
+    vocab = [""] * len(index._vocab)
+    for token, tid in index._vocab.items():
+        vocab[tid] = token
+    # kept out of the header so that reading ``extra`` stays cheap for large catalogs
+    objects = json.dumps(
+        {"vocab": vocab, "marketplaces": [seg._docs.marketplaces for seg in segments]},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    arrays["objects"] = np.frombuffer(objects, dtype=np.uint8)
+
+    # Offsets are relative to the start of the array section, so header size does not matter.
+    layout: Dict[str, Dict[str, Any]] = {}
+    pos = 0
+    for name, arr in arrays.items():
+        pos = _aligned(pos)
+        layout[name] = {"dtype": arr.dtype.str, "offset": pos, "count": int(arr.size)}
+        pos += arr.nbytes
+
+    header = json.dumps(
+        {
+            "segments": [len(seg) for seg in segments],
+            "arrays": layout,
+            "extra": extra or {},
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    data_start = _aligned(_PREAMBLE.size + len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def _read_header(f) -> Tuple[Dict[str, Any], int]:
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) != _PREAMBLE.size:
+        raise SnapshotError("Truncated snapshot")
+    magic, version, header_len = _PREAMBLE.unpack(preamble)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not an index snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+    try:
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    except ValueError as e:
+        raise SnapshotError(f"Corrupt snapshot header: {e}") from e
+    return header, _aligned(_PREAMBLE.size + header_len)
+
+
+def read_snapshot_extra(path: Path) -> Dict[str, Any]:
+    """Return the caller-supplied ``extra`` dict without mapping the arrays.
+
+    Only the small header is parsed, so this is cheap enough to
+    poll for snapshots written by other processes.
+    """
+    with open(path, "rb") as f:
+        header, _ = _read_header(f)
+    return header.get("extra", {})
+
+
+def load_snapshot(path: Path) -> SegmentedIndex:
+    """Load a snapshot with numeric arrays memory-mapped read-only.
+
+    Pages are shared through the OS page cache, so several worker processes
+    loading the same file keep a single physical copy of the postings and
+    of the doc metadata columns.
+    """
+    with open(path, "rb") as f:
+        header, data_start = _read_header(f)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    arrays: Dict[str, np.ndarray] = {}
+    for name, spec in header["arrays"].items():
+        offset = data_start + int(spec["offset"])
+        count = int(spec["count"])
+        dtype = np.dtype(spec["dtype"])
+        if offset + count * dtype.itemsize > len(mm):
+            raise SnapshotError(f"Truncated snapshot array: {name}")
+        arrays[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+
+    objects = json.loads(arrays["objects"].tobytes().decode("utf-8"))
+    vocab = {token: tid for tid, token in enumerate(objects["vocab"])}
+    idf = arrays["idf"]
+    prefixes = [f"{i}." for i in range(len(header["segments"]))]
+    stores = [DocStore.from_columns(_doc_columns(arrays, prefix), m) for prefix, m in zip(prefixes, objects["marketplaces"])]
+
+    segments: List[CosineIndex] = []
+    for prefix, store in zip(prefixes, stores):
+        seg = CosineIndex()
+        seg._vocab = vocab
+        seg._idf = idf
+        seg._postings = CsrPostings(arrays[prefix + "offsets"], arrays[prefix + "doc_ids"], arrays[prefix + "weights"])
+        seg._doc_norms = arrays[prefix + "doc_norms"]
+        seg._docs = store
+        seg._fitted = True
+        segments.append(seg)
+
+    index = SegmentedIndex.from_segments(segments)
+    index._vocab, index._idf = vocab, idf
+    return index
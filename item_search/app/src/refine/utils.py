@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 import re
-from typing import List
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+_SPACES = re.compile(r"\s+")
+_TOKEN = re.compile(r"[\w\-]+")
+_X = re.compile(r"\s*x\s*")
+_MM = re.compile(r"\s+мм")
 
 
 def normalize_text(text: str) -> str:
     t = text.lower().strip()
-    t = re.sub(r"\s+", " ", t)
+    t = _SPACES.sub(" ", t)
     return t
 
 
 def simple_tokenize(text: str) -> List[str]:
     text = normalize_text(text)
-    return re.findall(r"[\w\-]+", text, flags=re.UNICODE)
+    return _TOKEN.findall(text)
 
 
 # Minimal RU/EN stopwords (extendable)
@@ -28,8 +34,51 @@ def filter_stopwords(tokens: List[str]) -> List[str]:
 
 def normalize_numbers(text: str) -> str:
     # Join number patterns like '330 x 233 мм' -> '330x233мм'
-    t = re.sub(r"\s*x\s*", "x", text)
-    t = re.sub(r"\s+мм", "мм", t)
+    t = _X.sub("x", text)
+    t = _MM.sub("мм", t)
     return t
 
 
+class Tokenizer:
+    """Text normalization and tokenization in one call.
+
+    ``tokenize(text)`` returns the same ``(text_repr, tokens)`` as
+    ``normalize_numbers(normalize_text(text))`` followed by
+    ``filter_stopwords(simple_tokenize(...))``, but normalizes once and
+    uses str methods instead of regex substitutions: ``str.split`` splits
+    on the same whitespace as ``\\s``, and on collapsed text the dimension
+    rules only ever remove single spaces next to 'x' or before 'мм'.
+    With ``cache_size`` > 0 results for inputs up to ``cache_max_len``
+    characters are memoized (repeated queries); the memo is dropped whole
+    once full.
+    """
+
+    def __init__(self, stopwords: Optional[Iterable[str]] = None, cache_size: int = 0, cache_max_len: int = 512) -> None:
+        self.stopwords: FrozenSet[str] = frozenset(STOPWORDS if stopwords is None else stopwords)
+        self.cache_size = cache_size
+        self.cache_max_len = cache_max_len
+        self._memo: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self.hits = 0
+
+    def _tokenize(self, text: str) -> Tuple[str, Tuple[str, ...]]:
+        t = " ".join(text.lower().split())
+        if "x" in t:  # '330 x 233' -> '330x233'
+            t = t.replace(" x", "x").replace("x ", "x")
+        if "мм" in t:  # '233 мм' -> '233мм'
+            t = t.replace(" мм", "мм")
+        stop = self.stopwords
+        return t, tuple(tok for tok in _TOKEN.findall(t) if tok not in stop)
+
+    def tokenize(self, text: str) -> Tuple[str, List[str]]:
+        if self.cache_size <= 0 or len(text) > self.cache_max_len:
+            text_repr, tokens = self._tokenize(text)
+            return text_repr, list(tokens)
+        hit = self._memo.get(text)
+        if hit is not None:
+            self.hits += 1
+        else:
+            hit = self._tokenize(text)
+            if len(self._memo) >= self.cache_size:
+                self._memo.clear()
+            self._memo[text] = hit
+        return hit[0], list(hit[1])  # callers own (and may edit) their token list
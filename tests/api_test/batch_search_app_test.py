@@ -0,0 +1,70 @@
+import pytest
+
+# the app imports refine through the package path; patch that copy
+from item_search.app.src.refine.config import BATCH_MIN_QUERIES
+from item_search.app.src.refine.searchers.cosine_index import CosineIndex
+
+
+def _batch(client, texts, **kw):
+    r = client.post("/search/batch", json={"catalog_id": "cat", "query_texts": texts, **kw})
+    assert r.status_code == 200, r.text
+    return r.json()["results"]
+
+
+def _single(client, text, **kw):
+    r = client.post("/search", json={"catalog_id": "cat", "query_text": text, **kw})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _ranking(result):
+    return [(m["item_id"], round(m["score"], 5)) for m in result["top_k"]]
+
+
+@pytest.fixture
+def batch_calls(monkeypatch):
+    calls = []
+    original = CosineIndex._score_batch
+
+    def spy(self, vectors, top_k, min_score):
+        calls.append(len(vectors))
+        return original(self, vectors, top_k, min_score)
+
+    monkeypatch.setattr(CosineIndex, "_score_batch", spy)
+    return calls
+
+
+def test_batch_results_follow_query_order(app_client):
+    texts = [it.title for it in app_client.items[10:15]]
+    results = _batch(app_client.client, list(reversed(texts)), top_k=3)
+
+    assert [r["query_text"] for r in results] == list(reversed(texts))
+    assert all(r["catalog_id"] == "cat" for r in results)
+    for text, result in zip(reversed(texts), results):
+        assert _ranking(result) == _ranking(_single(app_client.client, text, top_k=3))
+
+
+def test_batch_empty_queries_get_empty_results_in_place(app_client):
+    title = app_client.items[3].title
+    results = _batch(app_client.client, ["", title, "   ", title])
+
+    assert [r["query_text"] for r in results] == ["", title, "   ", title]
+    for empty in (results[0], results[2]):
+        assert empty["best_match_id"] is None and empty["top_k"] == [] and empty["best_score"] == 0.0
+    assert results[1]["top_k"] and _ranking(results[1]) == _ranking(results[3])
+    assert _batch(app_client.client, []) == []
+
+
+def test_batch_threshold_switches_scoring_path_with_same_results(app_client, batch_calls):
+    texts = [it.title for it in app_client.items[: 4 * (BATCH_MIN_QUERIES + 2) : 4]]
+
+    _batch(app_client.client, texts[: BATCH_MIN_QUERIES - 1], top_k=5)
+    assert batch_calls == []  # under the threshold every query is scored on its own
+
+    results = _batch(app_client.client, texts, top_k=5)
+    assert batch_calls == [len(texts)]
+    batch_calls.clear()
+    singles = [_single(app_client.client, text, top_k=5) for text in texts]
+    assert batch_calls == []
+    assert [_ranking(r) for r in results] == [_ranking(s) for s in singles]
+    assert [r["best_match_id"] for r in results] == [s["best_match_id"] for s in singles]
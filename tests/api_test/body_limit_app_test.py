@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from item_search.app.services.body_limit import BodySizeLimit
+
+
+LIMIT = 4096
+BOUNDARY = "limit-test"
+
+
+@pytest.fixture
+def limited(app_client):
+    """The app's upload limit lowered to ``LIMIT`` bytes."""
+    layer = app_client.main.app.middleware_stack
+    while not isinstance(layer, BodySizeLimit):
+        layer = layer.app
+    original = layer.max_bytes
+    layer.max_bytes = LIMIT
+    yield app_client
+    layer.max_bytes = original
+
+
+def _multipart(payload: bytes) -> bytes:
+    return (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="catalog_id"\r\n\r\ncat\r\n'
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="q.txt"\r\n'
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _post_chunked(app, path, chunks):
+    """POST ``chunks`` without a Content-Length, one ASGI message each; returns (status, chunks read)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    read = 0
+    sent = []
+
+    async def receive():
+        nonlocal read
+        if read == len(chunks):
+            return {"type": "http.disconnect"}
+        read += 1
+        return {"type": "http.request", "body": chunks[read - 1], "more_body": read < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    return start["status"], read
+
+
+def test_declared_length_over_limit_is_refused(limited):
+    body = _multipart(b"x" * (2 * LIMIT))
+    r = limited.client.post(
+        "/search/file", content=body, headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    assert r.status_code == 413 and str(LIMIT) in r.json()["detail"]
+    r = limited.client.post("/parse/file", files={"file": ("q.txt", b"x" * (2 * LIMIT), "text/plain")})
+    assert r.status_code == 413
+
+
+def test_chunked_body_is_cut_off_once_it_crosses_the_limit(limited):
+    body = _multipart(b"x" * (10 * LIMIT))
+    chunks = [body[i : i + 1024] for i in range(0, len(body), 1024)]
+    status, read = _post_chunked(limited.main.app, "/search/file", chunks)
+    assert status == 413
+    # the chunk that crossed the limit was the last one read
+    assert read == LIMIT // 1024 + 1 < len(chunks)
+
+
+def test_small_uploads_and_other_routes_are_unaffected(limited):
+    title = limited.items[3].title
+    r = limited.client.post(
+        "/search/file", data={"catalog_id": "cat", "top_k": "3"}, files={"file": ("q.txt", title.encode(), "text/plain")}
+    )
+    assert r.status_code == 200, r.text
+
+    # bodies of other routes are not limited
+    query = " ".join([title] * (2 * LIMIT // len(title)))
+    r = limited.client.post("/search", json={"catalog_id": "cat", "query_text": query, "top_k": 3})
+    assert r.status_code == 200, r.text
+    rows = [{"id": f"big-{i}", "title": title} for i in range(200)]
+    r = limited.client.put("/catalogs/cat/items", json={"items": rows})
+    assert r.status_code == 200 and r.json()["affected"] == 200
@@ -0,0 +1,16 @@
+from item_search.app.services import catalog_manager
+
+
+def test_search_on_a_catalog_being_rebuilt_answers_building(app_client):
+    client, manager = app_client.client, app_client.manager
+    manager._residency.max_catalogs = 1
+    r = client.post("/warmup", json={"catalog_id": "other", "references": ["cat.jsonl"], "limit_items": 100, "wait": True})
+    assert r.status_code == 200 and manager.resident_catalogs() == ["other"]
+    catalog_manager.snapshot_path("cat").unlink()  # evicted and no snapshot: needs a full build
+
+    r = client.post("/search", json={"catalog_id": "cat", "query_text": app_client.items[3].title})
+    assert r.status_code == 503 and r.json()["state"] == "building" and "Retry-After" in r.headers
+    job = app_client.main.warmups.latest("cat")
+    assert job is not None and job.wait(30) and job.state == "done"
+    r = client.post("/search", json={"catalog_id": "cat", "query_text": app_client.items[3].title})
+    assert r.status_code == 200 and r.json()["top_k"]
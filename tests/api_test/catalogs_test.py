@@ -1,4 +1,6 @@
 import os
+import time
+
 import requests
 
 BASE = os.environ.get("API_BASE", "http://localhost:8000")
@@ -9,6 +11,7 @@ def test_warmup_ok():
         "catalog_id": "test-cat-1",
         "references": ["test_catalogue.jsonl"],
         "limit_items": 5000,
+        "wait": True,
     }
     r = requests.post(f"{BASE}/warmup", json=payload, timeout=120)
     assert r.status_code == 200
@@ -17,6 +20,26 @@ def test_warmup_ok():
     assert data["items_indexed"] >= 0
 
 
+def test_warmup_background_job():
+    payload = {"catalog_id": "test-cat-bg", "references": ["test_catalogue.jsonl"], "limit_items": 2000}
+    r = requests.post(f"{BASE}/warmup", json=payload, timeout=30)
+    assert r.status_code in (200, 202)
+    job_id = r.json()["job_id"]
+    # the same request while building joins the running job
+    again = requests.post(f"{BASE}/warmup", json=payload, timeout=30).json()
+    assert again["job_id"] == job_id or again["state"] == "done"
+
+    for _ in range(600):
+        job = requests.get(f"{BASE}/warmup/jobs/{job_id}", timeout=10).json()
+        if job["state"] not in ("queued", "running"):
+            break
+        time.sleep(0.2)
+    assert job["state"] == "done"
+    assert job["items_indexed"] == job["progress"]["features_extracted"] or job["from_snapshot"]
+    ready = requests.get(f"{BASE}/readyz", params={"catalog_id": "test-cat-bg"}, timeout=10).json()
+    assert ready["ready"] is True and ready["state"] == "ready"
+
+
 def test_warmup_missing_catalog_file():
     payload = {
         "catalog_id": "test-cat-missing",
@@ -28,15 +51,13 @@ def test_warmup_missing_catalog_file():
     assert r.status_code in (400, 500)
 
 
-def test_warmup_five_catalogs_limit():
-    # Depending on implementation, we limit to 3 loaded catalogs
-    # Try to load 5 distinct ids and expect failures after the cap
-    failures = 0
+def test_warmup_many_catalogs_evicts_instead_of_failing():
+    # catalogs past the memory budget are evicted (LRU) and reload from their
+    # snapshot on access, so every warmup succeeds and every catalog stays searchable
     for i in range(5):
-        payload = {"catalog_id": f"bulk-{i}", "references": ["catalog.jsonl"], "limit_items": 5000}
+        payload = {"catalog_id": f"bulk-{i}", "references": ["test_catalogue.jsonl"], "limit_items": 500 + i, "wait": True}
         r = requests.post(f"{BASE}/warmup", json=payload, timeout=120)
-        if r.status_code not in (200, 201):
-            failures += 1
-    assert failures >= 2  # at least two should fail if cap is 3
-
-
+        assert r.status_code == 200
+    for i in range(5):
+        r = requests.post(f"{BASE}/search", json={"catalog_id": f"bulk-{i}", "query_text": "бумага a4"}, timeout=60)
+        assert r.status_code == 200
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+
+from item_search.app.services import catalog_manager
+from item_search.app.services.catalog_manager import CatalogManager
+from item_search.app.services.search_cache import SearchCache
+from item_search.app.services.upload_cache import UploadCache
+from item_search.app.services.warmup_jobs import WarmupJobs
+
+from benchmark.synthetic import write_synthetic_catalog
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    """In-process client over a fresh manager with one warmed synthetic catalog ("cat").
+
+    The search cache is off, so every request reaches the index.
+    """
+    from fastapi.testclient import TestClient
+
+    from item_search.app import main
+
+    cat_dir = tmp_path / "catalogues"
+    cat_dir.mkdir()
+    monkeypatch.setattr(catalog_manager, "CATALOGUES_ROOT", cat_dir)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ROOT", tmp_path / "snapshots")
+    items = write_synthetic_catalog(cat_dir / "cat.jsonl", 800, seed=5)
+
+    manager = CatalogManager()
+    manager.cache = SearchCache(max_size=0)
+    warmups = WarmupJobs(manager)
+    monkeypatch.setattr(main, "manager", manager)
+    monkeypatch.setattr(main, "warmups", warmups)
+    monkeypatch.setattr(main, "upload_cache", UploadCache(root=tmp_path / "upload_cache"))
+
+    # no context manager: the app lifespan would shut the module-level pools down
+    client = TestClient(main.app)
+    r = client.post("/warmup", json={"catalog_id": "cat", "references": ["cat.jsonl"], "wait": True})
+    assert r.status_code == 200, r.text
+    yield SimpleNamespace(client=client, items=items, manager=manager, main=main)
+    warmups.shutdown()
@@ -0,0 +1,84 @@
+def _search(client, text, top_k=5):
+    r = client.post("/search", json={"catalog_id": "cat", "query_text": text, "top_k": top_k, "threshold": 0.0})
+    assert r.status_code == 200, r.text
+    return r.json()["top_k"]
+
+
+def _catalog_stats(client):
+    r = client.get("/metrics")
+    assert r.status_code == 200, r.text
+    return r.json()["catalogs"]["cat"]
+
+
+def test_upsert_then_search(app_client):
+    client = app_client.client
+    version = _catalog_stats(client)["version"]
+    r = client.put("/catalogs/cat/items", json={"items": [{"id": "8196001", "title": "Бумага A4 офисная", "price": 349.0}]})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["affected"], body["items_indexed"], body["delta_items"]) == (1, 801, 1)
+
+    # words the catalog has never seen are searchable right away
+    top = _search(client, "Бумага A4 офисная")
+    assert top[0]["meta"]["id"] == "8196001" and top[0]["meta"]["price"] == "349.0"
+    stats = _catalog_stats(client)
+    assert stats["items"] == 801 and stats["version"] > version
+
+
+def test_upsert_replaces_an_item_in_place(app_client):
+    client = app_client.client
+    target = app_client.items[12]
+    r = client.put("/catalogs/cat/items", json={"items": [{"id": target.id, "title": target.title, "price": 1.5}]})
+    assert r.status_code == 200 and r.json()["items_indexed"] == 800
+
+    hits = [m for m in _search(client, target.title, top_k=20) if m["meta"]["id"] == target.id]
+    assert len(hits) == 1
+    assert hits[0]["item_id"] == "raw:12" and hits[0]["meta"]["price"] == "1.5"
+
+
+def test_delete_then_item_is_absent(app_client):
+    client = app_client.client
+    target = app_client.items[40]
+    # synthetic titles tie on score, so look past the first few hits
+    assert target.id in [m["meta"]["id"] for m in _search(client, target.title, top_k=50)]
+    version = _catalog_stats(client)["version"]
+
+    r = client.request("DELETE", "/catalogs/cat/items", json={"ids": [target.id, "missing"]})
+    assert r.status_code == 200, r.text
+    assert (r.json()["affected"], r.json()["items_indexed"]) == (1, 799)
+    assert target.id not in [m["meta"]["id"] for m in _search(client, target.title, top_k=50)]
+    stats = _catalog_stats(client)
+    assert stats["items"] == 799 and stats["tombstones"] == 1 and stats["version"] > version
+
+    # nothing left to remove: no new version
+    r = client.request("DELETE", "/catalogs/cat/items", json={"ids": [target.id]})
+    assert r.json()["affected"] == 0
+    assert _catalog_stats(client)["version"] == stats["version"]
+
+
+def test_updates_need_a_warmed_catalog_and_ids(app_client):
+    client = app_client.client
+    assert client.put("/catalogs/other/items", json={"items": [{"id": "1", "title": "x"}]}).status_code == 400
+    r = client.put("/catalogs/cat/items", json={"items": [{"title": "без id"}]})
+    assert r.status_code == 400 and "id" in r.json()["detail"]
+
+
+def test_updates_are_admitted_by_the_search_pool(app_client, monkeypatch):
+    from item_search.app.services.executors import BoundedExecutor
+
+    client = app_client.client
+    busy = BoundedExecutor("search", 1, 0)
+    busy._pending = busy.max_pending
+    monkeypatch.setattr(app_client.main, "search_pool", busy)
+    stats = _catalog_stats(client)
+    r = client.put("/catalogs/cat/items", json={"items": [{"id": "new-1", "title": "ручка"}]})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert client.request("DELETE", "/catalogs/cat/items", json={"ids": [app_client.items[0].id]}).status_code == 503
+    assert _catalog_stats(client)["version"] == stats["version"]
+
+
+def test_file_search_on_unknown_catalog_is_refused(app_client):
+    r = app_client.client.post(
+        "/search/file", data={"catalog_id": "other"}, files={"file": ("q.txt", "ручка".encode(), "text/plain")}
+    )
+    assert r.status_code == 400 and "warmed up" in r.json()["detail"]
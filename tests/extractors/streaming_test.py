@@ -0,0 +1,55 @@
+import csv
+import json
+
+from refine.parsers.tabular_parser import iter_rows, parse_tabular
+from refine.extractors.features import extract_features, iter_row_features
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.ingest import iter_catalog_shards
+from refine.searchers.segments import SegmentedIndex
+
+from benchmark.synthetic import write_synthetic_catalog
+
+
+def _as_tuples(items):
+    return [(it.item_id, it.name, it.tokens, it.attrs, it.text_repr) for it in items]
+
+
+def _catalogs(tmp_path):
+    jsonl = tmp_path / "a.jsonl"
+    items = write_synthetic_catalog(jsonl, 300, seed=3)
+    csv_path = tmp_path / "b.csv"
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "title", "price", "sku", "marketplace"])
+        writer.writeheader()
+        for it in items[:50]:
+            writer.writerow({"id": it.id, "title": it.title, "price": it.price, "sku": it.sku, "marketplace": "csv"})
+    js = tmp_path / "c.json"
+    js.write_text(json.dumps([{"id": "j1", "title": "Бумага A4", "price": "1 200,50"}], ensure_ascii=False), encoding="utf-8")
+    return [jsonl, csv_path, js]
+
+
+def test_row_features_match_materialized_path(tmp_path):
+    for path in _catalogs(tmp_path):
+        expected = extract_features(parse_tabular(path)).items
+        assert _as_tuples(iter_row_features(iter_rows(path))) == _as_tuples(expected)
+
+
+def test_limit_stops_reading(tmp_path):
+    paths = _catalogs(tmp_path)
+    stats = []
+    shards = list(iter_catalog_shards(paths, limit_items=10, workers=1, file_stats=stats))
+    assert sum(len(s.doc_ids) for s in shards) == 10
+    assert [(s.path.name, s.items) for s in stats] == [("a.jsonl", 10), ("b.csv", 0), ("c.json", 0)]
+
+
+def test_streamed_index_matches_fit(tmp_path):
+    paths = _catalogs(tmp_path)
+    expected = CosineIndex()
+    expected.fit(extract_features(parse_tabular(paths[0])))
+    streamed = SegmentedIndex(segment_size=64, merge_factor=0)
+    streamed.fit_shards(iter_catalog_shards(paths[:1], workers=1, shard_rows=50))
+
+    queries = extract_features(parse_tabular(paths[1]))
+    got = [[(m.item_id, m.score) for m in ms] for ms in streamed.search(queries, top_k=5)]
+    want = [[(m.item_id, m.score) for m in ms] for ms in expected.search(queries, top_k=5)]
+    assert got == want
@@ -0,0 +1,39 @@
+import random
+
+from refine.utils import Tokenizer, filter_stopwords, normalize_numbers, normalize_text, simple_tokenize
+
+
+def _legacy(text):
+    text_repr = normalize_numbers(normalize_text(text))
+    return text_repr, filter_stopwords(simple_tokenize(text_repr))
+
+
+def test_dimensions_joined_and_stopwords_dropped():
+    text_repr, tokens = Tokenizer().tokenize("  Конверт  С4 для\tдокументов 330 x 233 ММ ")
+    assert text_repr == "конверт с4 для документов 330x233мм"
+    assert tokens == ["конверт", "с4", "документов", "330x233мм"]
+
+
+def test_matches_legacy_chain_on_random_text():
+    rnd = random.Random(7)
+    alphabet = list(" \t\n\x1c xXмМ0123-_.,:аБzZİ") + [" мм", " x ", "x x", " и ", " for "]
+    tokenizer = Tokenizer()
+    for _ in range(20000):
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+        assert tokenizer.tokenize(text) == _legacy(text), repr(text)
+
+
+def test_memo_returns_independent_lists_and_skips_long_texts():
+    tokenizer = Tokenizer(cache_size=2, cache_max_len=20)
+    first = tokenizer.tokenize("бумага a4")[1]
+    first.append("mutated")
+    assert tokenizer.tokenize("бумага a4")[1] == ["бумага", "a4"] and tokenizer.hits == 1
+
+    long_text = "бумага офисная a4 белая"
+    tokenizer.tokenize(long_text)
+    tokenizer.tokenize(long_text)
+    assert tokenizer.hits == 1  # over cache_max_len: never memoized
+
+    tokenizer.tokenize("ручка")
+    tokenizer.tokenize("карандаш")  # memo full: dropped and refilled
+    assert len(tokenizer._memo) == 1
@@ -0,0 +1,38 @@
+import threading
+
+from refine.extractors.features import iter_row_features
+from refine.extractors.vocabulary import Vocabulary
+
+
+def test_ids_in_first_seen_order_with_one_string_per_token():
+    vocabulary = Vocabulary()
+    assert list(vocabulary.ids(["бумага", "a4", "бумага"])) == [0, 1, 0]
+    assert list(vocabulary.ids(["ручка", "a4"])) == [2, 1]
+    assert vocabulary.tokens == ["бумага", "a4", "ручка"]
+    assert vocabulary.get("a4") == 1 and vocabulary.get("нет") == -1 and "нет" not in vocabulary
+
+
+def test_concurrent_interning_assigns_each_token_once():
+    vocabulary = Vocabulary()
+    words = [f"t{i}" for i in range(2000)]
+
+    def work():
+        vocabulary.ids(words)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(vocabulary) == 2000
+    assert sorted(vocabulary.get(w) for w in words) == list(range(2000))
+
+
+def test_row_features_carry_token_ids():
+    rows = [{"id": "1", "title": "Бумага A4 500 листов", "sku": "A4-500"}]
+    plain = next(iter_row_features(rows))
+    vocabulary = Vocabulary()
+    interned = next(iter_row_features(rows, vocabulary=vocabulary))
+    assert interned.tokens == [] and interned.token_ids.typecode == "i"
+    assert [vocabulary.tokens[t] for t in interned.token_ids] == plain.tokens
+    assert interned.text_repr == plain.text_repr and interned.attrs == plain.attrs
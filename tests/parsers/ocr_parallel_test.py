@@ -0,0 +1,69 @@
+import threading
+import time
+
+from refine.parsers import ocr_parser
+
+
+def test_pages_ocr_concurrently_in_page_order(monkeypatch):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_image_to_string(img, lang=None):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05 if img % 2 else 0.01)  # uneven pages finish out of order
+        with lock:
+            active -= 1
+        return f"page {img}"
+
+    monkeypatch.setattr(ocr_parser.pytesseract, "image_to_string", fake_image_to_string)
+    texts, seconds = ocr_parser._ocr_images_to_text(list(range(6)), workers=3)
+
+    assert texts == [f"page {i}" for i in range(6)]
+    assert len(seconds) == 6 and all(s > 0 for s in seconds)
+    assert peak > 1
+
+
+def test_single_worker_runs_inline(monkeypatch):
+    monkeypatch.setattr(ocr_parser.pytesseract, "image_to_string", lambda img, lang=None: None)
+    texts, seconds = ocr_parser._ocr_images_to_text(["a", "b"], workers=1)
+    assert texts == ["", ""]
+    assert len(seconds) == 2
+
+
+class _FakeImage:
+    def __init__(self, page):
+        self.page = page
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pdf_rasterized_in_bounded_chunks(monkeypatch, tmp_path):
+    calls = []
+    rendered = []
+
+    def fake_convert(path, dpi=None, first_page=None, last_page=None, **kwargs):
+        calls.append((first_page, last_page))
+        assert all(img.closed for img in rendered)  # previous chunk released first
+        images = [_FakeImage(p) for p in range(first_page, last_page + 1)]
+        rendered.extend(images)
+        return images
+
+    monkeypatch.setattr(ocr_parser, "pdfinfo_from_path", lambda path, **kw: {"Pages": 10})
+    monkeypatch.setattr(ocr_parser, "convert_from_path", fake_convert)
+    monkeypatch.setattr(ocr_parser, "_raster_chunk_pages", 4)
+    monkeypatch.setattr(ocr_parser.pytesseract, "image_to_string", lambda img, lang=None: f"page {img.page}")
+
+    pdf = tmp_path / "scan.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    out = ocr_parser.parse_ocr(pdf)
+
+    assert calls == [(1, 4), (5, 8), (9, 10)]
+    assert out.pages_text == [f"page {p}" for p in range(1, 11)]
+    assert len(out.meta["ocr_page_seconds"]) == 10
+    assert all(img.closed for img in rendered)
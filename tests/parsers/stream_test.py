@@ -0,0 +1,49 @@
+import io
+from pathlib import Path
+
+import docx
+from odf import text as odf_text
+from odf.opendocument import OpenDocumentText
+
+from refine.parsers import ocr_parser
+from refine.parsers.docx_parser import parse_docx
+from refine.parsers.odt_parser import parse_odt
+
+
+def test_docx_parsed_from_stream():
+    document = docx.Document()
+    document.add_paragraph("Бумага A4 500 листов")
+    buf = io.BytesIO()
+    document.save(buf)
+    buf.seek(0)
+
+    out = parse_docx(Path("upload.docx"), buf)
+    assert out.pages_text == ["Бумага A4 500 листов"]
+    assert out.source_path == Path("upload.docx")
+
+
+def test_odt_parsed_from_stream():
+    document = OpenDocumentText()
+    document.text.addElement(odf_text.P(text="Ручка шариковая синяя"))
+    buf = io.BytesIO()
+    document.write(buf)
+    buf.seek(0)
+
+    out = parse_odt(Path("upload.odt"), buf)
+    assert out.pages_text == ["Ручка шариковая синяя"]
+
+
+def test_pdf_stream_spilled_to_temp_file(monkeypatch):
+    seen = []
+
+    def fake_ocr_pdf(path):
+        seen.append((path, path.read_bytes()))
+        return ["page"], [0.1]
+
+    monkeypatch.setattr(ocr_parser, "_ocr_pdf", fake_ocr_pdf)
+    out = ocr_parser.parse_ocr(Path("scan.pdf"), io.BytesIO(b"%PDF-1.4 fake"))
+
+    assert out.pages_text == ["page"] and out.source_path == Path("scan.pdf")
+    (tmp_path, content), = seen
+    assert content == b"%PDF-1.4 fake" and tmp_path.suffix == ".pdf"
+    assert not tmp_path.exists()  # removed once parsed
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+import pytest
+
+from refine.parsers.models import ParseOutput, ParsedItem
+from refine.extractors.features import extract_features
+
+
+@pytest.fixture
+def stationery():
+    """A nine-item reference catalog of pens, paper, erasers and pencils."""
+    names = ["ручка синяя шариковая", "ручка красная гелевая", "ручка синяя гелевая", "бумага a4 офисная",
+             "бумага a3 офисная", "ластик белый", "ластик мягкий белый", "карандаш чернографитный",
+             "карандаш цветной мягкий"]
+    items = [ParsedItem(name=n, sku=f"SKU{i:03d}", price=float(10 + i), attrs={"id": str(i)}) for i, n in enumerate(names)]
+    return extract_features(ParseOutput(source_path=Path("<ref>"), items_raw=items))
+
+
+@pytest.fixture(scope="session")
+def query():
+    """Features of an inline text query: ``query("ручка синяя")``."""
+
+    def make(text):
+        return extract_features(ParseOutput(source_path=Path("<inline>"), pages_text=[text]))
+
+    return make
@@ -0,0 +1,64 @@
+import numpy as np
+
+from refine.extractors.models import ItemFeature
+from refine.searchers.cosine_index import item_meta
+from refine.searchers.doc_store import DocStore, DocStoreBuilder, StringColumn
+
+
+def _items():
+    return [
+        ItemFeature("raw:0", "ручка синяя", attrs={"price": "10.5", "sku": "A1", "marketplace": "ozon", "id": "100"}),
+        ItemFeature("raw:1", "бумага a4", attrs={"marketplace": "wb"}),
+        ItemFeature("raw:2", "", attrs={"price": "0.0", "id": ""}),
+        ItemFeature("raw:3", "ластик", attrs={"sku": "Ё-2", "marketplace": "ozon"}),
+    ]
+
+
+def _store(items):
+    builder = DocStoreBuilder()
+    for it in items:
+        builder.append(it.item_id, item_meta(it))
+    return builder.build()
+
+
+def test_store_rebuilds_item_meta():
+    items = _items()
+    store = _store(items)
+
+    assert len(store) == 4
+    assert isinstance(store.prices, np.ndarray)  # every price reads back as the same string
+    assert [store.item_id(i) for i in range(4)] == [it.item_id for it in items]
+    assert list(store.iter_meta()) == [item_meta(it) for it in items]
+    assert list(store.meta(0)) == ["price", "sku", "marketplace", "id", "name"]
+    assert list(store.sources) == ["100", None, "", None]
+
+
+def test_prices_that_do_not_round_trip_stay_text():
+    items = _items() + [ItemFeature("tbl:0", "скрепки", attrs={"price": "1 200 руб"}), ItemFeature("tbl:1", "клей", attrs={"price": "5"})]
+    store = _store(items)
+
+    assert isinstance(store.prices, StringColumn)
+    assert list(store.iter_meta()) == [item_meta(it) for it in items]
+
+
+def test_slice_take_and_concat_keep_meta():
+    items = _items()
+    expected = [item_meta(it) for it in items]
+    text = _store([ItemFeature("tbl:0", "скрепки", attrs={"price": "12,5", "marketplace": "market"})])
+    store = DocStore.concat([_store(items[:2]), text, _store(items[2:]).slice(0, 2)])
+
+    assert list(store.iter_meta()) == expected[:2] + [item_meta(ItemFeature("tbl:0", "скрепки", attrs={"price": "12,5", "marketplace": "market"}))] + expected[2:]
+    assert sorted(store.marketplaces) == ["market", "ozon", "wb"]
+
+    kept = store.take(np.array([True, False, False, True, True]))
+    assert [kept.item_id(i) for i in range(len(kept))] == ["raw:0", "raw:2", "raw:3"]
+    assert list(kept.iter_meta()) == [expected[0], expected[2], expected[3]]
+
+
+def test_columns_round_trip():
+    store = _store(_items())
+    loaded = DocStore.from_columns(store.columns(), store.marketplaces)
+
+    assert list(loaded.iter_meta()) == list(store.iter_meta())
+    assert list(loaded.ids) == list(store.ids)
+    assert DocStore.empty().nbytes < store.nbytes
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+
+from refine.parsers.odt_parser import parse_odt
+from refine.extractors.features import extract_features
+from refine.extractors.models import ItemFeatures
+from refine.searchers.cosine_index import CosineIndex
+from benchmark.synthetic import query_features, synthetic_reference
+
+DATASETS = Path(__file__).resolve().parents[2] / "datasets"
+FOLD_DOCS = sorted(DATASETS.glob("fold_[23]/odt/*.odt"))
+
+
+@pytest.fixture(scope="module")
+def reference() -> ItemFeatures:
+    return synthetic_reference(3000)
+
+
+@pytest.fixture(scope="module")
+def fold_queries() -> ItemFeatures:
+    items = []
+    for path in FOLD_DOCS:
+        items.extend(extract_features(parse_odt(path)).items)
+    return ItemFeatures(items=items)
+
+
+def _fitted(engine: str, reference: ItemFeatures, batch_min_queries: int = 0) -> CosineIndex:
+    index = CosineIndex(engine=engine, batch_min_queries=batch_min_queries)
+    index.fit(reference)
+    return index
+
+
+def _assert_same_ranking(expected, got):
+    assert len(got) == len(expected)
+    for exp, res in zip(expected, got):
+        assert [m.score for m in res] == pytest.approx([m.score for m in exp], rel=1e-5)
+        assert [m.item_id for m in res] == [m.item_id for m in exp]
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        CosineIndex(engine="gpu")
+
+
+@pytest.mark.skipif(not FOLD_DOCS, reason="benchmark folds are not available")
+def test_numpy_engine_matches_python_on_folds(reference, fold_queries):
+    py = _fitted("python", reference)
+    vec = _fitted("numpy", reference)
+    for top_k in (1, 5, 20):
+        _assert_same_ranking(py.search(fold_queries, top_k=top_k), vec.search(fold_queries, top_k=top_k))
+
+
+def test_numpy_engine_matches_python_on_catalog_titles(reference):
+    queries = query_features([it.name for it in reference.items[:200:7]] + ["товар", "", "sku 000000"])
+    py = _fitted("python", reference)
+    vec = _fitted("numpy", reference)
+    for q in queries:
+        _assert_same_ranking(py.search(q, top_k=10), vec.search(q, top_k=10))
+
+
+def test_engines_agree_with_min_score(reference):
+    queries = query_features([it.name for it in reference.items[:100:9]])
+    py = _fitted("python", reference)
+    vec = _fitted("numpy", reference)
+    for q in queries:
+        expected = py.search(q, top_k=10, min_score=0.5)
+        assert all(m.score >= 0.5 for res in expected for m in res)
+        _assert_same_ranking(expected, vec.search(q, top_k=10, min_score=0.5))
+
+
+@pytest.mark.skipif(not FOLD_DOCS, reason="benchmark folds are not available")
+def test_batched_windows_match_per_query_scoring(reference, fold_queries):
+    single = _fitted("python", reference)
+    batched = _fitted("python", reference, batch_min_queries=2)
+    for top_k in (1, 5):
+        _assert_same_ranking(single.search(fold_queries, top_k=top_k), batched.search(fold_queries, top_k=top_k))
+    _assert_same_ranking(
+        single.search(fold_queries, top_k=5, min_score=0.3),
+        batched.search(fold_queries, top_k=5, min_score=0.3),
+    )
+
+
+def test_batched_search_chunks_preserve_results(reference, monkeypatch):
+    import refine.searchers.cosine_index as cosine_index
+
+    queries = ItemFeatures(items=[it for q in query_features([it.name for it in reference.items[:300:3]]) for it in q.items])
+    single = _fitted("python", reference)
+    batched = _fitted("python", reference, batch_min_queries=2)
+    expected = single.search(queries, top_k=5)
+    monkeypatch.setattr(cosine_index, "BATCH_MAX_PAIRS", 50)
+    _assert_same_ranking(expected, batched.search(queries, top_k=5))
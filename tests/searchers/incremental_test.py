@@ -0,0 +1,178 @@
+from pathlib import Path
+
+import threading
+from dataclasses import replace
+
+import pytest
+
+from refine.parsers.models import ParseOutput, ParsedItem
+from refine.extractors.features import extract_features
+from refine.extractors.models import ItemFeatures
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.incremental import IncrementalIndex
+from refine.searchers.segments import SegmentedIndex
+
+from benchmark.synthetic import query_features, synthetic_reference
+
+
+def _items(rows):
+    items = [ParsedItem(name=name, sku=f"U{key}", price=price, attrs={"id": key}) for key, name, price in rows]
+    return extract_features(ParseOutput(source_path=Path("<update>"), items_raw=items)).items
+
+
+def _hits(index, queries, top_k=10):
+    return [[(m.meta.get("id"), round(m.score, 12)) for m in ms] for ms in index.search(queries, top_k=top_k)]
+
+
+def _expected(index, live_items, reference):
+    # what a single index over the live items (same, possibly grown, vocab/idf) would return;
+    # docs of the initial build keep only the terms of the vocabulary they were built with
+    view = index._view
+    built = {id(it) for it in reference.items}
+    known = reference.meta["vocab"]
+    live = [replace(it, tokens=[t for t in it.tokens if t in known]) if id(it) in built else it for it in live_items]
+    ref = CosineIndex()
+    ref.fit_frozen(ItemFeatures(items=live), view.vocab, view.idf)
+    return ref
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return synthetic_reference(1500, seed=7)
+
+
+@pytest.fixture(scope="module")
+def queries(reference):
+    return ItemFeatures(items=[q.items[0] for q in query_features([it.text_repr for it in reference.items[::97]])])
+
+
+def _incremental(reference, segment_size=None, **kwargs):
+    base = CosineIndex() if segment_size is None else SegmentedIndex(segment_size=segment_size, merge_factor=0)
+    base.fit(reference)
+    reference.meta["vocab"] = base._vocab
+    return IncrementalIndex(base, **kwargs)
+
+
+@pytest.mark.parametrize("segment_size", [None, 400])
+def test_upserts_and_deletes_match_a_single_index(reference, queries, segment_size):
+    index = _incremental(reference, segment_size, merge_items=0)
+    items = list(reference.items)
+    replaced = _items([(items[5].attrs["id"], items[40].name, 1.0), ("new-1", items[97].name, 2.0)])
+    index.upsert(replaced)
+    deleted = [items[i].attrs["id"] for i in (0, 97, 194, 291)]
+    assert index.delete(deleted + ["missing"]) == 4
+
+    dead = set(deleted) | {items[5].attrs["id"]}
+    live = [it for it in items if it.attrs["id"] not in dead] + replaced
+    assert len(index) == len(live)
+    assert _hits(index, queries) == _hits(_expected(index, live, reference), queries)
+
+
+def test_tombstones_only_widen_queries_that_lost_hits(reference, queries, monkeypatch):
+    index = _incremental(reference, merge_items=0)
+    items = list(reference.items)
+    top = {m.meta["id"] for ms in index.search(queries, top_k=1) for m in ms}
+    deleted = sorted(top | {it.attrs["id"] for it in items[1::3]})
+    index.delete(deleted)
+    ks = []
+    rank = index.base._rank
+    monkeypatch.setattr(index.base, "_rank", lambda vectors, k, min_score: ks.append(k) or rank(vectors, k, min_score))
+
+    live = [it for it in items if it.attrs["id"] not in set(deleted)]
+    assert _hits(index, queries) == _hits(_expected(index, live, reference), queries)
+    assert ks[0] == 10 and max(ks) < 10 + len(deleted)
+
+
+@pytest.mark.parametrize("segment_size", [None, 400])
+def test_merge_keeps_results(reference, queries, segment_size):
+    index = _incremental(reference, segment_size, merge_items=0, idf_refresh_ratio=1e9)
+    index.upsert(_items([("new-1", reference.items[194].name, 2.0), ("new-2", "ручка новая", 3.0)]))
+    index.delete([reference.items[291].attrs["id"]])
+    before = _hits(index, queries)
+    index.merge()
+    assert index.stats()["delta_items"] == 0 and index.stats()["tombstones"] == 0
+    assert _hits(index, queries) == before
+
+
+def test_upsert_replaces_meta(reference):
+    index = _incremental(reference)
+    target = reference.items[10]
+    index.upsert(_items([(target.attrs["id"], target.name, 99999.0)]))
+    top = index.search(query_features([target.name])[0], top_k=50)[0]
+    prices = [m.meta["price"] for m in top if m.meta.get("id") == target.attrs["id"]]
+    assert prices == ["99999.0"]
+
+
+def test_upsert_keeps_item_ids(reference):
+    index = _incremental(reference, merge_items=0)
+    target = reference.items[10]
+    index.upsert(_items([(target.attrs["id"], target.name, 1.0), ("new-1", "ручка новая", 2.0)]))
+    index.upsert(_items([("new-1", "ручка синяя", 3.0), ("new-2", "ручка красная", 4.0)]))
+    ids = {m.meta["id"]: m.item_id for m in index.search(query_features([f"{target.name} ручка"])[0], top_k=50)[0]}
+    n = len(reference.items)
+    assert ids[target.attrs["id"]] == target.item_id
+    assert (ids["new-1"], ids["new-2"]) == (f"raw:{n}", f"raw:{n + 1}")
+
+
+def test_auto_merge_and_idf_refresh(reference):
+    index = _incremental(reference, merge_items=5, idf_refresh_ratio=0.0)
+    idf_before = list(index.base._idf)
+    index.upsert(_items([(f"new-{i}", reference.items[i].name, 1.0) for i in range(5)]))
+    index.wait_for_merges()
+    stats = index.stats()
+    assert stats["merges"] == 1 and stats["idf_refreshes"] == 1 and stats["delta_items"] == 0
+    assert len(index) == len(reference.items) + 5
+    assert list(index.base._idf) != idf_before
+
+
+@pytest.mark.parametrize("merge", [False, True])
+def test_new_words_are_searchable(reference, merge):
+    index = _incremental(reference, merge_items=0, idf_refresh_ratio=1e9)
+    index.upsert(_items([("paper-1", "Бумага A4 офисная", 349.0)]))
+    if merge:
+        index.merge()
+        assert "офисная" in index.base._vocab
+    top = index.search(query_features(["Бумага A4 офисная"])[0], top_k=3)[0]
+    assert top and top[0].meta["id"] == "paper-1"
+    assert index.stats()["new_terms"] == (0 if merge else len(index._view.vocab) - len(index.base._vocab))
+
+
+def test_updates_during_background_merge(reference, queries, monkeypatch):
+    index = _incremental(reference, 400, merge_items=3, idf_refresh_ratio=1e9)
+    started, release = threading.Event(), threading.Event()
+    with_changes = SegmentedIndex.with_changes
+
+    def blocked(self, deleted, added):
+        started.set()
+        assert release.wait(10)
+        return with_changes(self, deleted, added)
+
+    monkeypatch.setattr(SegmentedIndex, "with_changes", blocked)
+    items = list(reference.items)
+    first = _items([("a", "Бумага A4 офисная", 1.0), ("b", items[40].name, 2.0), ("c", "ручка новая", 3.0)])
+    index.upsert(first)
+    assert started.wait(10)
+    # the merge is parked: updates still go through and see their own changes
+    replaced = _items([("b", "Бумага A3 плотная", 5.0)])
+    index.upsert(replaced)
+    assert index.delete(["c", items[194].attrs["id"]]) == 2
+    monkeypatch.setattr(SegmentedIndex, "with_changes", with_changes)
+    release.set()
+    index.wait_for_merges()
+
+    # changes made during the first merge were due for a merge of their own
+    stats = index.stats()
+    assert stats["merges"] == 2 and stats["delta_items"] == 0 and stats["tombstones"] == 0
+    live = [it for it in items if it.attrs["id"] != items[194].attrs["id"]] + [first[0]] + replaced
+    assert len(index) == len(live)
+    assert _hits(index, queries) == _hits(_expected(index, live, reference), queries)
+    top = index.search(query_features(["Бумага A3 плотная"])[0], top_k=1)[0]
+    assert top[0].meta["id"] == "b" and top[0].meta["price"] == "5.0"
+
+
+def test_upsert_requires_id(reference):
+    index = _incremental(reference)
+    item = _items([("x", "ручка", 1.0)])[0]
+    item.attrs.pop("id")
+    with pytest.raises(ValueError):
+        index.upsert([item])
@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+
+from refine.parsers.tabular_parser import parse_tabular
+from refine.extractors.features import extract_features
+from refine.extractors.models import ItemFeatures
+from refine.searchers.ingest import iter_catalog_shards
+from refine.searchers.segments import SegmentedIndex
+
+from benchmark.synthetic import write_synthetic_catalog, query_features
+
+
+def _paths(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    items = write_synthetic_catalog(a, 900, seed=5)
+    write_synthetic_catalog(b, 400, seed=6)
+    return [a, b], [it.title for it in items[:40:3]]
+
+
+def _serial(paths, limit=None, **kwargs):
+    # serial reference: every file parsed and featurized whole, then fitted in one stream
+    items = [it for p in paths for it in extract_features(parse_tabular(p)).items]
+    index = SegmentedIndex(**kwargs)
+    index.fit_stream(items[:limit])
+    return index
+
+
+def _assert_same(a, b):
+    assert len(a.segments) == len(b.segments)
+    assert a._vocab == b._vocab
+    np.testing.assert_array_equal(a._idf, b._idf)
+    for x, y in zip(a.segments, b.segments):
+        np.testing.assert_array_equal(x._postings.offsets, y._postings.offsets)
+        np.testing.assert_array_equal(x._postings.doc_ids, y._postings.doc_ids)
+        np.testing.assert_array_equal(x._postings.weights, y._postings.weights)
+        np.testing.assert_array_equal(x._doc_norms, y._doc_norms)
+        assert list(x._docs.ids) == list(y._docs.ids)
+        assert list(x._docs.iter_meta()) == list(y._docs.iter_meta())
+
+
+def test_parallel_extraction_matches_serial(tmp_path):
+    paths, texts = _paths(tmp_path)
+    for limit in (None, 1000):
+        serial = _serial(paths, limit, segment_size=500)
+        parallel = SegmentedIndex(segment_size=500)
+        parallel.fit_shards(iter_catalog_shards(paths, limit, workers=2, shard_rows=128, parallel_min_bytes=0))
+        assert len(parallel) == (limit or 1300)
+        _assert_same(serial, parallel)
+
+        query = ItemFeatures(items=[q.items[0] for q in query_features(texts)])
+        assert serial.search(query, top_k=5) == parallel.search(query, top_k=5)
+
+
+def test_in_process_shards_share_interned_vocabulary(tmp_path):
+    paths, texts = _paths(tmp_path)
+    shards = list(iter_catalog_shards(paths, workers=1, shard_rows=200))
+    vocabulary = shards[0].vocabulary
+    assert vocabulary is not None and all(s.vocabulary is vocabulary and s.tokens is None for s in shards)
+
+    interned = SegmentedIndex(segment_size=500)
+    interned.fit_shards(iter(shards))
+    serial = _serial(paths, segment_size=500)
+    _assert_same(serial, interned)
+    query = ItemFeatures(items=[q.items[0] for q in query_features(texts)])
+    assert serial.search(query, top_k=5) == interned.search(query, top_k=5)
+
+    other = list(iter_catalog_shards(paths[:1], workers=1, shard_rows=200))
+    with pytest.raises(ValueError):
+        SegmentedIndex().fit_shards(iter(shards[:1] + other))
+
+
+def test_small_references_stay_in_process(tmp_path, monkeypatch):
+    from refine.searchers import ingest
+
+    paths, _ = _paths(tmp_path)
+
+    def no_pool(*a, **kw):
+        raise AssertionError("process pool used for a small reference")
+
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", no_pool)
+    shards = list(iter_catalog_shards(paths, workers=4, shard_rows=256))
+    assert sum(len(s.doc_ids) for s in shards) == 1300
+    assert [s.doc_ids[0] for s in shards[:5]] == ["raw:0", "raw:256", "raw:512", "raw:768", "raw:0"]
+
+
+def test_small_limits_stay_in_process(tmp_path, monkeypatch):
+    from refine.searchers import ingest
+
+    paths, _ = _paths(tmp_path)
+
+    def no_pool(*a, **kw):
+        raise AssertionError("process pool used for a small limit")
+
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", no_pool)
+    shards = list(iter_catalog_shards(paths, 500, workers=4, shard_rows=128, parallel_min_bytes=0))
+    assert sum(len(s.doc_ids) for s in shards) == 500
+    with pytest.raises(AssertionError, match="process pool"):
+        list(iter_catalog_shards(paths, 512, workers=4, shard_rows=128, parallel_min_bytes=0))
+
+
+def test_concurrent_reads_keep_file_order(tmp_path):
+    from refine.searchers.ingest import FileLoadStats
+
+    paths = []
+    for n in range(5):
+        p = tmp_path / f"m{n}.jsonl"
+        write_synthetic_catalog(p, 120 + 40 * n, seed=10 + n)
+        paths.append(p)
+
+    serial = _serial(paths, 700)
+    stats = []
+    threaded = SegmentedIndex()
+    threaded.fit_shards(iter_catalog_shards(paths, 700, workers=1, shard_rows=50, read_workers=3, file_stats=stats))
+    _assert_same(serial, threaded)
+    assert [s.path for s in stats] == paths
+    assert [s.items for s in stats] == [120, 160, 200, 220, 0]
+    assert all(isinstance(s, FileLoadStats) and s.read_seconds >= 0 for s in stats)
+    assert all(s.extract_seconds > 0 for s in stats[:4])
+
+
+def test_read_error_surfaces_in_file_order(tmp_path):
+    paths, _ = _paths(tmp_path)
+    bad = tmp_path / "c.txt"
+    bad.write_text("not a catalog", encoding="utf-8")
+    seen = []
+    with pytest.raises(ValueError, match="Unsupported tabular format"):
+        for shard in iter_catalog_shards(paths + [bad], workers=1, shard_rows=100, read_workers=3):
+            seen.append(len(shard.doc_ids))
+    assert sum(seen) == 1300  # both good files come through before the failing one
+
+
+def test_auto_workers_follow_affinity_and_cpu_quota(monkeypatch):
+    from refine.searchers import ingest
+
+    monkeypatch.setattr(ingest.os, "sched_getaffinity", lambda pid: set(range(64)), raising=False)
+    monkeypatch.setattr(ingest, "_cgroup_cpu_limit", lambda: None)
+    assert ingest._resolve_workers(0) == ingest.EXTRACT_MAX_WORKERS  # a big host is still capped
+    monkeypatch.setattr(ingest, "_cgroup_cpu_limit", lambda: 2.5)  # cpus: '2.5'
+    assert ingest.available_cpus() == 2 and ingest._resolve_workers(0) == 2
+    monkeypatch.setattr(ingest, "_cgroup_cpu_limit", lambda: 0.5)
+    assert ingest._resolve_workers(0) == 1
+    monkeypatch.setattr(ingest.os, "sched_getaffinity", lambda pid: {3}, raising=False)
+    monkeypatch.setattr(ingest, "_cgroup_cpu_limit", lambda: None)
+    assert ingest._resolve_workers(0) == 1
+    assert ingest._resolve_workers(6) == 6  # an explicit count is taken as is
@@ -0,0 +1,46 @@
+import pytest
+
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.models import search, search_prepared
+
+
+class _CountingIndex(CosineIndex):
+    def __init__(self):
+        super().__init__()
+        self.fit_calls = 0
+
+    def fit(self, corpus):
+        self.fit_calls += 1
+        super().fit(corpus)
+
+
+def test_search_prepared_requires_fitted_index(query):
+    with pytest.raises(RuntimeError):
+        search_prepared(query("ручка"), CosineIndex())
+
+
+def test_search_prepared_does_not_refit(stationery, query):
+    index = _CountingIndex()
+    index.fit(stationery)
+    for q in ("ручка синяя", "бумага a4", "ластик"):
+        search_prepared(query(q), index, top_k=3, threshold=0.1)
+    assert index.fit_calls == 1
+
+
+def test_search_prepared_matches_one_shot_search(stationery, query):
+    index = CosineIndex()
+    index.fit(stationery)
+    q = query("ручка синяя")
+    prepared = search_prepared(q, index, top_k=3, threshold=0.1)
+    one_shot = search(q, stationery, CosineIndex(), top_k=3, threshold=0.1)
+    assert [r.best_match_id for r in prepared] == [r.best_match_id for r in one_shot]
+
+
+def test_search_prepared_prune_drops_matches_below_threshold(stationery, query):
+    index = CosineIndex()
+    index.fit(stationery)
+    q = query("ручка синяя")
+    full = search_prepared(q, index, top_k=5, threshold=0.5)[0].top_k
+    pruned = search_prepared(q, index, top_k=5, threshold=0.5, prune=True)[0].top_k
+    assert any(m.score < 0.5 for m in full)
+    assert pruned == [m for m in full if m.score >= 0.5]
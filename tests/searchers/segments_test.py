@@ -0,0 +1,69 @@
+import pytest
+
+from refine.extractors.models import ItemFeatures
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.segments import SegmentedIndex
+from refine.searchers.snapshot import load_snapshot, save_snapshot
+
+from benchmark.synthetic import query_features, synthetic_reference
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return synthetic_reference(1500, seed=11)
+
+
+@pytest.fixture(scope="module")
+def queries(reference):
+    return ItemFeatures(items=[q.items[0] for q in query_features([it.text_repr for it in reference.items[::61]] + ["товар"])])
+
+
+def _hits(index, queries, top_k=10):
+    return [[(m.item_id, m.score) for m in ms] for ms in index.search(queries, top_k=top_k)]
+
+
+@pytest.mark.parametrize("engine", CosineIndex.ENGINES)
+def test_segments_match_single_index(reference, queries, engine):
+    single = CosineIndex(engine=engine, batch_min_queries=0)
+    single.fit(reference)
+    segmented = SegmentedIndex(engine=engine, batch_min_queries=0, segment_size=250, merge_factor=0)
+    segmented.fit(reference)
+
+    assert len(segmented.segments) == 6
+    assert len(segmented) == len(single)
+    assert segmented._vocab == single._vocab
+    assert _hits(segmented, queries) == _hits(single, queries)
+
+
+def test_background_merge_keeps_results(reference, queries):
+    unmerged = SegmentedIndex(segment_size=100, merge_factor=0)
+    unmerged.fit(reference)
+    index = SegmentedIndex(segment_size=100, merge_factor=4)
+    index.fit(reference)
+    index.wait_for_merges()
+
+    assert len(index.segments) <= 4
+    assert index.stats()["segment_merges"] > 0
+    assert _hits(index, queries) == _hits(unmerged, queries)
+
+
+def test_with_changes_drops_deleted_docs(reference, queries):
+    index = SegmentedIndex(segment_size=200, merge_factor=0)
+    index.fit(reference)
+    deleted = {0, 199, 200, 777, 1499}
+    changed = index.with_changes(deleted, None)
+
+    expected = CosineIndex()
+    live = [it for i, it in enumerate(reference.items) if i not in deleted]
+    expected.fit_frozen(ItemFeatures(items=live), index._vocab, index._idf)
+    assert len(changed) == len(reference.items) - len(deleted)
+    assert _hits(changed, queries) == _hits(expected, queries)
+
+
+def test_segmented_snapshot_roundtrip(reference, queries, tmp_path):
+    index = SegmentedIndex(segment_size=400, merge_factor=0)
+    index.fit(reference)
+    loaded = load_snapshot(save_snapshot(index, tmp_path / "seg.idx"))
+
+    assert len(loaded.segments) == len(index.segments)
+    assert _hits(loaded, queries) == _hits(index, queries)
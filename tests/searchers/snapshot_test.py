@@ -0,0 +1,63 @@
+import pytest
+
+from refine.searchers.cosine_index import CosineIndex
+from refine.searchers.snapshot import SnapshotError, load_snapshot, read_snapshot_extra, save_snapshot
+
+
+def _fitted(reference):
+    index = CosineIndex()
+    index.fit(reference)
+    return index
+
+
+def test_snapshot_roundtrip_preserves_results(tmp_path, stationery, query):
+    index = _fitted(stationery)
+    path = save_snapshot(index, tmp_path / "cat.idx", extra={"fingerprint": {"v": 1}})
+    loaded = load_snapshot(path)
+
+    assert loaded.is_fitted
+    assert len(loaded) == len(index)
+    assert read_snapshot_extra(path) == {"fingerprint": {"v": 1}}
+    for q in ("ручка синяя", "бумага a4 офисная", "ластик"):
+        expected = index.search(query(q), top_k=3)[0]
+        got = loaded.search(query(q), top_k=3)[0]
+        assert [m.item_id for m in got] == [m.item_id for m in expected]
+        assert [m.score for m in got] == pytest.approx([m.score for m in expected])
+        assert [m.meta for m in got] == [m.meta for m in expected]
+
+
+def test_snapshot_rejects_foreign_files(tmp_path):
+    path = tmp_path / "bad.idx"
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    with pytest.raises(SnapshotError):
+        load_snapshot(path)
+
+
+def test_snapshot_rejects_other_versions(tmp_path, stationery):
+    import struct
+
+    path = save_snapshot(_fitted(stationery), tmp_path / "cat.idx")
+    with open(path, "r+b") as f:
+        f.seek(8)
+        f.write(struct.pack("<I", 3))
+    with pytest.raises(SnapshotError, match="version 3"):
+        load_snapshot(path)
+    with pytest.raises(SnapshotError):
+        read_snapshot_extra(path)
+
+
+def test_snapshot_rejects_unfitted_index(tmp_path):
+    with pytest.raises(ValueError):
+        save_snapshot(CosineIndex(), tmp_path / "x.idx")
+
+
+def test_extra_is_read_without_doc_metadata(tmp_path, stationery):
+    import struct
+
+    path = save_snapshot(_fitted(stationery), tmp_path / "cat.idx", extra={"catalog_id": "c"})
+    with open(path, "rb") as f:
+        _, version, header_len = struct.unpack("<8sIQ", f.read(20))
+        header = f.read(header_len).decode("utf-8")
+    assert version == 4
+    assert "ручка" not in header and "SKU000" not in header  # vocab and metadata live in the data section
+    assert read_snapshot_extra(path) == {"catalog_id": "c"}
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from item_search.app.services import catalog_manager
+from item_search.app.services.catalog_manager import CatalogManager
+from item_search.app.services.catalog_registry import CatalogNotLoaded, CatalogRegistry
+
+from benchmark.synthetic import write_synthetic_catalog
+
+
+def test_replaced_version_released_after_last_lease():
+    released = []
+    reg = CatalogRegistry(on_release=lambda e: released.append((e.catalog_id, e.version)))
+    first = reg.install("c", "v1")
+
+    with reg.lease("c") as lease:
+        assert lease.value == "v1"
+        second = reg.install("c", "v2")
+        assert lease.value == "v1"  # in-flight reader keeps its version
+        with reg.lease("c") as newer:
+            assert newer.value == "v2"
+        assert released == [] and reg.stats()["retired_in_use"] == 1
+    assert released == [("c", first.version)]
+    assert first.released.is_set() and first.value is None
+    assert reg.stats() == {"versions": {"c": {"version": second.version, "leases": 0}}, "retired_in_use": 0, "swaps": 1, "released": 1}
+
+    reg.remove("c")  # unleased: released at once
+    assert released[-1] == ("c", second.version)
+    with pytest.raises(CatalogNotLoaded):
+        with reg.lease("c"):
+            pass
+
+
+def test_searches_never_fail_during_rewarmup(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_manager, "CATALOGUES_ROOT", tmp_path)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ENABLED", False)
+    items = write_synthetic_catalog(tmp_path / "a.jsonl", 1500, seed=2)
+    mgr = CatalogManager()
+    mgr.cache.max_size = 0  # every search goes to the index
+    mgr.warmup("cat", ["a.jsonl"], limit_items=500)
+
+    stop = threading.Event()
+    errors = []
+    counts = []
+
+    def search_loop(text):
+        n = 0
+        while not stop.is_set():
+            try:
+                mgr.search_text("cat", text)
+                n += 1
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+        counts.append(n)
+
+    threads = [threading.Thread(target=search_loop, args=(it.title,)) for it in items[:4]]
+    for t in threads:
+        t.start()
+    for limit in (800, 1200, 1500):
+        mgr.warmup("cat", ["a.jsonl"], limit_items=limit)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert errors == [] and all(n > 0 for n in counts)
+    stats = mgr.registry_stats()
+    assert stats["swaps"] == 3 and stats["released"] == 3 and stats["retired_in_use"] == 0
+    assert mgr.catalog_stats("cat")["items"] == 1500
+
+
+def test_updates_bump_the_reported_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_manager, "CATALOGUES_ROOT", tmp_path)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ENABLED", False)
+    items = write_synthetic_catalog(tmp_path / "a.jsonl", 300, seed=2)
+    mgr = CatalogManager()
+    mgr.warmup("cat", ["a.jsonl"], limit_items=300)
+    version = mgr.catalog_stats("cat")["version"]
+    mgr.upsert_items("cat", [{"id": items[3].id, "title": items[3].title + " новинка"}])
+    assert mgr.catalog_stats("cat")["version"] > version
+    top = mgr.search_text("cat", items[3].title + " новинка")["top_k"]
+    assert top[0]["item_id"] == "raw:3"
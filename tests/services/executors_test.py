@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+import pytest
+
+from item_search.app.services.executors import BoundedExecutor, Overloaded
+
+
+def test_rejects_past_workers_plus_queue():
+    pool = BoundedExecutor("test", workers=1, max_queue=1)
+    release = threading.Event()
+    running = [pool.submit(release.wait), pool.submit(release.wait)]
+    with pytest.raises(Overloaded):
+        pool.submit(release.wait)
+    release.set()
+    for f in running:
+        f.result(timeout=5)
+    pool.submit(lambda: None).result(timeout=5)  # capacity is back once tasks finish
+    stats = pool.stats()
+    assert (stats["pending"], stats["completed"], stats["rejected"]) == (0, 3, 1)
+    pool.shutdown()
+
+
+def test_event_loop_stays_free_while_pool_works():
+    pool = BoundedExecutor("test", workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(pool.run(release.wait))
+        # the loop keeps serving other coroutines while the blocking call runs
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        return ticks, await slow
+
+    assert asyncio.run(scenario()) == (5, True)
+    pool.shutdown()
@@ -0,0 +1,137 @@
+import pytest
+
+from item_search.app.services import catalog_manager, residency
+from item_search.app.services.catalog_manager import CatalogManager
+from item_search.app.services.catalog_registry import CatalogBuilding, CatalogNotLoaded
+from item_search.app.services.residency import ResidencyManager, estimate_footprint
+from item_search.app.services.warmup_jobs import WarmupJobs
+
+from benchmark.synthetic import write_synthetic_catalog
+
+
+def test_lru_victims_respect_budget_and_pins():
+    res = ResidencyManager(budget_bytes=300)
+    pinned = {"b"}
+    evictable = lambda cid: cid not in pinned
+    assert res.admit("a", 100, evictable) == []
+    assert res.admit("b", 100, evictable) == []
+    assert res.admit("c", 100, evictable) == []
+    res.touch("a")  # LRU order now b, c, a
+    assert res.admit("d", 100, evictable) == ["c"]  # b is pinned
+    assert res.admit("e", 250, evictable) == ["a", "d"]  # still over: only pinned b left besides e
+    stats = res.stats()
+    assert stats["resident"] == {"b": 100, "e": 250} and stats["evictions"] == 3
+
+    counted = ResidencyManager(budget_bytes=0, max_catalogs=2)
+    for cid in "xyz":
+        victims = counted.admit(cid, 10**9, lambda cid: True)
+    assert victims == ["x"]
+
+
+def _manager(tmp_path, monkeypatch, **kw):
+    cat_dir, snap_dir = tmp_path / "catalogues", tmp_path / "snapshots"
+    cat_dir.mkdir()
+    monkeypatch.setattr(catalog_manager, "CATALOGUES_ROOT", cat_dir)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ROOT", snap_dir)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ENABLED", True)
+    items = write_synthetic_catalog(cat_dir / "a.jsonl", 600, seed=4)
+    return CatalogManager(**kw), items
+
+
+def test_evicted_catalog_reloads_from_snapshot(tmp_path, monkeypatch):
+    mgr, items = _manager(tmp_path, monkeypatch, budget_bytes=0, max_resident=2)
+    mgr.cache.max_size = 0
+    mgr.warmup("one", ["a.jsonl"], limit_items=300)
+    before = mgr.search_text("one", items[5].title)
+    mgr.warmup("two", ["a.jsonl"], limit_items=400)
+    mgr.warmup("three", ["a.jsonl"], limit_items=500)
+
+    assert mgr.resident_catalogs() == ["two", "three"]
+    assert mgr.is_loaded("one") and sorted(mgr.loaded_catalogs()) == ["one", "three", "two"]
+    assert mgr.search_text("one", items[5].title) == before  # transparent reload
+    assert sorted(mgr.resident_catalogs()) == ["one", "three"]
+    stats = mgr.residency_stats()
+    assert (stats["evictions"], stats["reloads"]) == (2, 1)
+
+
+def test_catalog_with_unsaved_updates_stays_resident(tmp_path, monkeypatch):
+    mgr, items = _manager(tmp_path, monkeypatch, budget_bytes=0, max_resident=1)
+    mgr.warmup("one", ["a.jsonl"], limit_items=300)
+    mgr.upsert_items("one", [{"id": "new-1", "title": items[7].title + " копия"}])
+    mgr.warmup("two", ["a.jsonl"], limit_items=300)
+    # "one" has in-memory updates its snapshot lacks, so it is never evicted
+    assert sorted(mgr.resident_catalogs()) == ["one", "two"]
+    top = mgr.search_text("one", items[7].title + " копия")["top_k"]
+    assert "new-1" in [m["meta"]["id"] for m in top]
+
+
+def _evict_one(tmp_path, monkeypatch):
+    mgr, items = _manager(tmp_path, monkeypatch, budget_bytes=0, max_resident=1)
+    mgr.cache.max_size = 0
+    jobs = WarmupJobs(mgr)
+    mgr.warmup("one", ["a.jsonl"], limit_items=300)
+    mgr.warmup("two", ["a.jsonl"], limit_items=400)
+    assert mgr.resident_catalogs() == ["two"]
+    catalog_manager.snapshot_path("one").unlink()  # "one" can only come back by a rebuild
+    return mgr, jobs, items
+
+
+def test_evicted_catalog_without_snapshot_is_rebuilt_in_background(tmp_path, monkeypatch):
+    mgr, jobs, items = _evict_one(tmp_path, monkeypatch)
+    with pytest.raises(CatalogBuilding):
+        mgr.search_text("one", items[5].title)
+    job = jobs.latest("one")
+    assert job is not None and jobs.catalog_state("one") in ("building", "ready")
+    assert job.wait(30) and job.state == "done"
+    assert mgr.search_text("one", items[5].title)["top_k"]
+    jobs.shutdown()
+
+
+def test_evicted_catalog_with_deleted_references_is_not_loaded(tmp_path, monkeypatch):
+    mgr, jobs, items = _evict_one(tmp_path, monkeypatch)
+    (tmp_path / "catalogues" / "a.jsonl").unlink()
+    with pytest.raises(CatalogNotLoaded):
+        mgr.search_text("one", items[5].title)
+    assert jobs.latest("one") is None
+    jobs.shutdown()
+
+
+def test_reload_retries_when_evicted_before_the_lease(tmp_path, monkeypatch):
+    mgr, items = _manager(tmp_path, monkeypatch, budget_bytes=0, max_resident=1)
+    mgr.warmup("one", ["a.jsonl"], limit_items=300)
+    mgr.warmup("two", ["a.jsonl"], limit_items=300)
+    install = mgr._install
+    evicted = []
+
+    def install_then_evict(catalog_id, state, spec, reload=False):
+        install(catalog_id, state, spec, reload=reload)
+        if reload and not evicted:  # another admission takes the slot right away
+            evicted.append(catalog_id)
+            mgr._registry.remove(catalog_id)
+
+    monkeypatch.setattr(mgr, "_install", install_then_evict)
+    assert mgr.search_text("one", items[5].title)["top_k"]
+    assert evicted == ["one"] and mgr.residency_stats()["reloads"] == 2
+
+
+def test_footprint_counts_heap_arrays_only(tmp_path):
+    # the app's copy of refine: that is what estimate_footprint inspects
+    from item_search.app.src.refine.searchers.incremental import IncrementalIndex
+    from item_search.app.src.refine.searchers.ingest import iter_catalog_shards
+    from item_search.app.src.refine.searchers.segments import SegmentedIndex
+    from item_search.app.src.refine.searchers.snapshot import load_snapshot, save_snapshot
+
+    write_synthetic_catalog(tmp_path / "a.jsonl", 600, seed=4)
+    built = SegmentedIndex()
+    built.fit_shards(iter_catalog_shards([tmp_path / "a.jsonl"], workers=1))
+    save_snapshot(built, tmp_path / "a.snap")
+    heap, mapped = IncrementalIndex(built), IncrementalIndex(load_snapshot(tmp_path / "a.snap"))
+
+    vocab_bytes = len(built._vocab) * residency._VOCAB_ENTRY_BYTES
+    assert estimate_footprint(heap) == built.memory_usage() + vocab_bytes
+    # postings and doc columns stay in the page cache; only the marketplace names are on the heap
+    assert vocab_bytes <= estimate_footprint(mapped) < vocab_bytes + 64
+    # a merge rewrites the segment on the heap, which is counted again
+    mapped.delete([next(built.iter_keys())])
+    mapped.merge()
+    assert estimate_footprint(mapped) > vocab_bytes + built.memory_usage() // 2
@@ -0,0 +1,50 @@
+from item_search.app.services.search_cache import SearchCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = SearchCache(max_size=2, ttl_sec=60)
+    cache.put(("cat", 1, "a"), 1)
+    cache.put(("cat", 1, "b"), 2)
+    assert cache.get(("cat", 1, "a")) == 1  # "a" becomes most recent
+    cache.put(("cat", 1, "c"), 3)  # evicts "b"
+    assert cache.get(("cat", 1, "b")) is None
+    assert cache.get(("cat", 1, "c")) == 3
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 1, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    clock = _Clock()
+    cache = SearchCache(max_size=10, ttl_sec=5, clock=clock)
+    cache.put(("cat", 1, "q"), "r")
+    clock.now = 4.9
+    assert cache.get(("cat", 1, "q")) == "r"
+    clock.now = 5.0
+    assert cache.get(("cat", 1, "q")) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidate_drops_only_that_catalog():
+    cache = SearchCache(max_size=10, ttl_sec=60)
+    cache.put(("a", 1, "q"), 1)
+    cache.put(("a", 1, "p"), 2)
+    cache.put(("b", 1, "q"), 3)
+    assert cache.invalidate("a") == 2
+    assert cache.get(("a", 1, "q")) is None
+    assert cache.get(("b", 1, "q")) == 3
+
+
+def test_zero_size_disables_cache():
+    cache = SearchCache(max_size=0, ttl_sec=60)
+    cache.put(("a", 1, "q"), 1)
+    assert cache.get(("a", 1, "q")) is None
+    assert cache.stats()["misses"] == 0
@@ -0,0 +1,83 @@
+import mmap
+import threading
+import time
+
+from item_search.app.services import catalog_manager
+from item_search.app.services.catalog_manager import CatalogManager, _build_lock
+
+from benchmark.synthetic import write_synthetic_catalog
+
+
+def _workers(tmp_path, monkeypatch):
+    # two managers over the same directories stand in for two worker processes
+    cat_dir, snap_dir = tmp_path / "catalogues", tmp_path / "snapshots"
+    cat_dir.mkdir()
+    monkeypatch.setattr(catalog_manager, "CATALOGUES_ROOT", cat_dir)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ROOT", snap_dir)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ENABLED", True)
+    monkeypatch.setattr(catalog_manager, "SHARED_REFRESH_SEC", 0.0)
+    items = write_synthetic_catalog(cat_dir / "a.jsonl", 600, seed=6)
+    return CatalogManager(), CatalogManager(), items
+
+
+def test_worker_sees_catalog_warmed_by_another(tmp_path, monkeypatch):
+    a, b, items = _workers(tmp_path, monkeypatch)
+    a.warmup("shared", ["a.jsonl"], limit_items=300)
+
+    assert b.is_loaded("shared") and b.loaded_catalogs() == ["shared"]
+    query = items[10].title
+    assert b.search_text("shared", query) == a.search_text("shared", query)
+    assert b.catalog_stats("shared")["items"] == 300
+
+
+def test_worker_switches_to_rewarmed_snapshot(tmp_path, monkeypatch):
+    a, b, items = _workers(tmp_path, monkeypatch)
+    a.warmup("shared", ["a.jsonl"], limit_items=300)
+    assert b.catalog_stats("shared")["items"] == 300
+
+    a.warmup("shared", ["a.jsonl"], limit_items=500)
+    assert b.catalog_stats("shared")["items"] == 500
+    query = items[20].title
+    assert b.search_text("shared", query) == a.search_text("shared", query)
+
+
+def test_build_lock_serializes_builds(tmp_path):
+    snap = tmp_path / "c.idx"
+    order = []
+    holding = threading.Event()
+
+    def first():
+        with _build_lock(snap, threading.Event()):
+            holding.set()
+            time.sleep(0.3)
+            order.append("first")
+
+    t = threading.Thread(target=first)
+    t.start()
+    holding.wait()
+    with _build_lock(snap, threading.Event()):
+        order.append("second")
+    t.join()
+    assert order == ["first", "second"]
+
+
+def test_waiting_for_build_lock_can_be_cancelled(tmp_path):
+    snap = tmp_path / "c.idx"
+    cancel = threading.Event()
+    cancel.set()
+    with _build_lock(snap, threading.Event()):
+        try:
+            with _build_lock(snap, cancel):
+                raise AssertionError("lock taken twice")
+        except catalog_manager.WarmupCancelled:
+            pass
+
+
+def test_warmup_serves_the_snapshot_it_wrote(tmp_path, monkeypatch):
+    a, _, items = _workers(tmp_path, monkeypatch)
+    a.warmup("shared", ["a.jsonl"], limit_items=300)
+    with a.acquire("shared") as lease:
+        segments = lease.value.index.base.segments
+    # the heap-built postings were dropped in favour of the mapped file
+    assert segments and all(isinstance(seg._postings.doc_ids.base.obj, mmap.mmap) for seg in segments)
+    assert a.search_text("shared", items[10].title)["top_k"]
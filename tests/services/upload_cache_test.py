@@ -0,0 +1,89 @@
+import io
+import os
+import pickle
+from pathlib import Path
+
+from item_search.app.services.upload_cache import UploadCache
+from item_search.app.src.refine.extractors.models import ItemFeature, ItemFeatures
+from item_search.app.src.refine.parsers.models import ParsedItem, ParsedTable, ParseOutput
+
+
+def _parsed(text: str) -> ParseOutput:
+    return ParseOutput(source_path=Path("upload.txt"), pages_text=[text])
+
+
+def test_roundtrip_with_features(tmp_path):
+    cache = UploadCache(root=tmp_path, max_bytes=10 * 1024 * 1024)
+    key = cache.key(b"same bytes", ".txt")
+    assert cache.get(key) is None
+
+    features = ItemFeatures(items=[ItemFeature(item_id="txt:0", name="x", tokens=["x"])])
+    cache.put(key, _parsed("hello"), features)
+    parsed, cached_features = cache.get(key)
+    assert parsed.pages_text == ["hello"]
+    assert [it.tokens for it in cached_features.items] == [["x"]]
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_depends_on_content_and_suffix():
+    assert UploadCache.key(b"a", ".pdf") == UploadCache.key(b"a", ".PDF")
+    assert UploadCache.key(b"a", ".pdf") != UploadCache.key(b"a", ".txt")
+    assert UploadCache.key(b"a", ".pdf") != UploadCache.key(b"b", ".pdf")
+
+
+def test_key_file_matches_key_and_rewinds():
+    data = os.urandom(3000)
+    f = io.BytesIO(data)
+    assert UploadCache.key_file(f, ".pdf", chunk_size=1024) == UploadCache.key(data, ".pdf")
+    assert f.tell() == 0
+
+
+def test_least_recently_used_entries_evicted_over_budget(tmp_path):
+    cache = UploadCache(root=tmp_path, max_bytes=1)
+    probe = UploadCache(root=tmp_path / "probe", max_bytes=10**9)
+    probe.put("k", _parsed("x" * 1000), None)
+    entry_size = (tmp_path / "probe" / "k.json").stat().st_size
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, _parsed("x" * 1000), None)
+    cache.put("d", _parsed("x" * 1000), None)
+
+    remaining = sorted(p.stem for p in tmp_path.glob("*.json"))
+    assert remaining == ["c", "d"]
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["bytes"] == 2 * entry_size
+
+
+def test_sizes_are_tracked_without_listing_the_directory(tmp_path, monkeypatch):
+    for i, key in enumerate(("a", "b")):
+        UploadCache(root=tmp_path, max_bytes=10**9).put(key, _parsed("x" * 1000), None)
+        os.utime(tmp_path / f"{key}.json", (i, i))
+    entry_size = (tmp_path / "a.json").stat().st_size
+
+    # a restarted cache lists the directory once, oldest entries first
+    cache = UploadCache(root=tmp_path, max_bytes=3 * entry_size)
+    cache.get("a")  # now more recent than "b"
+    listed = []
+    glob = Path.glob
+    monkeypatch.setattr(Path, "glob", lambda self, pattern: listed.append(pattern) or glob(self, pattern))
+    cache.put("c", _parsed("x" * 1000), None)
+    cache.put("d", _parsed("x" * 1000), None)
+    assert listed == []
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["a", "c", "d"]
+    assert cache.stats()["bytes"] == 3 * entry_size
+
+
+def test_entries_are_json_and_pickles_are_never_loaded(tmp_path):
+    cache = UploadCache(root=tmp_path)
+    parsed = ParseOutput(
+        source_path=Path("list.xlsx"),
+        tables=[ParsedTable(headers=["title"], rows=[["Бумага A4"]], meta={"count": 1})],
+        items_raw=[ParsedItem(name="Бумага A4", price=349.0, attrs={"id": "7"}, raw_row={"title": "Бумага A4"})],
+    )
+    features = ItemFeatures(items=[ItemFeature(item_id="raw:0", name="Бумага A4", tokens=["бумага", "a4"], attrs={"id": "7"})])
+    cache.put("k", parsed, features)
+    assert cache.get("k") == (parsed, features)
+
+    (tmp_path / "p.json").write_bytes(pickle.dumps((parsed, None)))
+    assert UploadCache(root=tmp_path).get("p") is None
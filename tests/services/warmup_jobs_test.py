@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+from item_search.app.services import catalog_manager
+from item_search.app.services.catalog_manager import CatalogManager, WarmupCancelled, WarmupProgress, WarmupResult
+from item_search.app.services.warmup_jobs import WarmupConflict, WarmupJobs
+
+from benchmark.synthetic import write_synthetic_catalog
+
+
+class _GatedManager:
+    """Stands in for CatalogManager: warmup blocks until released."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.loaded = set()
+        self.builds = 0
+        self.fail = False
+
+    def resolve_references(self, references):
+        if "missing.jsonl" in references:
+            raise FileNotFoundError("missing.jsonl")
+        return references
+
+    def warmup(self, catalog_id, references, limit_items=None, progress=None, cancel=None):
+        self.builds += 1
+        progress.phase = "reading"
+        self.started.set()
+        while not self.gate.wait(0.01):
+            if cancel.is_set():
+                raise WarmupCancelled()
+        if self.fail:
+            raise ValueError("broken catalog")
+        self.loaded.add(catalog_id)
+        return WarmupResult(items=3, seconds=0.0)
+
+    def is_loaded(self, catalog_id):
+        return catalog_id in self.loaded
+
+    def loaded_catalogs(self):
+        return sorted(self.loaded)
+
+
+def test_concurrent_warmups_of_a_catalog_are_deduplicated():
+    mgr = _GatedManager()
+    jobs = WarmupJobs(mgr, workers=2)
+    job, created = jobs.submit("c", ["a.jsonl"], limit_items=10)
+    again, created_again = jobs.submit("c", ["a.jsonl"], limit_items=10)
+    assert created and not created_again and again is job
+    with pytest.raises(WarmupConflict):
+        jobs.submit("c", ["b.jsonl"])
+    with pytest.raises(FileNotFoundError):
+        jobs.submit("d", ["missing.jsonl"])
+
+    mgr.started.wait(5)
+    assert jobs.catalog_state("c") == "building"
+    mgr.gate.set()
+    assert job.wait(5)
+    assert (job.state, job.result.items, mgr.builds) == ("done", 3, 1)
+    assert jobs.catalog_state("c") == "ready"
+    assert jobs.submit("c", ["a.jsonl"], limit_items=10)[1]  # finished jobs are not reused
+    jobs.shutdown()
+
+
+def test_cancel_running_and_queued_jobs():
+    mgr = _GatedManager()
+    jobs = WarmupJobs(mgr, workers=1)
+    running, _ = jobs.submit("a", ["a.jsonl"])
+    queued, _ = jobs.submit("b", ["b.jsonl"])
+    mgr.started.wait(5)
+
+    assert jobs.cancel(queued.job_id).state == "cancelled"
+    jobs.cancel(running.job_id)
+    assert running.wait(5) and running.state == "cancelled"
+    assert mgr.builds == 1  # the queued job never started
+    assert jobs.catalog_states() == {"a": "absent", "b": "absent"}
+    jobs.shutdown()
+
+
+def test_failed_warmup_is_reported():
+    mgr = _GatedManager()
+    mgr.fail = True
+    mgr.gate.set()
+    jobs = WarmupJobs(mgr, workers=1)
+    job, _ = jobs.submit("a", ["a.jsonl"])
+    assert job.wait(5)
+    assert job.state == "failed" and "broken catalog" in job.error
+    assert jobs.catalog_state("a") == "failed"
+    jobs.shutdown()
+
+
+def test_references_are_resolved_outside_the_lock():
+    mgr = _GatedManager()
+    jobs = WarmupJobs(mgr, workers=1)
+    resolve = mgr.resolve_references
+    locked = []
+    mgr.resolve_references = lambda refs: locked.append(jobs._lock.locked()) or resolve(refs)
+    jobs.submit("a", ["a.jsonl"])
+    with pytest.raises(FileNotFoundError):
+        jobs.submit("b", ["missing.jsonl"])
+    assert locked == [False, False]
+    mgr.gate.set()
+    jobs.shutdown()
+
+
+def test_finished_jobs_are_forgotten_past_keep():
+    mgr = _GatedManager()
+    mgr.gate.set()
+    jobs = WarmupJobs(mgr, workers=1, keep=2)
+    for cid in ("a", "b", "c", "d"):
+        job, _ = jobs.submit(cid, [f"{cid}.jsonl"])
+        assert job.wait(5)
+    jobs.submit("e", ["e.jsonl"])[0].wait(5)
+    assert len(jobs._jobs) == 2
+    assert sorted(jobs._latest) == ["d", "e"]
+    assert jobs.latest("a") is None and jobs.catalog_state("a") == "ready"
+    jobs.shutdown()
+
+
+def test_manager_reports_progress_and_honours_cancel(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_manager, "CATALOGUES_ROOT", tmp_path)
+    monkeypatch.setattr(catalog_manager, "SNAPSHOTS_ENABLED", False)
+    write_synthetic_catalog(tmp_path / "a.jsonl", 500, seed=1)
+    mgr = CatalogManager()
+
+    progress = WarmupProgress()
+    result = mgr.warmup("cat", ["a.jsonl"], limit_items=300, progress=progress)
+    assert result.items == 300
+    assert progress.as_dict() == {"phase": "done", "rows_parsed": 300, "features_extracted": 300, "postings_built": progress.postings_built}
+    assert progress.postings_built > 300
+
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(WarmupCancelled):
+        mgr.warmup("cat", ["a.jsonl"], progress=WarmupProgress(), cancel=cancel)
+    assert mgr.catalog_stats("cat")["items"] == 300  # previous index still installed